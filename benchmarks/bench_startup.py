@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Mesure du démarrage à froid d'un lancement avec --token
+
+Chaque essai lance un nouvel interpréteur qui charge le script, analyse
+les arguments et crée la session HTTP, c'est-à-dire tout ce qui précède la
+première requête. Le benchmark échoue si la médiane dépasse le budget ou
+si un module lourd (Selenium, BeautifulSoup, asyncio) est importé.
+
+Usage:
+  python benchmarks/bench_startup.py
+  python benchmarks/bench_startup.py --runs 20 --budget-ms 250
+"""
+
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+SCRIPT = pathlib.Path(__file__).resolve().parent.parent / "naviki-gpx-exporter.py"
+
+# Budget du démarrage complet (interpréteur compris), en millisecondes
+DEFAULT_BUDGET_MS = 300
+
+# Modules qui ne doivent pas être chargés en mode --token
+HEAVY_MODULES = ("selenium", "bs4", "asyncio", "aiohttp")
+
+PROBE = """
+import importlib.util, json, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("naviki_exporter", {script!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+sys.argv = ["naviki-gpx-exporter.py", "--token", "bench", "--no-manifest"]
+args = module.parse_arguments()
+module.create_session(args.token, args.jobs)
+print(json.dumps({{
+    "script_ms": (time.perf_counter() - start) * 1000,
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_once():
+    """Un démarrage à froid: (durée totale ms, durée du script ms, modules lourds)"""
+    probe = PROBE.format(script=str(SCRIPT), heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", probe], capture_output=True, text=True, check=True
+    ).stdout
+    total_ms = (time.perf_counter() - start) * 1000
+    result = json.loads(out.strip().splitlines()[-1])
+    return total_ms, result["script_ms"], result["heavy"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Nombre d'essais")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help=f"Budget de la médiane (défaut: {DEFAULT_BUDGET_MS} ms)",
+    )
+    args = parser.parse_args()
+
+    run_once()  # Préchauffe le cache disque et les .pyc
+    totals, scripts, heavy = [], [], set()
+    for _ in range(args.runs):
+        total_ms, script_ms, loaded = run_once()
+        totals.append(total_ms)
+        scripts.append(script_ms)
+        heavy.update(loaded)
+
+    median = statistics.median(totals)
+    print(f"Démarrage --token ({args.runs} essais)")
+    print(f"  total:  médiane {median:.0f} ms, min {min(totals):.0f} ms")
+    print(f"  script: médiane {statistics.median(scripts):.0f} ms (hors interpréteur)")
+    print(f"  budget: {args.budget_ms:.0f} ms")
+
+    failed = False
+    if heavy:
+        print(f"❌ Modules lourds importés: {', '.join(sorted(heavy))}")
+        failed = True
+    if median > args.budget_ms:
+        print("❌ Budget dépassé")
+        failed = True
+    if not failed:
+        print("✅ Dans le budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
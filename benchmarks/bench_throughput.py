@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Débit de bout en bout de l'exporteur contre l'API Naviki simulée
+
+Le serveur de fake_naviki_server.py tourne dans ce processus; l'exporteur
+réel est lancé dans un sous-processus avec --token et --api-url, dans un
+dossier temporaire. Le benchmark affiche les itinéraires et octets de GPX
+par seconde, la mémoire maximale de l'exporteur et les pannes servies. Il
+échoue si l'exporteur se termine en erreur, si des GPX manquent alors
+qu'aucun 401 ni 500 définitif n'a été injecté, ou sous le débit minimal.
+
+Usage:
+  python benchmarks/bench_throughput.py
+  python benchmarks/bench_throughput.py --ways 50000 --latency-ms 20 --jobs 8
+  python benchmarks/bench_throughput.py --throttle-rate 0.02 --engine async
+  python benchmarks/bench_throughput.py -- --no-manifest  # options en plus
+"""
+
+import argparse
+import pathlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_naviki_server import add_server_arguments, server_from_arguments
+
+SCRIPT = pathlib.Path(__file__).resolve().parent.parent / "naviki-gpx-exporter.py"
+
+
+def peak_rss_children():
+    """Mémoire maximale (octets) des sous-processus terminés"""
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def run_exporter(api_url, token, output_dir, args):
+    """Lance l'exporteur; (code de sortie, durée s, résumé affiché)"""
+    command = [
+        sys.executable,
+        str(SCRIPT),
+        "--token",
+        token,
+        "--api-url",
+        api_url,
+        "--output",
+        str(output_dir),
+        "--jobs",
+        str(args.jobs),
+        "--engine",
+        args.engine,
+        *args.exporter_args,
+    ]
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    # Résumé final de main(), après "Téléchargement terminé!"
+    _, _, summary = result.stdout.rpartition("Téléchargement terminé!")
+    summary = summary.strip().splitlines()
+    if result.returncode:
+        summary += result.stderr.splitlines()[-5:]
+    return result.returncode, elapsed, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    add_server_arguments(parser)
+    parser.add_argument("--jobs", type=int, default=4, help="--jobs de l'exporteur")
+    parser.add_argument(
+        "--engine", choices=["sync", "async"], default="sync", help="Moteur"
+    )
+    parser.add_argument(
+        "--min-ways-per-s",
+        type=float,
+        default=0.0,
+        help="Débit minimal attendu (défaut: pas de seuil)",
+    )
+    parser.add_argument(
+        "exporter_args",
+        nargs=argparse.REMAINDER,
+        help="Options passées à l'exporteur, après --",
+    )
+    args = parser.parse_args()
+    if args.exporter_args[:1] == ["--"]:
+        args.exporter_args = args.exporter_args[1:]
+
+    with tempfile.TemporaryDirectory(prefix="naviki-bench-") as tmp:
+        output_dir = pathlib.Path(tmp)
+        with server_from_arguments(args) as server:
+            code, elapsed, summary = run_exporter(
+                server.api_url, server.token, output_dir, args
+            )
+        files = list(output_dir.glob("*.gpx"))
+        gpx_bytes = sum(path.stat().st_size for path in files)
+
+    stats = server.stats
+    print(f"Export de {args.ways} itinéraires ({args.jobs} jobs, {args.engine})")
+    for line in summary:
+        print(f"  | {line}")
+    print(f"  durée:       {elapsed:.2f} s")
+    print(f"  débit:       {len(files) / elapsed:.1f} itinéraires/s")
+    print(f"  volume:      {gpx_bytes / elapsed / 1e6:.2f} Mo de GPX/s")
+    print(f"  réseau:      {stats['bytes_sent'] / elapsed / 1e6:.2f} Mo/s envoyés")
+    print(f"  mémoire max: {peak_rss_children() / 1e6:.1f} Mo (exporteur)")
+    print(
+        f"  serveur:     {stats['list_requests']} pages, "
+        f"{stats['download_requests']} téléchargements demandés, "
+        f"{stats['errors']} 500, {stats['throttled']} 429, "
+        f"{stats['unauthorized']} 401"
+    )
+
+    failed = False
+    if code:
+        print(f"❌ L'exporteur s'est terminé avec le code {code}")
+        failed = True
+    lossless = not (args.unauthorized_rate or args.expire_after or args.error_rate)
+    if lossless and len(files) != args.ways:
+        print(f"❌ {len(files)} GPX écrits sur {args.ways} itinéraires")
+        failed = True
+    if len(files) / elapsed < args.min_ways_per_s:
+        print("❌ Débit inférieur au minimum")
+        failed = True
+    if not failed:
+        print("✅ Export complet")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Mesure de l'extraction des dates depuis les titres d'itinéraires
+
+Un corpus synthétique reprend les formats rencontrés sur Naviki (dates
+avec heure, format compact, titres personnalisés), presque sans doublon:
+un export analyse chaque titre une fois. Il est analysé par l'ancienne
+boucle de re.search sur patterns et par TitleParser, en alternance, et
+le meilleur temps de chacun est retenu. Le benchmark échoue si les
+résultats diffèrent ou si TitleParser n'est pas plus rapide que la boucle
+(--max-ratio).
+
+Usage:
+  python benchmarks/bench_title_parser.py
+  python benchmarks/bench_title_parser.py --titles 500000 --max-ratio 0.9
+"""
+
+import argparse
+import importlib.util
+import pathlib
+import random
+import re
+import sys
+import time
+
+SCRIPT = pathlib.Path(__file__).resolve().parent.parent / "naviki-gpx-exporter.py"
+
+# Temps de TitleParser rapporté à celui de l'ancienne boucle, à ne pas dépasser
+DEFAULT_MAX_RATIO = 1.0
+
+PLACES = (
+    "Route de la Chapelle, Coulonges",
+    "Vervant",
+    "Tour du lac",
+    "Boucle des vignes 42 km",
+    "Retour maison",
+)
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("naviki_exporter", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_title(rng):
+    """Un titre au hasard, dans les proportions d'un compte réel"""
+    day, month = rng.randint(1, 28), rng.randint(1, 12)
+    year, hour, minute = rng.randint(2015, 2026), rng.randint(0, 23), rng.randint(0, 59)
+    kind = rng.random()
+    if kind < 0.55:
+        return f"{day:02d}/{month:02d}/{year}, {hour:02d}:{minute:02d}"
+    if kind < 0.70:
+        return f"{day:02d}.{month:02d}.{year % 100:02d}, {hour:02d}:{minute:02d}"
+    if kind < 0.75:
+        return f"{day:02d}-{month:02d}-{year}, {hour:02d}:{minute:02d}"
+    if kind < 0.85:
+        return f"{rng.choice(PLACES)} - {year}{month:02d}{day:02d}"
+    return rng.choice(PLACES)
+
+
+def build_corpus(size, seed):
+    """size titres tirés indépendamment (seuls les titres sans date se répètent)"""
+    rng = random.Random(seed)
+    return [synthetic_title(rng) for _ in range(size)]
+
+
+def legacy_parse(patterns, title):
+    """Ancienne boucle: un re.search par format, dans l'ordre"""
+    for pattern in patterns:
+        m = re.search(pattern, title)
+        if m:
+            groups = m.groupdict()
+            year = groups["year"]
+            if len(year) == 2:
+                year = "20" + year
+            return (
+                year,
+                groups["month"],
+                groups["day"],
+                groups.get("hour"),
+                groups.get("minute"),
+            )
+    return None
+
+
+def timed(func, corpus):
+    start = time.perf_counter()
+    results = [func(title) for title in corpus]
+    return time.perf_counter() - start, results
+
+
+def best_of(repeat, funcs, corpus):
+    """Meilleur temps de chaque fonction, exécutées en alternance"""
+    best = [float("inf")] * len(funcs)
+    results = [None] * len(funcs)
+    for _ in range(repeat):
+        for i, func in enumerate(funcs):
+            seconds, results[i] = timed(func, corpus)
+            best[i] = min(best[i], seconds)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--titles", type=int, default=200000, help="Taille du corpus")
+    parser.add_argument("--seed", type=int, default=0, help="Graine du corpus")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Mesures de chaque analyseur"
+    )
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=DEFAULT_MAX_RATIO,
+        help="Temps de TitleParser / temps de la boucle à ne pas dépasser "
+        f"(défaut: {DEFAULT_MAX_RATIO})",
+    )
+    args = parser.parse_args()
+
+    module = load_module()
+    corpus = build_corpus(args.titles, args.seed)
+    title_parser = module.TitleParser()
+
+    (legacy_s, parser_s), (expected, parsed) = best_of(
+        args.repeat,
+        [lambda t: legacy_parse(module.patterns, t), title_parser.parse],
+        corpus,
+    )
+    ratio = parser_s / legacy_s
+
+    def per_title(seconds):
+        return seconds / len(corpus) * 1e6
+
+    print(f"Analyse de {len(corpus)} titres ({len(set(corpus))} différents)")
+    print(f"  boucle re.search:     {per_title(legacy_s):.2f} µs/titre")
+    print(f"  TitleParser:          {per_title(parser_s):.2f} µs/titre")
+    print(f"  rapport:              {ratio:.2f} (maximum {args.max_ratio:.2f})")
+
+    failed = False
+    got = [p[:5] if p else None for p in parsed]
+    if got != expected:
+        mismatches = sum(a != b for a, b in zip(got, expected))
+        print(f"❌ {mismatches} titres analysés différemment")
+        failed = True
+    if ratio > args.max_ratio:
+        print("❌ TitleParser plus lent que prévu par rapport à la boucle")
+        failed = True
+    if not failed:
+        print("✅ Résultats identiques, rapport dans la limite")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Serveur local qui imite l'API Naviki pour les benchmarks de bout en bout
+
+Il sert findUserWaysByFilter (liste paginée, tri par date décroissante) et
+wayToFileWithUser (GPX, compressé en gzip si le client l'accepte) pour un
+compte synthétique de plusieurs dizaines de milliers d'itinéraires. Une
+latence par requête et des pannes peuvent être injectées: erreurs 500,
+limitation 429 avec Retry-After, 401 et expiration du token après N
+téléchargements. Les itinéraires sont générés à la demande (pas de
+stockage) et les pannes tirées d'une graine fixe.
+
+Usage:
+  python benchmarks/fake_naviki_server.py --ways 50000 --port 8080
+  python naviki-gpx-exporter.py --token bench-token \\
+      --api-url http://127.0.0.1:8080/naviki/api/v6 --output /tmp/traces
+
+Depuis Python:
+  with FakeNavikiServer(ways=1000, latency=0.01) as server:
+      ...  # server.api_url, server.stats
+"""
+
+import argparse
+import contextlib
+import gzip
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+API_PATH = "/naviki/api/v6"
+LIST_PATH = f"{API_PATH}/Way/2/findUserWaysByFilter/"
+DOWNLOAD_PATH = f"{API_PATH}/Util/wayToFileWithUser/"
+
+DEFAULT_TOKEN = "bench-token"
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_POINTS = 200
+
+# Itinéraire le plus récent; les suivants remontent d'une heure chacun
+# (titres et noms de fichiers distincts)
+NEWEST_CRDATE = 1760599200
+
+
+def way_at(index):
+    """
+    Itinéraire synthétique n°index, du plus récent au plus ancien
+
+    80% de titres datés, 10% au format compact et 10% de titres
+    personnalisés, comme sur un compte réel.
+    """
+    crdate = NEWEST_CRDATE - index * 3600
+    dt = datetime.fromtimestamp(crdate, tz=timezone.utc)
+    if index % 10 == 8:
+        title = f"Sortie - {dt:%Y%m%d}"
+    elif index % 10 == 9:
+        title = f"Tour n°{index}"
+    else:
+        title = f"{dt:%d/%m/%Y, %H:%M}"
+    return {
+        "uuid": f"{index:08X}-0000-4000-8000-{index:012X}",
+        "title": title,
+        "crdate": crdate,
+    }
+
+
+def gpx_for(uuid, points):
+    """GPX synthétique de `points` points de trace"""
+    trkpts = "".join(
+        f'<trkpt lat="{48 + i * 1e-4:.6f}" lon="{2 + i * 1e-4:.6f}">'
+        f"<ele>{35 + i % 50}</ele></trkpt>"
+        for i in range(points)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<gpx version="1.1" creator="Naviki"><trk><name>{uuid}</name>'
+        f"<trkseg>{trkpts}</trkseg></trk></gpx>\n"
+    ).encode("utf-8")
+
+
+class FakeNavikiHandler(BaseHTTPRequestHandler):
+    """Liste paginée + téléchargement GPX, avec pannes injectées"""
+
+    # Keep-alive: le pool de connexions du client est réutilisé. En-têtes
+    # et corps partent en deux écritures: sans TCP_NODELAY, l'ACK retardé
+    # du client ajouterait ~40 ms à chaque réponse
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.fake.count("bytes_sent", len(body))
+
+    def send_failure(self, kind):
+        fake = self.server.fake
+        if kind == "throttled":
+            self.send(429, headers={"Retry-After": f"{fake.retry_after:g}"})
+        elif kind == "unauthorized":
+            self.send(401, b'{"error": "invalid_token"}')
+        else:
+            self.send(500, b"Internal Server Error")
+
+    def do_GET(self):
+        fake = self.server.fake
+        url = urlsplit(self.path)
+        if url.path != LIST_PATH:
+            self.send(404)
+            return
+        fake.pause()
+        fake.count("list_requests")
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        failure = fake.failure(token)
+        if failure:
+            self.send_failure(failure)
+            return
+
+        offset = int(parse_qs(url.query).get("offset", ["0"])[0])
+        end = min(offset + fake.page_size, fake.ways)
+        ways = [way_at(i) for i in range(offset, end)]
+        body = json.dumps({"ways": ways}).encode()
+        self.send(200, body, {"Content-Type": "application/json"})
+
+    def do_POST(self):
+        fake = self.server.fake
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        if urlsplit(self.path).path != DOWNLOAD_PATH:
+            self.send(404)
+            return
+        with fake.in_flight():
+            fake.pause()
+            fake.count("download_requests")
+            failure = fake.failure(form.get("oauth_token", [""])[0], download=True)
+            if failure:
+                self.send_failure(failure)
+                return
+
+            body = gpx_for(form["wayUuid"][0], fake.points)
+            headers = {"Content-Type": "application/gpx+xml; charset=UTF-8"}
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body, compresslevel=1)
+                headers["Content-Encoding"] = "gzip"
+            fake.count("downloads")
+            self.send(200, body, headers)
+
+
+class FakeNavikiServer:
+    """
+    API Naviki simulée, servie par un thread en arrière-plan
+
+    Args:
+        ways: Nombre d'itinéraires du compte
+        page_size: Itinéraires par page de findUserWaysByFilter
+        points: Points de trace par GPX (≈ 60 octets chacun)
+        latency: Délai ajouté à chaque requête, en secondes
+        error_rate: Proportion de réponses 500
+        throttle_rate: Proportion de réponses 429 (avec Retry-After)
+        unauthorized_rate: Proportion de réponses 401 aux téléchargements
+        expire_after: Le token est refusé (401) après ce nombre de
+            téléchargements réussis
+        retry_after: Valeur de Retry-After des 429, en secondes
+        token: Token OAuth accepté
+        seed: Graine du tirage des pannes
+        host, port: Adresse d'écoute (port 0: choisi par le système)
+    """
+
+    def __init__(
+        self,
+        ways=10000,
+        page_size=DEFAULT_PAGE_SIZE,
+        points=DEFAULT_POINTS,
+        latency=0.0,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        unauthorized_rate=0.0,
+        expire_after=None,
+        retry_after=1.0,
+        token=DEFAULT_TOKEN,
+        seed=0,
+        host="127.0.0.1",
+        port=0,
+    ):
+        self.ways = ways
+        self.page_size = page_size
+        self.points = points
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.unauthorized_rate = unauthorized_rate
+        self.expire_after = expire_after
+        self.retry_after = retry_after
+        self.token = token
+        self.stats = {
+            "list_requests": 0,
+            "download_requests": 0,
+            "downloads": 0,
+            "errors": 0,
+            "throttled": 0,
+            "unauthorized": 0,
+            "bytes_sent": 0,
+            # Téléchargements simultanés au plus fort de l'export
+            "max_in_flight": 0,
+        }
+        self._in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), FakeNavikiHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def api_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    def count(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    @contextlib.contextmanager
+    def in_flight(self):
+        """Compte un téléchargement en cours (stats["max_in_flight"])"""
+        with self._lock:
+            self._in_flight += 1
+            self.stats["max_in_flight"] = max(
+                self.stats["max_in_flight"], self._in_flight
+            )
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def pause(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def failure(self, token, download=False):
+        """
+        Tire la panne à injecter pour une requête
+
+        Les 401 aléatoires ne visent que les téléchargements: sur la liste,
+        un 401 arrête l'export (comme un token invalide ou expiré).
+
+        Returns:
+            "unauthorized", "throttled", "error", ou None pour une réponse
+            normale
+        """
+        with self._lock:
+            expired = (
+                self.expire_after is not None
+                and self.stats["downloads"] >= self.expire_after
+            )
+            draw = self._random.random()
+            unauthorized = self.unauthorized_rate if download else 0.0
+            if token != self.token or expired or draw < unauthorized:
+                kind, stat = "unauthorized", "unauthorized"
+            elif draw < unauthorized + self.throttle_rate:
+                kind, stat = "throttled", "throttled"
+            elif draw < unauthorized + self.throttle_rate + self.error_rate:
+                kind, stat = "error", "errors"
+            else:
+                return None
+            self.stats[stat] += 1
+            return kind
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="fake-naviki", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def add_server_arguments(parser):
+    """Options du serveur, partagées avec bench_throughput.py"""
+    parser.add_argument(
+        "--ways", type=int, default=10000, help="Itinéraires du compte simulé"
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help=f"Itinéraires par page (défaut: {DEFAULT_PAGE_SIZE})",
+    )
+    parser.add_argument(
+        "--points",
+        type=int,
+        default=DEFAULT_POINTS,
+        help=f"Points de trace par GPX (défaut: {DEFAULT_POINTS})",
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Latence par requête (ms)"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Proportion de 500"
+    )
+    parser.add_argument(
+        "--throttle-rate", type=float, default=0.0, help="Proportion de 429"
+    )
+    parser.add_argument(
+        "--unauthorized-rate",
+        type=float,
+        default=0.0,
+        help="Proportion de 401 sur les téléchargements",
+    )
+    parser.add_argument(
+        "--expire-after",
+        type=int,
+        metavar="N",
+        help="Refuser le token (401) après N téléchargements",
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=float,
+        default=1.0,
+        help="Retry-After des 429, en secondes (défaut: 1)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Graine des pannes")
+
+
+def server_from_arguments(args, port=0):
+    return FakeNavikiServer(
+        ways=args.ways,
+        page_size=args.page_size,
+        points=args.points,
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        unauthorized_rate=args.unauthorized_rate,
+        expire_after=args.expire_after,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        port=port,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_server_arguments(parser)
+    parser.add_argument("--port", type=int, default=8080, help="Port d'écoute")
+    args = parser.parse_args()
+
+    server = server_from_arguments(args, args.port).start()
+    print(f"🌐 API simulée ({args.ways} itinéraires): {server.api_url}")
+    print(f"🔑 Token: {server.token}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"\n📊 {json.dumps(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
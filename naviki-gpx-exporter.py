@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Script pour télécharger automatiquement les traces GPX depuis Naviki
-Utilise Selenium pour une authentification 100% automatique
+Authentification 100% automatique: flux OAuth2 en HTTP, avec Selenium
+en repli si la connexion HTTP échoue
 
 Installation requise:
   pip install selenium requests beautifulsoup4
@@ -19,12 +20,6 @@ Usage:
     --headless
 """
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.firefox.options import Options
-from selenium.common.exceptions import TimeoutException, WebDriverException
 import requests
 import time
 import re
@@ -32,7 +27,63 @@ import pathlib
 import argparse
 import sys
 import os
+import threading
+import queue
+import sqlite3
+import hashlib
+import json
+import functools
+import contextlib
+import importlib.util
+import random
+import email.utils
 from datetime import datetime, timezone
+from urllib.parse import parse_qs, quote, urljoin, urlsplit
+from typing import TYPE_CHECKING, NamedTuple, Optional
+from urllib3.util.request import ACCEPT_ENCODING
+
+if TYPE_CHECKING:
+    # Chargés à la demande par _load_selenium()
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.firefox.options import Options
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# Selenium (~250 ms d'import), BeautifulSoup et asyncio ne sont chargés
+# que par les chemins qui s'en servent: un lancement avec --token n'importe
+# ni navigateur ni parseur HTML
+SELENIUM_NAMES = {
+    "webdriver": ("selenium.webdriver", None),
+    "By": ("selenium.webdriver.common.by", "By"),
+    "WebDriverWait": ("selenium.webdriver.support.ui", "WebDriverWait"),
+    "EC": ("selenium.webdriver.support.expected_conditions", None),
+    "Options": ("selenium.webdriver.firefox.options", "Options"),
+    "TimeoutException": ("selenium.common.exceptions", "TimeoutException"),
+    "WebDriverException": ("selenium.common.exceptions", "WebDriverException"),
+}
+
+
+def _load_selenium():
+    """
+    Importe Selenium et publie ses noms (webdriver, By, WebDriverWait...)
+    comme globales du module
+
+    Un nom déjà présent (par exemple remplacé par un mock) est conservé.
+    """
+    for name, (module_name, attribute) in SELENIUM_NAMES.items():
+        if name not in globals():
+            module = importlib.import_module(module_name)
+            globals()[name] = getattr(module, attribute) if attribute else module
+
+
+def __getattr__(name):
+    """Accès paresseux aux noms Selenium (naviki_exporter.webdriver, ...)"""
+    if name in SELENIUM_NAMES:
+        _load_selenium()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def load_env_file():
@@ -102,7 +153,593 @@ def save_credentials_to_env(username, password):
     print("🔒 Permissions définies à 600 " "(lecture/écriture uniquement pour vous)")
 
 
-def get_oauth_token_with_selenium(username, password, headless=True):
+def token_cache_path(username=None):
+    """
+    Fichier du token OAuth en cache, à côté du fichier .env
+
+    Args:
+        username: Compte Naviki en mode --batch (un fichier par compte);
+            None pour le fichier unique du mode normal
+    """
+    filename = TOKEN_CACHE_FILENAME
+    if username is not None:
+        filename += "." + re.sub(r"[^\w\-.]", "_", username)
+    return pathlib.Path(__file__).parent / filename
+
+
+def load_cached_token(username, path=None):
+    """
+    Lit le token OAuth en cache
+
+    Args:
+        username: Compte Naviki dont on veut le token
+        path: Fichier du cache (défaut: token_cache_path())
+
+    Returns:
+        dict (token, username, acquired_at), ou None si absent, illisible
+        ou obtenu pour un autre compte
+    """
+    path = path or token_cache_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        token = cached["token"]
+        acquired_at = float(cached["acquired_at"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    if not token or cached.get("username") != username:
+        return None
+    return {"token": token, "username": username, "acquired_at": acquired_at}
+
+
+def save_cached_token(token, username, path=None):
+    """
+    Sauvegarde le token OAuth obtenu, avec son heure d'obtention
+
+    Le fichier est créé directement en 600 puis mis en place par un
+    renommage atomique: il n'est jamais lisible par d'autres, même
+    partiellement écrit.
+
+    Args:
+        token: Token OAuth (_n_a_at)
+        username: Compte Naviki du token
+        path: Fichier du cache (défaut: token_cache_path())
+    """
+    path = path or token_cache_path()
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(
+                {"token": token, "username": username, "acquired_at": time.time()},
+                f,
+            )
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️  Impossible de sauvegarder le token en cache: {e}")
+        return
+    print(f"💾 Token sauvegardé en cache dans {path} (permissions 600)")
+
+
+def clear_cached_token(path=None):
+    """Supprime le token OAuth en cache"""
+    path = path or token_cache_path()
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def validate_token(token, api_url=None):
+    """
+    Vérifie un token OAuth avec une seule requête (première page de liste)
+
+    Returns:
+        True si accepté, False si refusé (401/403), None si la vérification
+        est impossible (réseau, erreur serveur)
+    """
+    try:
+        r = requests.get(
+            f"{api_url or NAVIKI_API_URL}/Way/2/findUserWaysByFilter/"
+            "?filter=recordedMy&sort=crdateDesc&offset=0&fullDataSet=0",
+            headers={
+                "Authorization": f"Bearer {token}",
+                "Accept": "application/json",
+            },
+            timeout=TOKEN_VALIDATION_TIMEOUT,
+        )
+    except requests.RequestException:
+        return None
+    if r.status_code in (401, 403):
+        return False
+    return True if r.status_code == 200 else None
+
+
+def reuse_cached_token(username, path=None, api_url=None):
+    """
+    Retourne le token en cache s'il est encore accepté par l'API
+
+    Un token expiré ou refusé est supprimé du cache. Si l'API ne peut pas
+    être jointe, le token est conservé: l'export signalera l'erreur.
+
+    Args:
+        username: Compte Naviki
+        path: Fichier du cache (défaut: token_cache_path())
+        api_url: URL de l'API (défaut: NAVIKI_API_URL)
+
+    Returns:
+        Le token, ou None s'il faut se reconnecter
+    """
+    cached = load_cached_token(username, path)
+    if cached is None:
+        return None
+
+    age = time.time() - cached["acquired_at"]
+    if age > TOKEN_CACHE_MAX_AGE:
+        print("⌛ Token en cache trop ancien, nouvelle connexion")
+        clear_cached_token(path)
+        return None
+
+    if validate_token(cached["token"], api_url) is False:
+        print("⚠️  Token en cache refusé par l'API, nouvelle connexion")
+        clear_cached_token(path)
+        return None
+
+    print(f"✅ Token en cache réutilisé (obtenu il y a {age / 3600:.1f} h)")
+    return cached["token"]
+
+
+def oauth_authorize_url(base_url=None):
+    """URL de la page de connexion OAuth2 (flux "authorization code")"""
+    return (
+        f"{base_url or NAVIKI_BASE_URL}/oauth2/auth?lang=fr"
+        f"&redirect_uri={OAUTH_REDIRECT_URI}&client_id={OAUTH_CLIENT_ID}"
+        f"&scope={OAUTH_SCOPE}&response_type=code"
+    )
+
+
+def find_login_form(html, page_url):
+    """
+    Trouve le formulaire de connexion (celui qui a un champ password)
+
+    Returns:
+        (URL d'envoi, champs du formulaire dont les champs cachés), ou
+        None si la page n'a pas de formulaire de connexion
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for form in soup.find_all("form"):
+        if form.find("input", attrs={"name": "password"}) is None:
+            continue
+        fields = {
+            field["name"]: field.get("value", "")
+            for field in form.find_all("input")
+            if field.get("name") and field.get("type") not in ("submit", "button")
+        }
+        return urljoin(page_url, form.get("action") or page_url), fields
+    return None
+
+
+def authorization_code(location):
+    """Code OAuth2 d'une redirection (query ou fragment), ou None"""
+    parts = urlsplit(location)
+    for params in (parts.query, parts.fragment):
+        code = parse_qs(params).get("code")
+        if code:
+            return code[0]
+    return None
+
+
+def get_oauth_token_with_http(username, password, base_url=None):
+    """
+    Récupère le token OAuth sans navigateur, par le même flux OAuth2 que
+    la page de connexion: formulaire envoyé en HTTP, redirections suivies
+    jusqu'à redirect_uri pour lire le code, puis échange du code contre
+    le token sur /oauth2/token
+
+    Args:
+        username: Login Naviki
+        password: Mot de passe
+        base_url: Site Naviki (défaut: NAVIKI_BASE_URL)
+
+    Returns:
+        Token OAuth d'accès, ou None en cas d'échec
+    """
+    base_url = base_url or NAVIKI_BASE_URL
+    print("🔐 Authentification HTTP (sans navigateur)...")
+
+    http = requests.Session()
+    http.headers.update({"User-Agent": OAUTH_USER_AGENT})
+    try:
+        # Étape 1: page de connexion (cookies de session et champs cachés)
+        page = http.get(oauth_authorize_url(base_url), timeout=OAUTH_HTTP_TIMEOUT)
+        form = find_login_form(page.text, page.url)
+        if form is None:
+            print("   ✗ Formulaire de connexion introuvable")
+            return None
+        action, fields = form
+        fields.update({"username": username, "password": password})
+
+        # Étape 2: envoi du formulaire; les redirections sont suivies à la
+        # main pour s'arrêter sur redirect_uri sans la charger
+        r = http.post(
+            action, data=fields, allow_redirects=False, timeout=OAUTH_HTTP_TIMEOUT
+        )
+        code = None
+        for _ in range(OAUTH_MAX_REDIRECTS):
+            location = r.headers.get("Location")
+            if not r.is_redirect or not location:
+                break
+            location = urljoin(r.url, location)
+            code = authorization_code(location)
+            if code:
+                break
+            r = http.get(location, allow_redirects=False, timeout=OAUTH_HTTP_TIMEOUT)
+
+        if not code:
+            print("   ✗ Pas de code d'autorisation - identifiants incorrects?")
+            return None
+        print("   ✓ Code d'autorisation reçu")
+
+        # Étape 3: échange du code contre le token
+        r = http.post(
+            f"{base_url}/oauth2/token",
+            data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "redirect_uri": OAUTH_REDIRECT_URI,
+                "client_id": OAUTH_CLIENT_ID,
+            },
+            headers={"Accept": "application/json"},
+            timeout=OAUTH_HTTP_TIMEOUT,
+        )
+        if r.status_code != 200:
+            print(f"   ✗ Échange du code refusé: HTTP {r.status_code}")
+            return None
+        token = r.json().get("access_token")
+        if not token:
+            print("   ✗ Réponse sans access_token")
+            return None
+
+    except (requests.RequestException, ValueError) as e:
+        print(f"   ✗ Erreur HTTP: {e}")
+        return None
+
+    finally:
+        http.close()
+
+    print(f"   ✓ Token récupéré: {token[:20]}...")
+    print("\n✅ Authentification réussie!")
+    return token
+
+
+def get_oauth_token(
+    username,
+    password,
+    method="auto",
+    headless=True,
+    browser_profile="lean",
+    browser_pool=None,
+):
+    """
+    Récupère le token OAuth selon --auth-method
+
+    Args:
+        username: Login Naviki
+        password: Mot de passe
+        method: "http", "selenium", ou "auto" (HTTP puis Selenium en repli)
+        headless: Navigateur invisible pour Selenium
+        browser_profile: Profil Firefox pour Selenium ("lean" ou "full")
+        browser_pool: BrowserPool pour Selenium (--batch)
+
+    Returns:
+        Token OAuth d'accès, ou None en cas d'échec
+    """
+    if method in ("auto", "http"):
+        token = get_oauth_token_with_http(username, password)
+        if token or method == "http":
+            return token
+        print("\n↪️  Repli sur l'authentification Selenium\n")
+    return get_oauth_token_with_selenium(
+        username,
+        password,
+        headless=headless,
+        browser_profile=browser_profile,
+        browser_pool=browser_pool,
+    )
+
+
+def token_or_login_error(driver):
+    """
+    Condition WebDriverWait de l'attente du token: un seul appel
+    JavaScript par essai (token dans localStorage, sinon message d'erreur
+    visible du formulaire)
+
+    Returns:
+        {"token": ...} ou {"error": ...}, ou False pour continuer d'attendre
+    """
+    _load_selenium()
+    try:
+        result = driver.execute_script(TOKEN_PROBE_SCRIPT, LOGIN_ERROR_SELECTOR)
+    except WebDriverException:
+        # Document remplacé pendant les redirections OAuth: on réessaie
+        return False
+    return result if isinstance(result, dict) and result else False
+
+
+def blocked_hosts_pac(hosts):
+    """
+    Script PAC (data: URL) qui envoie les hôtes bloqués vers un proxy
+    fermé: leurs requêtes échouent immédiatement, le reste passe en direct
+    """
+    pac = (
+        "function FindProxyForURL(url, host) {"
+        f" var blocked = {json.dumps(list(hosts))};"
+        " for (var i = 0; i < blocked.length; i++) {"
+        "  if (host == blocked[i] || dnsDomainIs(host, '.' + blocked[i]))"
+        "   return 'PROXY 127.0.0.1:9';"
+        " }"
+        " return 'DIRECT';"
+        "}"
+    )
+    return "data:text/javascript," + quote(pac)
+
+
+def build_firefox_options(headless=True, profile="lean"):
+    """
+    Options Firefox de la connexion Selenium
+
+    Le profil "lean" ne charge que ce qui sert à la connexion: page rendue
+    la main dès le DOM prêt (eager), sans images, médias ni polices web,
+    sans hôtes tiers de suivi (SELENIUM_BLOCKED_HOSTS), sans cache disque
+    ni restauration de session. "full" garde le comportement d'origine,
+    pour comparer.
+
+    Args:
+        headless: Navigateur invisible
+        profile: "lean" (défaut) ou "full"
+
+    Returns:
+        Options pour webdriver.Firefox
+    """
+    _load_selenium()
+    options = Options()
+    if headless:
+        options.add_argument("--headless")
+
+    # Réduire les logs
+    options.set_preference("devtools.console.stdout.content", False)
+
+    if profile == "lean":
+        options.page_load_strategy = "eager"
+        for name, value in LEAN_FIREFOX_PREFS.items():
+            options.set_preference(name, value)
+        options.set_preference("network.proxy.type", 2)
+        options.set_preference(
+            "network.proxy.autoconfig_url", blocked_hosts_pac(SELENIUM_BLOCKED_HOSTS)
+        )
+    return options
+
+
+def process_tree_memory(pid, field):
+    """
+    Somme d'un champ mémoire de /proc/<pid>/status (VmHWM, VmRSS) sur un
+    processus et ses descendants: Firefox répartit les pages dans
+    plusieurs processus
+
+    Returns:
+        Octets, ou None si /proc n'est pas disponible (hors Linux)
+    """
+    children = {}
+    try:
+        for stat_path in pathlib.Path("/proc").glob("[0-9]*/stat"):
+            try:
+                fields = stat_path.read_text().rsplit(")", 1)[1].split()
+            except (OSError, IndexError):
+                continue
+            children.setdefault(int(fields[1]), []).append(int(stat_path.parent.name))
+    except OSError:
+        return None
+
+    total = 0
+    found = False
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status", encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith(f"{field}:"):
+                        total += int(line.split()[1]) * 1024
+                        found = True
+                        break
+        except OSError:
+            continue
+    return total if found else None
+
+
+def browser_peak_rss(pid):
+    """Pic de mémoire (VmHWM) d'un navigateur, tous processus compris"""
+    return process_tree_memory(pid, "VmHWM")
+
+
+def browser_rss(driver):
+    """Mémoire actuelle (VmRSS) d'un navigateur WebDriver, ou None"""
+    pid = driver.capabilities.get("moz:processID")
+    return process_tree_memory(pid, "VmRSS") if isinstance(pid, int) else None
+
+
+def report_browser_usage(driver, started):
+    """Affiche la durée de connexion et le pic mémoire du navigateur"""
+    elapsed = time.monotonic() - started
+    pid = driver.capabilities.get("moz:processID")
+    rss = browser_peak_rss(pid) if isinstance(pid, int) else None
+    memory = f", pic mémoire du navigateur: {format_size(rss)}" if rss else ""
+    print(f"\n⏱️  Connexion Selenium: {elapsed:.1f}s{memory}")
+
+
+def reset_browser_session(driver):
+    """
+    Efface cookies, localStorage et sessionStorage du site Naviki
+
+    Ces données sont liées à l'origine: elles ne peuvent être effacées
+    que depuis une page de Naviki, où se termine toute connexion réussie.
+
+    Returns:
+        True si la session a été effacée, False si le navigateur n'est pas
+        sur Naviki (il doit alors être fermé plutôt que réutilisé)
+    """
+    _load_selenium()
+    try:
+        if urlsplit(driver.current_url).netloc != urlsplit(NAVIKI_BASE_URL).netloc:
+            return False
+        driver.delete_all_cookies()
+        driver.execute_script(RESET_SESSION_SCRIPT)
+        driver.get("about:blank")
+    except WebDriverException:
+        return False
+    return True
+
+
+class BrowserPool:
+    """
+    Navigateurs Firefox gardés ouverts entre les connexions Selenium
+
+    acquire() rend un navigateur libre, ou en lance un nouveau tant que le
+    pool compte moins de `size` navigateurs et que la mémoire actuelle des
+    navigateurs, plus celle d'un navigateur moyen, reste sous
+    `memory_budget`; sinon il attend qu'un navigateur soit rendu. release()
+    efface la session (reset_browser_session) avant de remettre le
+    navigateur à disposition: la connexion suivante ne coûte qu'une
+    navigation au lieu d'un lancement de Firefox.
+
+    Usage:
+        with BrowserPool(size=2) as pool:
+            token = get_oauth_token_with_selenium(
+                username, password, browser_pool=pool
+            )
+    """
+
+    def __init__(self, size=None, memory_budget=None, headless=True, profile="lean"):
+        """
+        Args:
+            size: Nombre maximal de navigateurs ouverts
+                (défaut: BROWSER_POOL_SIZE)
+            memory_budget: Mémoire totale des navigateurs, en octets
+                (défaut: BROWSER_MEMORY_BUDGET_MB; 0 pour ne pas limiter)
+            headless: Navigateurs invisibles
+            profile: Profil Firefox (voir build_firefox_options)
+        """
+        self.size = size or BROWSER_POOL_SIZE
+        if memory_budget is None:
+            memory_budget = BROWSER_MEMORY_BUDGET_MB * 1024 * 1024
+        self.memory_budget = memory_budget
+        self.headless = headless
+        self.profile = profile
+        self.launched_count = 0
+        self.reused_count = 0
+        self._drivers = []
+        self._idle = []
+        self._launching = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def _can_launch(self):
+        """Un navigateur de plus tient-il dans le pool? (verrou tenu)"""
+        running = len(self._drivers) + self._launching
+        if running == 0:
+            return True
+        if running >= self.size:
+            return False
+        if not self.memory_budget or not self._drivers:
+            return True
+        sizes = [browser_rss(driver) for driver in self._drivers]
+        if None in sizes:
+            return True
+        used = sum(sizes)
+        return used + used / len(sizes) <= self.memory_budget
+
+    def acquire(self):
+        """
+        Navigateur à la session vierge, à rendre avec release()
+
+        Raises:
+            WebDriverException: Échec du lancement de Firefox
+            RuntimeError: Pool déjà fermé (close())
+        """
+        with self._condition:
+            while not self._closed and not self._idle and not self._can_launch():
+                self._condition.wait()
+            if self._closed:
+                raise RuntimeError("pool de navigateurs fermé")
+            if self._idle:
+                self.reused_count += 1
+                return self._idle.pop()
+            self._launching += 1
+
+        _load_selenium()
+        try:
+            driver = webdriver.Firefox(
+                options=build_firefox_options(self.headless, self.profile)
+            )
+            driver.set_page_load_timeout(30)
+        except BaseException:
+            with self._condition:
+                self._launching -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._launching -= 1
+            closed = self._closed
+            if not closed:
+                self._drivers.append(driver)
+                self.launched_count += 1
+        if closed:
+            # Fermé pendant le lancement: personne ne quitterait ce Firefox
+            driver.quit()
+            raise RuntimeError("pool de navigateurs fermé")
+        return driver
+
+    def release(self, driver):
+        """Rend un navigateur: session effacée, ou fermé si impossible"""
+        reusable = reset_browser_session(driver)
+        with self._condition:
+            keep = reusable and not self._closed
+            if keep:
+                self._idle.append(driver)
+            elif driver in self._drivers:
+                self._drivers.remove(driver)
+            self._condition.notify()
+        if not keep:
+            driver.quit()
+
+    def close(self):
+        """Ferme tous les navigateurs"""
+        with self._condition:
+            self._closed = True
+            drivers, self._drivers, self._idle = self._drivers, [], []
+            self._condition.notify_all()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def get_oauth_token_with_selenium(
+    username, password, headless=True, browser_profile="lean", browser_pool=None
+):
     """
     Utilise Selenium pour se connecter à Naviki et récupérer le token
     depuis localStorage
@@ -111,6 +748,10 @@ def get_oauth_token_with_selenium(username, password, headless=True):
         username: Login Naviki
         password: Mot de passe
         headless: Si True, navigateur invisible (plus rapide)
+        browser_profile: Profil Firefox, "lean" ou "full"
+            (voir build_firefox_options)
+        browser_pool: BrowserPool qui fournit le navigateur (sinon un
+            Firefox est lancé puis fermé pour cette connexion)
 
     Returns:
         Token OAuth d'accès
@@ -122,32 +763,29 @@ def get_oauth_token_with_selenium(username, password, headless=True):
         print("   Mode: Headless (invisible)")
     else:
         print("   Mode: Visible (vous verrez le navigateur)")
+    print(f"   Profil navigateur: {browser_profile}")
 
-    # Configuration de Firefox
-    options = Options()
-    if headless:
-        options.add_argument("--headless")
+    _load_selenium()
 
-    # Réduire les logs
-    options.set_preference("devtools.console.stdout.content", False)
+    # Configuration de Firefox (le pool a la sienne)
+    if browser_pool is None:
+        options = build_firefox_options(headless, browser_profile)
 
     driver = None
+    started = time.monotonic()
 
     try:
-        print("\n🌐 Ouverture du navigateur Firefox...")
-        driver = webdriver.Firefox(options=options)
-        driver.set_page_load_timeout(30)
+        if browser_pool is not None:
+            print("\n🌐 Navigateur Firefox du pool...")
+            driver = browser_pool.acquire()
+        else:
+            print("\n🌐 Ouverture du navigateur Firefox...")
+            driver = webdriver.Firefox(options=options)
+            driver.set_page_load_timeout(30)
 
         # Étape 1: Aller sur la page OAuth2
         print("\n📋 Étape 1: Chargement de la page de connexion OAuth2...")
-        oauth_url = (
-            "https://www.naviki.org/oauth2/auth?lang=fr"
-            "&redirect_uri=https://www.naviki.org/fr/naviki/"
-            "single-pages/loading//mobile.html&client_id=web"
-            "&scope=way,profile,contest&response_type=code"
-        )
-
-        driver.get(oauth_url)
+        driver.get(oauth_authorize_url())
         print("   ✓ Page chargée")
 
         # Étape 2: Remplir le formulaire de connexion
@@ -155,9 +793,9 @@ def get_oauth_token_with_selenium(username, password, headless=True):
 
         try:
             # Attendre que le formulaire soit chargé
-            username_field = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.NAME, "username"))
-            )
+            username_field = WebDriverWait(
+                driver, 10, poll_frequency=SELENIUM_POLL_INTERVAL
+            ).until(EC.presence_of_element_located((By.NAME, "username")))
             password_field = driver.find_element(By.NAME, "password")
 
             # Remplir les champs
@@ -196,40 +834,25 @@ def get_oauth_token_with_selenium(username, password, headless=True):
         # et le token dans localStorage
         print("\n⏳ Étape 4: Attente du token dans localStorage...")
 
-        max_attempts = 20  # 20 secondes max
-        token = None
-
-        for attempt in range(max_attempts):
-            time.sleep(1)
-
-            # Essayer de récupérer le token depuis localStorage
-            try:
-                token = driver.execute_script("return localStorage.getItem('_n_a_at');")
-
-                if token:
-                    print(f"   ✓ Token récupéré: {token[:20]}...")
-                    break
-            except Exception:
-                pass
-
-            # Vérifier si on a une erreur de connexion
-            try:
-                page_text = driver.find_element(By.TAG_NAME, "body").text.lower()
-                if (
-                    "error" in page_text
-                    or "invalid" in page_text
-                    or "incorrect" in page_text
-                ):
-                    print(
-                        "   ✗ Erreur détectée dans la page - "
-                        "identifiants incorrects?"
-                    )
-                    break
-            except Exception:
-                pass
+        wait_started = time.monotonic()
+        try:
+            result = WebDriverWait(
+                driver, SELENIUM_TOKEN_TIMEOUT, poll_frequency=SELENIUM_POLL_INTERVAL
+            ).until(token_or_login_error)
+        except TimeoutException:
+            result = {}
 
-            if attempt % 5 == 0 and attempt > 0:
-                print(f"   ... tentative {attempt}/{max_attempts}")
+        token = result.get("token")
+        if token:
+            print(
+                f"   ✓ Token récupéré en {time.monotonic() - wait_started:.1f}s: "
+                f"{token[:20]}..."
+            )
+        elif result.get("error"):
+            print(
+                f"   ✗ Erreur affichée par la page: {result['error'][:80]} - "
+                "identifiants incorrects?"
+            )
 
         if not token:
             print("\n❌ Timeout: le token n'est pas apparu dans " "localStorage")
@@ -266,8 +889,45 @@ def get_oauth_token_with_selenium(username, password, headless=True):
 
     finally:
         if driver:
-            print("\n🔒 Fermeture du navigateur...")
-            driver.quit()
+            report_browser_usage(driver, started)
+            if browser_pool is not None:
+                browser_pool.release(driver)
+            else:
+                print("\n🔒 Fermeture du navigateur...")
+                driver.quit()
+
+
+def positive_int(value):
+    """Type argparse: entier strictement positif"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"entier attendu: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"doit être >= 1: {value}")
+    return number
+
+
+def positive_float(value):
+    """Type argparse: nombre strictement positif"""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"nombre attendu: {value!r}")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"doit être > 0: {value}")
+    return number
+
+
+def non_negative_int(value):
+    """Type argparse: entier positif ou nul"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"entier attendu: {value!r}")
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"doit être >= 0: {value}")
+    return number
 
 
 def parse_arguments():
@@ -285,6 +945,8 @@ Exemples:
   %(prog)s --username MonLogin --password monmdp --output ~/mes_traces
   %(prog)s --username MonLogin --password monmdp --headless
   %(prog)s  # Utilise les identifiants sauvegardés dans .env
+  %(prog)s --batch comptes.json --jobs 8  # Plusieurs comptes
+  %(prog)s --watch 30  # Synchronisation toutes les 30 minutes
 
 Note: Les identifiants peuvent être sauvegardés dans le fichier .env
       après une première authentification réussie.
@@ -307,6 +969,14 @@ Note: Les identifiants peuvent être sauvegardés dans le fichier .env
         default=env_vars.get("NAVIKI_TOKEN"),
         help="Token OAuth (si vous l'avez déjà)",
     )
+    auth_group.add_argument(
+        "--batch",
+        metavar="FICHIER",
+        help=(
+            "Synchroniser plusieurs comptes décrits dans un fichier JSON, "
+            "avec --jobs téléchargements au total pour tous les comptes"
+        ),
+    )
 
     parser.add_argument(
         "--password",
@@ -345,60 +1015,3589 @@ Note: Les identifiants peuvent être sauvegardés dans le fichier .env
         help="Sauvegarder les identifiants dans .env pour les prochaines fois",
     )
 
-    args = parser.parse_args()
-
-    # Vérifier qu'on a soit un token, soit username + password
-    if not args.token and not args.username:
-        parser.error(
-            "Vous devez fournir soit --token, soit --username/--password, "
-            "ou avoir des identifiants sauvegardés dans .env"
-        )
+    parser.add_argument(
+        "--auth-method",
+        choices=["auto", "http", "selenium"],
+        default="auto",
+        help=(
+            "Authentification: http (sans navigateur), selenium (Firefox), "
+            "ou auto: http puis selenium en cas d'échec (défaut)"
+        ),
+    )
 
-    # Validation: si username est fourni, password est requis
-    if args.username and not args.password:
-        parser.error("--password est requis quand --username est utilisé")
+    parser.add_argument(
+        "--browser-profile",
+        choices=["lean", "full"],
+        default="lean",
+        help=(
+            "Profil Firefox de la connexion Selenium: lean (sans images, "
+            "polices ni hôtes tiers, défaut) ou full (page complète)"
+        ),
+    )
 
-    # Par défaut headless sauf si --visible est spécifié
-    if not args.visible and not args.headless:
-        args.headless = True
+    parser.add_argument(
+        "--browser-pool",
+        type=positive_int,
+        metavar="N",
+        help=(
+            "--batch: connexions Selenium simultanées, sur N navigateurs "
+            "réutilisés d'un compte à l'autre (défaut: 2)"
+        ),
+    )
 
-    # Afficher si les identifiants proviennent de .env
+    parser.add_argument(
+        "--browser-memory",
+        type=positive_int,
+        metavar="MO",
+        help=(
+            "--batch: pas de navigateur supplémentaire au-delà de cette "
+            "mémoire totale des navigateurs, en Mo (défaut: 1024)"
+        ),
+    )
+
+    parser.add_argument(
+        "--no-token-cache",
+        action="store_true",
+        help=(
+            "Ne pas réutiliser ni sauvegarder le token OAuth "
+            f"({TOKEN_CACHE_FILENAME}): nouvelle authentification à chaque "
+            "lancement"
+        ),
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=positive_int,
+        default=4,
+        help="Nombre de téléchargements GPX en parallèle (défaut: 4)",
+    )
+
+    parser.add_argument(
+        "--engine",
+        choices=["sync", "async"],
+        default="sync",
+        help=(
+            "Moteur de téléchargement: sync (threads + requests, défaut) "
+            "ou async (asyncio + aiohttp)"
+        ),
+    )
+
+    parser.add_argument(
+        "--manifest",
+        help=(
+            "Base SQLite des itinéraires déjà synchronisés "
+            f"(défaut: <output>/{MANIFEST_FILENAME})"
+        ),
+    )
+
+    parser.add_argument(
+        "--no-manifest",
+        action="store_true",
+        help="Ne pas utiliser de manifeste (détection par nom de fichier seule)",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        nargs="?",
+        type=positive_int,
+        const=INCREMENTAL_DEFAULT_RUN,
+        metavar="N",
+        help=(
+            "Arrêter la pagination après N itinéraires consécutifs déjà "
+            "couverts par la dernière synchronisation complète sans erreur "
+            f"(défaut: {INCREMENTAL_DEFAULT_RUN})"
+        ),
+    )
+
+    parser.add_argument(
+        "--retries",
+        type=non_negative_int,
+        default=RETRY_DEFAULT,
+        metavar="N",
+        help=(
+            "Nouvelles tentatives par requête sur erreur transitoire "
+            f"(réseau, 429, 5xx) (défaut: {RETRY_DEFAULT})"
+        ),
+    )
+
+    parser.add_argument(
+        "--rate",
+        type=positive_float,
+        metavar="REQ/S",
+        help="Limiter le nombre de requêtes par seconde (défaut: pas de limite)",
+    )
+
+    parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        help=(
+            "Revérifier les itinéraires déjà synchronisés avec des requêtes "
+            "conditionnelles (ETag / Last-Modified) et mettre à jour ceux "
+            "qui ont changé"
+        ),
+    )
+
+    parser.add_argument(
+        "--api-url",
+        default=NAVIKI_API_URL,
+        metavar="URL",
+        help=(
+            "URL de l'API Naviki, par exemple celle d'un serveur de test "
+            f"(défaut: {NAVIKI_API_URL})"
+        ),
+    )
+
+    parser.add_argument(
+        "--compress",
+        choices=sorted(COMPRESSION_SUFFIXES),
+        help=(
+            "Stocker les GPX compressés (.gpx.gz ou .gpx.zst); zstd "
+            "nécessite zstandard. Les fichiers déjà présents, compressés "
+            "ou non, ne sont pas retéléchargés"
+        ),
+    )
+
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help=(
+            "Remplacer par un lien physique (hard link) tout GPX identique "
+            "à un GPX déjà exporté, métadonnées (<metadata>) exceptées"
+        ),
+    )
+
+    parser.add_argument(
+        "--archive",
+        metavar="FICHIER",
+        help=(
+            "Ajouter les GPX à une archive .zip ou .tar unique (complétée "
+            "d'une exécution à l'autre) au lieu de fichiers séparés"
+        ),
+    )
+
+    parser.add_argument(
+        "--simplify",
+        nargs="?",
+        type=positive_float,
+        const=SIMPLIFY_DEFAULT_TOLERANCE,
+        metavar="METRES",
+        help=(
+            "Écrire pour chaque GPX téléchargé une version simplifiée "
+            f"(*{SIMPLIFIED_SUFFIX}, Douglas-Peucker) à METRES près "
+            f"(défaut: {SIMPLIFY_DEFAULT_TOLERANCE:g}); nécessite numpy"
+        ),
+    )
+
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help=(
+            "Calculer distance, temps en mouvement, dénivelé, emprise et "
+            "horaires de chaque GPX dans le catalogue du manifeste (y "
+            "compris les GPX déjà synchronisés); nécessite numpy"
+        ),
+    )
+
+    parser.add_argument(
+        "--parquet",
+        metavar="DOSSIER",
+        help=(
+            "Ajouter les points de chaque trace (uuid, seq, time, lat, lon, ele) "
+            "à des fichiers Parquet partitionnés par année dans DOSSIER; "
+            "nécessite numpy et pyarrow"
+        ),
+    )
+
+    parser.add_argument(
+        "--geojson",
+        metavar="FICHIER",
+        help=(
+            "Ajouter chaque itinéraire (une Feature par ligne, GeoJSONSeq) "
+            "à une couche unique FICHIER, sans réécrire les précédents"
+        ),
+    )
+
+    parser.add_argument(
+        "--stats-report",
+        nargs="?",
+        type=positive_int,
+        const=0,
+        metavar="ANNÉE",
+        help=(
+            "Afficher les totaux par année du catalogue (--stats), sans "
+            "connexion ni téléchargement"
+        ),
+    )
+
+    parser.add_argument(
+        "--watch",
+        nargs="?",
+        type=positive_float,
+        const=WATCH_DEFAULT_INTERVAL,
+        metavar="MINUTES",
+        help=(
+            "Rester actif et resynchroniser (mode incrémental) toutes les "
+            f"MINUTES minutes (défaut: {WATCH_DEFAULT_INTERVAL}); "
+            "SIGUSR1 déclenche une synchronisation immédiate"
+        ),
+    )
+
+    args = parser.parse_args()
+
+    if args.watch:
+        if args.batch:
+            parser.error("--watch ne s'utilise pas avec --batch")
+        if args.no_manifest:
+            parser.error("--watch nécessite le manifeste (sans --no-manifest)")
+        if args.revalidate:
+            parser.error("--watch synchronise en mode incrémental (sans --revalidate)")
+        if not args.incremental:
+            args.incremental = INCREMENTAL_DEFAULT_RUN
+
+    if args.incremental and args.no_manifest:
+        parser.error("--incremental nécessite le manifeste (sans --no-manifest)")
+
+    if args.revalidate and args.no_manifest:
+        parser.error("--revalidate nécessite le manifeste (sans --no-manifest)")
+
+    if args.revalidate and args.incremental:
+        parser.error(
+            "--revalidate parcourt toute la liste: incompatible avec --incremental"
+        )
+
+    if args.engine == "async" and importlib.util.find_spec("aiohttp") is None:
+        parser.error("--engine async nécessite aiohttp: pip install aiohttp")
+
+    if args.archive:
+        if pathlib.Path(args.archive).suffix.lower() not in ARCHIVE_FORMATS:
+            parser.error("--archive: extension .zip ou .tar attendue")
+        for option in (
+            "batch",
+            "revalidate",
+            "compress",
+            "simplify",
+            "stats",
+            "parquet",
+            "geojson",
+            "dedup",
+        ):
+            if getattr(args, option):
+                parser.error(f"--archive ne s'utilise pas avec --{option}")
+
+    if args.parquet and args.batch:
+        parser.error("--parquet: un dossier par compte, sans --batch")
+    if args.geojson and args.batch:
+        parser.error("--geojson: un fichier par compte, sans --batch")
+
+    for option in ("stats", "dedup"):
+        if getattr(args, option) and args.no_manifest:
+            parser.error(f"--{option} nécessite le manifeste (sans --no-manifest)")
+
+    if args.dedup and args.compress:
+        parser.error("--dedup lie des GPX bruts: incompatible avec --compress")
+
+    for option in ("simplify", "stats", "parquet"):
+        if getattr(args, option) and importlib.util.find_spec("numpy") is None:
+            parser.error(f"--{option} nécessite numpy: pip install numpy")
+
+    if args.parquet and importlib.util.find_spec("pyarrow") is None:
+        parser.error("--parquet nécessite pyarrow: pip install pyarrow")
+
+    if args.compress == "zstd" and importlib.util.find_spec("zstandard") is None:
+        parser.error("--compress zstd nécessite zstandard: pip install zstandard")
+
+    # Par défaut headless sauf si --visible est spécifié
+    if not args.visible and not args.headless:
+        args.headless = True
+
+    if args.batch:
+        if args.engine == "async":
+            parser.error("--batch utilise le moteur sync (sans --engine async)")
+        if args.manifest:
+            parser.error("--manifest: en mode --batch, à définir par compte")
+        try:
+            args.accounts = load_batch_config(args.batch, args.output, args.types)
+        except ValueError as e:
+            parser.error(f"--batch {args.batch}: {e}")
+        return args
+
+    # Lecture du catalogue seule: pas d'authentification
+    if args.stats_report is not None:
+        return args
+
+    # Vérifier qu'on a soit un token, soit username + password
+    if not args.token and not args.username:
+        parser.error(
+            "Vous devez fournir soit --token, soit --username/--password, "
+            "ou avoir des identifiants sauvegardés dans .env"
+        )
+
+    # Validation: si username est fourni, password est requis
+    if args.username and not args.password:
+        parser.error("--password est requis quand --username est utilisé")
+
+    # Afficher si les identifiants proviennent de .env
     if env_vars.get("NAVIKI_USERNAME") and not any(
         arg in sys.argv for arg in ["--username", "--login", "--token"]
     ):
         print("🔑 Utilisation des identifiants depuis .env")
 
-    return args
+    return args
+
+
+NAVIKI_BASE_URL = "https://www.naviki.org"
+NAVIKI_API_URL = f"{NAVIKI_BASE_URL}/naviki/api/v6"
+
+# Connexion Selenium: attente du token (vérifié toutes les
+# SELENIUM_POLL_INTERVAL secondes) et messages d'erreur du formulaire
+SELENIUM_TOKEN_TIMEOUT = 20
+SELENIUM_POLL_INTERVAL = 0.1
+LOGIN_ERROR_SELECTOR = ".error, .alert-danger, .alert-error, [role='alert']"
+# Profil Firefox "lean" de la connexion: pas d'images, de médias ni de
+# polices web, pas de cache disque, de restauration de session, de
+# préchargements ni de télémétrie
+LEAN_FIREFOX_PREFS = {
+    "permissions.default.image": 2,
+    "media.autoplay.default": 5,
+    "media.autoplay.blocking_policy": 2,
+    "media.peerconnection.enabled": False,
+    "browser.display.use_document_fonts": 0,
+    "gfx.downloadable_fonts.enabled": False,
+    "browser.cache.disk.enable": False,
+    "browser.cache.offline.enable": False,
+    "browser.sessionstore.resume_from_crash": False,
+    "browser.sessionstore.max_tabs_undo": 0,
+    "browser.sessionhistory.max_entries": 2,
+    "network.prefetch-next": False,
+    "network.dns.disablePrefetch": True,
+    "network.http.speculative-parallel-limit": 0,
+    "browser.safebrowsing.malware.enabled": False,
+    "browser.safebrowsing.phishing.enabled": False,
+    "datareporting.healthreport.uploadEnabled": False,
+    "toolkit.telemetry.enabled": False,
+    "app.update.enabled": False,
+}
+
+# Hôtes tiers (statistiques, publicité, polices) bloqués par le profil
+# "lean": la page de connexion n'en a pas besoin
+SELENIUM_BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "fonts.googleapis.com",
+    "fonts.gstatic.com",
+    "facebook.net",
+    "facebook.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "matomo.cloud",
+    "youtube.com",
+    "ytimg.com",
+)
+
+# Pool de navigateurs des connexions --batch: nombre maximal de Firefox
+# ouverts et mémoire totale (RSS) à ne pas dépasser en en lançant un autre
+BROWSER_POOL_SIZE = 2
+BROWSER_MEMORY_BUDGET_MB = 1024
+# Efface la session d'un navigateur rendu au pool (les cookies sont
+# supprimés par WebDriver)
+RESET_SESSION_SCRIPT = "localStorage.clear(); sessionStorage.clear();"
+
+TOKEN_PROBE_SCRIPT = """
+var token = localStorage.getItem('_n_a_at');
+if (token) { return {token: token}; }
+var error = document.querySelector(arguments[0]);
+if (error && error.offsetParent !== null && error.textContent.trim()) {
+    return {error: error.textContent.trim()};
+}
+return null;
+"""
+
+# Client OAuth2 de l'application web Naviki
+OAUTH_CLIENT_ID = "web"
+OAUTH_SCOPE = "way,profile,contest"
+OAUTH_REDIRECT_URI = f"{NAVIKI_BASE_URL}/fr/naviki/single-pages/loading//mobile.html"
+OAUTH_HTTP_TIMEOUT = 15
+OAUTH_MAX_REDIRECTS = 10
+OAUTH_USER_AGENT = "naviki-gpx-exporter"
+
+# Taille de la file entre la pagination et les workers, par worker:
+# assez pour précharger la page suivante, assez petit pour garder une
+# mémoire constante quelle que soit la taille du compte
+PIPELINE_QUEUE_PER_JOB = 2
+
+# Token OAuth en cache (JSON, permissions 600), à côté du fichier .env:
+# réutilisé tant que l'API l'accepte, au plus TOKEN_CACHE_MAX_AGE secondes
+TOKEN_CACHE_FILENAME = ".naviki_token"
+TOKEN_CACHE_MAX_AGE = 30 * 24 * 3600
+TOKEN_VALIDATION_TIMEOUT = 10
+
+# Manifeste de synchronisation, créé dans le dossier de sortie par défaut
+MANIFEST_FILENAME = ".naviki-manifest.sqlite3"
+
+# Téléchargement GPX en flux: taille des morceaux, et marqueurs vérifiés
+# en début et en fin de fichier avant de le mettre en place
+GPX_CHUNK_SIZE = 64 * 1024
+GPX_HEADER = b"<?xml"
+GPX_FOOTER = b"</gpx>"
+GPX_TAIL_SIZE = 64
+
+# Stockage compressé (--compress): suffixe ajouté au nom .gpx et niveau
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+COMPRESSION_LEVELS = {"gzip": 6, "zstd": 10}
+# Threads de compression par export (zlib et zstd libèrent le GIL)
+COMPRESSION_WORKERS = min(4, os.cpu_count() or 1)
+
+# Formats de --archive (ajout en fin d'archive d'une exécution à l'autre)
+ARCHIVE_FORMATS = {".zip": "zip", ".tar": "tar"}
+ARCHIVE_ZIP_LEVEL = 6
+
+# Simplification des traces (--simplify): tolérance par défaut en mètres
+# et fichier produit à côté du GPX
+SIMPLIFY_DEFAULT_TOLERANCE = 5.0
+SIMPLIFIED_SUFFIX = ".simplified.gpx"
+# Processus de calcul sur les traces (--simplify, --stats)
+TRACK_WORKERS = os.cpu_count() or 1
+GPX_POINT_TAGS = ("trkpt", "rtept")
+EARTH_RADIUS_M = 6371008.8
+# Statistiques (--stats): vitesse à partir de laquelle on est en mouvement
+MOVING_SPEED_MIN = 0.5  # m/s
+# Points des traces en Parquet (--parquet): points par groupe de lignes
+PARQUET_ROW_GROUP_ROWS = 64 * 1024
+# Points gardés en mémoire par année avant tri spatial et écriture
+PARQUET_BUFFER_ROWS = 16 * PARQUET_ROW_GROUP_ROWS
+# Tri spatial: bandes de latitude de cette hauteur, puis longitude
+PARQUET_BAND_DEGREES = 0.1
+# Métadonnées ignorées par l'empreinte de contenu (--dedup): nom, date
+# d'export... changent d'un type d'itinéraire à l'autre pour une même trace
+GPX_METADATA_RE = re.compile(
+    rb"<metadata\b[^>]*/>|<metadata\b.*?</metadata>", re.DOTALL
+)
+# Début des lignes écrites par route_feature (--geojson)
+GEOJSON_FEATURE_PREFIX = b'{"type":"Feature","id":"'
+# Colonnes du catalogue way_stats du manifeste (hors uuid et computed_at)
+STATS_COLUMNS = (
+    "points",
+    "distance_m",
+    "moving_time_s",
+    "elevation_gain_m",
+    "elevation_loss_m",
+    "min_lat",
+    "min_lon",
+    "max_lat",
+    "max_lon",
+    "start_time",
+    "end_time",
+)
+
+# Mode incrémental: nombre d'itinéraires déjà connus consécutifs
+# (tri crdateDesc) à partir duquel la pagination s'arrête
+INCREMENTAL_DEFAULT_RUN = 20
+
+# Mode --watch: intervalle par défaut entre deux synchronisations (minutes)
+# et variation aléatoire de cet intervalle (±10%)
+WATCH_DEFAULT_INTERVAL = 60
+WATCH_JITTER = 0.1
+
+# Résultat de download_way() pour un GPX inchangé (requête conditionnelle)
+NOT_MODIFIED = "not_modified"
+
+# Nouvelles tentatives sur erreur transitoire (réseau, 429, 5xx):
+# backoff exponentiel avec jitter, plafonné, et Retry-After respecté
+# jusqu'à RETRY_AFTER_MAX secondes
+RETRY_DEFAULT = 4
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 30.0
+RETRY_AFTER_MAX = 120.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+THROTTLE_STATUSES = frozenset({429, 503})
+
+# Résultats de ExportContext.claim()
+CLAIMED = "claimed"
+ALREADY_EXISTS = "exists"
+IN_PROGRESS = "in_progress"
+
+# Multiple patterns to handle different date formats
+patterns = [
+    # Format: 16/10/2025, 07:20 (slashes, 4-digit year with time)
+    # MOST COMMON
+    (
+        r"(?P<day>\d\d)/(?P<month>\d\d)/(?P<year>\d{4}), "
+        r"(?P<hour>\d\d):(?P<minute>\d\d)"
+    ),
+    # Format: 16.10.25, 07:20 (points, 2-digit year with time)
+    (
+        r"(?P<day>\d\d)\.(?P<month>\d\d)\.(?P<year>\d\d), "
+        r"(?P<hour>\d\d):(?P<minute>\d\d)"
+    ),
+    # Format: 16-10-2025, 07:20 (dashes, 4-digit year with time)
+    (
+        r"(?P<day>\d\d)-(?P<month>\d\d)-(?P<year>\d{4}), "
+        r"(?P<hour>\d\d):(?P<minute>\d\d)"
+    ),
+    # Format: 20250422 or Text-20250422 (compact date without time)
+    # negative lookahead to avoid partial matches
+    r"(?P<year>\d{4})(?P<month>\d\d)(?P<day>\d\d)(?![\d])",
+]
+# Nom de chaque format, dans l'ordre de patterns (TitleDate.source)
+PATTERN_SOURCES = ("slash", "dot", "dash", "compact")
+
+
+class SavedFile(NamedTuple):
+    """Fichier GPX écrit sur disque, avec les validateurs HTTP reçus"""
+
+    size: int
+    sha256: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class PendingDownload(NamedTuple):
+    """Téléchargement à effectuer (en-têtes conditionnels si revalidation)"""
+
+    save_path: pathlib.Path
+    headers: dict
+
+
+class TransientHTTPError(Exception):
+    """Réponse HTTP à réessayer (429, 5xx)"""
+
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RetryPolicy(NamedTuple):
+    """Nombre de nouvelles tentatives et paramètres du backoff"""
+
+    retries: int = RETRY_DEFAULT
+    backoff: float = RETRY_BACKOFF_BASE
+    backoff_max: float = RETRY_BACKOFF_MAX
+
+    def delay(self, attempt):
+        """
+        Backoff exponentiel avec jitter complet: les workers en échec en
+        même temps ne reviennent pas tous au même instant
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2**attempt))
+
+
+class RateLimiter:
+    """
+    Limiteur de débit à seau de jetons, partagé par tous les workers
+
+    Chaque requête prend un jeton; le seau se remplit de `rate` jetons par
+    seconde jusqu'à `burst`. Sans `rate`, seules les pauses imposées par le
+    serveur (Retry-After, voir hold()) s'appliquent.
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate or 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._not_before = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """
+        Prend un jeton (éventuellement à crédit)
+
+        Returns:
+            Délai à attendre avant d'envoyer la requête, en secondes
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._not_before - now)
+            if self.rate:
+                elapsed = now - self._updated
+                self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                self._updated = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.rate)
+            return wait
+
+    def acquire(self):
+        """Attend (thread) qu'une requête puisse partir"""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Équivalent asynchrone de acquire()"""
+        import asyncio
+
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def hold(self, seconds):
+        """Suspend toutes les requêtes pendant `seconds` (Retry-After)"""
+        with self._lock:
+            self._not_before = max(self._not_before, time.monotonic() + seconds)
+
+
+def parse_retry_after(value):
+    """
+    Délai d'un en-tête Retry-After (secondes ou date HTTP)
+
+    Returns:
+        Délai en secondes, plafonné à RETRY_AFTER_MAX, ou None si absent
+        ou illisible
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+            seconds = (when - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX)
+
+
+def raise_for_transient(status, headers):
+    """Lève TransientHTTPError si la réponse doit être réessayée"""
+    if status in RETRY_STATUSES:
+        raise TransientHTTPError(status, parse_retry_after(headers.get("Retry-After")))
+
+
+class SyncManifest:
+    """
+    Manifeste SQLite des itinéraires déjà synchronisés, indexé par UUID
+
+    Les UUID connus sont chargés en mémoire à l'ouverture: un itinéraire
+    déjà présent est ignoré sans calcul de nom ni accès au disque.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+            """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ways (
+                uuid TEXT PRIMARY KEY,
+                crdate INTEGER,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                downloaded_at INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )
+            """)
+        # Catalogue de statistiques des traces (--stats)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS way_stats (
+                uuid TEXT PRIMARY KEY,
+                points INTEGER NOT NULL,
+                distance_m REAL NOT NULL,
+                moving_time_s REAL,
+                elevation_gain_m REAL,
+                elevation_loss_m REAL,
+                min_lat REAL,
+                min_lon REAL,
+                max_lat REAL,
+                max_lon REAL,
+                start_time INTEGER,
+                end_time INTEGER,
+                computed_at INTEGER NOT NULL
+            )
+            """)
+        # Empreintes de contenu des GPX (--dedup)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS way_content (
+                uuid TEXT PRIMARY KEY,
+                content_sha256 TEXT NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS way_content_sha256 "
+            "ON way_content (content_sha256)"
+        )
+        # Manifestes créés avant l'ajout des validateurs HTTP
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(ways)")}
+        for column in ("etag", "last_modified"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE ways ADD COLUMN {column} TEXT")
+        self._conn.commit()
+        self._known = {row[0] for row in self._conn.execute("SELECT uuid FROM ways")}
+
+    def __contains__(self, uuid):
+        return uuid in self._known
+
+    def __len__(self):
+        return len(self._known)
+
+    def record(self, way, filename, saved):
+        """
+        Enregistre un itinéraire synchronisé
+
+        Args:
+            way: Itinéraire renvoyé par findUserWaysByFilter
+            filename: Nom du fichier GPX dans le dossier de sortie
+            saved: SavedFile (taille, empreinte SHA-256, validateurs HTTP)
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ways "
+                "(uuid, crdate, filename, size, sha256, downloaded_at, "
+                "etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    way["uuid"],
+                    way.get("crdate"),
+                    filename,
+                    saved.size,
+                    saved.sha256,
+                    int(time.time()),
+                    saved.etag,
+                    saved.last_modified,
+                ),
+            )
+            self._conn.commit()
+            self._known.add(way["uuid"])
+
+    def lookup(self, uuid):
+        """
+        Returns:
+            (filename, etag, last_modified) d'un itinéraire connu, ou None
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT filename, etag, last_modified FROM ways WHERE uuid = ?",
+                (uuid,),
+            ).fetchone()
+
+    def record_stats(self, uuid, stats):
+        """
+        Enregistre (ou remplace) les statistiques d'un itinéraire
+
+        Args:
+            uuid: UUID de l'itinéraire
+            stats: dict des colonnes STATS_COLUMNS (track_stats)
+        """
+        columns = ", ".join(STATS_COLUMNS)
+        placeholders = ", ".join("?" * (len(STATS_COLUMNS) + 2))
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO way_stats (uuid, {columns}, computed_at) "
+                f"VALUES ({placeholders})",
+                (
+                    uuid,
+                    *(stats[column] for column in STATS_COLUMNS),
+                    int(time.time()),
+                ),
+            )
+            self._conn.commit()
+
+    def update_file_hash(self, uuid, saved):
+        """Met à jour taille et SHA-256 d'un fichier remplacé (--dedup)"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ways SET size = ?, sha256 = ? WHERE uuid = ?",
+                (saved.size, saved.sha256, uuid),
+            )
+            self._conn.commit()
+
+    def record_content(self, uuid, content_sha256):
+        """Enregistre l'empreinte de contenu (content_key) d'un itinéraire"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO way_content (uuid, content_sha256) "
+                "VALUES (?, ?)",
+                (uuid, content_sha256),
+            )
+            self._conn.commit()
+
+    def same_content(self, content_sha256, uuid):
+        """
+        Returns:
+            [filename] des autres itinéraires ayant cette empreinte de contenu
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT w.filename FROM way_content c JOIN ways w USING (uuid) "
+                "WHERE c.content_sha256 = ? AND c.uuid != ?",
+                (content_sha256, uuid),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def missing_content(self):
+        """
+        Returns:
+            [(uuid, filename)] des itinéraires sans empreinte de contenu
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT uuid, filename FROM ways "
+                "WHERE uuid NOT IN (SELECT uuid FROM way_content)"
+            ).fetchall()
+
+    def synced_ways(self):
+        """
+        Returns:
+            [(uuid, filename, crdate)] de tous les itinéraires synchronisés
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT uuid, filename, crdate FROM ways"
+            ).fetchall()
+
+    def missing_stats(self):
+        """
+        Returns:
+            [(uuid, filename)] des itinéraires sans statistiques
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT uuid, filename FROM ways "
+                "WHERE uuid NOT IN (SELECT uuid FROM way_stats)"
+            ).fetchall()
+
+    def stats_by_year(self, year=None):
+        """
+        Totaux du catalogue par année (date de départ de la trace, ou à
+        défaut date de création de l'itinéraire)
+
+        Args:
+            year: Limiter à cette année
+
+        Returns:
+            [(année ou None, traces, distance m, temps en mouvement s,
+            dénivelé positif m)] par année croissante
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT strftime('%Y', COALESCE(s.start_time, w.crdate), "
+                "'unixepoch') AS year, COUNT(*), SUM(s.distance_m), "
+                "SUM(s.moving_time_s), SUM(s.elevation_gain_m) "
+                "FROM way_stats s LEFT JOIN ways w USING (uuid) "
+                "GROUP BY year HAVING ? IS NULL OR year = ? ORDER BY year",
+                (year, year and str(year)),
+            ).fetchall()
+
+    @property
+    def high_water_crdate(self):
+        """crdate la plus récente de la dernière synchronisation complète"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM sync_state WHERE key = 'high_water_crdate'"
+            ).fetchone()
+        return int(row[0]) if row else None
+
+    def update_high_water(self, crdate):
+        """Avance le high-water crdate (il ne recule jamais)"""
+        previous = self.high_water_crdate
+        if previous is not None and previous >= crdate:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) "
+                "VALUES ('high_water_crdate', ?)",
+                (str(crdate),),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def stored_variants(path):
+    """Noms possibles d'un GPX sur disque: brut puis compressés"""
+    return [path] + [
+        path.with_name(path.name + suffix) for suffix in COMPRESSION_SUFFIXES.values()
+    ]
+
+
+def find_stored(path):
+    """
+    Returns:
+        Le fichier présent pour ce GPX (brut, .gz ou .zst), ou None
+    """
+    for variant in stored_variants(path):
+        if variant.exists():
+            return variant
+    return None
+
+
+def raw_gpx_path(path):
+    """Chemin du GPX brut correspondant à un fichier éventuellement compressé"""
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if path.name.endswith(suffix):
+            return path.with_name(path.name[: -len(suffix)])
+    return path
+
+
+def open_stored_gpx(path):
+    """Ouvre en lecture binaire un GPX stocké, en le décompressant"""
+    if path.name.endswith(COMPRESSION_SUFFIXES["gzip"]):
+        import gzip
+
+        return gzip.open(path, "rb")
+    if path.name.endswith(COMPRESSION_SUFFIXES["zstd"]):
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+    return open(path, "rb")
+
+
+def hash_file(path):
+    """
+    Calcule le SavedFile d'un fichier déjà présent sur disque
+
+    Taille et empreinte portent sur le GPX décompressé, comme pour un
+    téléchargement.
+    """
+    with open_stored_gpx(path) as f:
+        return hash_stream(f)
+
+
+def hash_stream(f):
+    """SavedFile du contenu d'un fichier ouvert en lecture binaire"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: f.read(1 << 16), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    return SavedFile(size, digest.hexdigest())
+
+
+def content_key(path):
+    """
+    Empreinte SHA-256 du contenu d'un GPX, sans son bloc <metadata>
+
+    La même trace obtenue sous deux types d'itinéraire (routedAll,
+    recordedMy...) a la même empreinte.
+    """
+    with open_stored_gpx(path) as f:
+        data = f.read()
+    return hashlib.sha256(GPX_METADATA_RE.sub(b"", data)).hexdigest()
+
+
+class ContentIndex:
+    """
+    Index des GPX par empreinte de contenu (--dedup)
+
+    Les empreintes des synchronisations précédentes sont dans la table
+    way_content du manifeste; celles de l'exécution en cours sont aussi
+    gardées en mémoire, pour deux doublons téléchargés en même temps.
+    """
+
+    def __init__(self, manifest, output_dir):
+        self.manifest = manifest
+        self.output_dir = output_dir
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def claim(self, uuid, path):
+        """
+        Enregistre l'empreinte du GPX `path`
+
+        Returns:
+            Un fichier déjà présent au contenu identique, ou None
+        """
+        key = content_key(path)
+        with self._lock:
+            original = self._paths.get(key)
+            if original is None:
+                for filename in self.manifest.same_content(key, uuid):
+                    candidate = self.output_dir.joinpath(filename)
+                    if candidate != path and candidate.exists():
+                        original = candidate
+                        break
+            if original is None:
+                self._paths[key] = path
+            self.manifest.record_content(uuid, key)
+        return original
+
+
+def link_duplicate(ctx, uuid, path):
+    """
+    Remplace un GPX par un lien physique vers un GPX identique déjà
+    exporté (--dedup)
+
+    Sans prise en charge des liens physiques (système de fichiers,
+    autre volume), le GPX reste une copie.
+
+    Returns:
+        SavedFile du fichier lié (le contenu de l'original, dont les
+        métadonnées diffèrent), ou None si `path` n'a pas été remplacé
+    """
+    original = ctx.dedup.claim(uuid, path)
+    if original is None or os.path.samefile(original, path):
+        return None
+    size = path.stat().st_size
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.link")
+    try:
+        os.link(original, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        tmp_path.unlink(missing_ok=True)
+        print(f"⚠️  {path.name} identique à {original.name}, non lié: {e}")
+        return None
+    ctx.count("dedup_count")
+    ctx.count("dedup_bytes", size)
+    return hash_file(path)
+
+
+class ExportContext:
+    """
+    État partagé par les workers de téléchargement d'un export
+
+    Les compteurs et la réservation des noms de fichiers sont protégés
+    par un verrou: deux itinéraires qui produisent le même nom ne sont
+    téléchargés qu'une seule fois, comme en mode séquentiel.
+    """
+
+    def __init__(
+        self,
+        session,
+        oauth_token,
+        output_dir,
+        api_url=NAVIKI_API_URL,
+        manifest=None,
+        incremental=None,
+        revalidate=False,
+        retry_policy=None,
+        rate_limiter=None,
+        download_slots=None,
+        compression=None,
+        archive=None,
+        tracks=None,
+        parquet=None,
+        layer=None,
+        dedup=None,
+    ):
+        self.session = session
+        self.oauth_token = oauth_token
+        self.output_dir = output_dir
+        self.api_url = api_url
+        self.manifest = manifest
+        self.revalidate = revalidate
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        # Sémaphore partagé entre comptes en mode --batch (budget global),
+        # tenu pendant chaque requête de téléchargement
+        self.download_slots = download_slots or contextlib.nullcontext()
+        # CompressionStage de --compress, ou None (GPX bruts)
+        self.compression = compression
+        # GpxArchive de --archive, ou None (fichiers dans output_dir)
+        self.archive = archive
+        # TrackStage de --simplify / --stats, ou None
+        self.tracks = tracks
+        # ParquetSink de --parquet, ou None
+        self.parquet = parquet
+        # GeoJsonLayer de --geojson, ou None
+        self.layer = layer
+        # ContentIndex de --dedup, ou None
+        self.dedup = dedup
+        self.success_count = 0
+        self.error_count = 0
+        self.skipped_count = 0
+        self.unchanged_count = 0
+        # Nouvelles tentatives, dont celles demandées par le serveur (429/503)
+        self.retry_count = 0
+        self.throttled_count = 0
+        # Volume transféré: octets reçus sur le réseau et octets de GPX
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self.compressed_count = 0
+        # Taille sur disque des GPX compressés par --compress
+        self.stored_bytes = 0
+        # Traces simplifiées par --simplify et leurs points
+        self.simplified_count = 0
+        self.points_before = 0
+        self.points_after = 0
+        # Traces ajoutées au catalogue de statistiques (--stats)
+        self.stats_count = 0
+        # Traces ajoutées aux fichiers Parquet (--parquet)
+        self.parquet_ways = 0
+        self.parquet_points = 0
+        # Itinéraires ajoutés à la couche GeoJSON (--geojson)
+        self.layer_count = 0
+        # GPX remplacés par un lien vers un GPX identique (--dedup)
+        self.dedup_count = 0
+        self.dedup_bytes = 0
+        # Token refusé (401) par l'API: reconnexion nécessaire (--watch)
+        self.auth_failed = False
+        self._lock = threading.Lock()
+        self._claimed = set()
+
+        # Pagination (producteur uniquement, pas de verrou nécessaire)
+        self.incremental = incremental
+        self.listing_complete = False
+        self.max_crdate = None
+        self._high_water = manifest.high_water_crdate if incremental else None
+        self._known_run = 0
+
+    def observe_listed(self, way):
+        """
+        Suit les itinéraires listés pour la synchronisation incrémentale
+
+        Seuls les itinéraires antérieurs au high-water crdate comptent
+        comme déjà synchronisés: ce repère n'est enregistré qu'après une
+        synchronisation complète et sans erreur. Un itinéraire plus récent,
+        même présent dans le manifeste, peut précéder un trou laissé par
+        une synchronisation interrompue ou en erreur (liste parcourue du
+        plus récent au plus ancien). Sans high-water, toute la liste est
+        parcourue.
+
+        Returns:
+            True si la pagination doit s'arrêter (mode incrémental et
+            `incremental` itinéraires déjà synchronisés consécutifs)
+        """
+        crdate = way.get("crdate")
+        if crdate is not None and (self.max_crdate is None or crdate > self.max_crdate):
+            self.max_crdate = crdate
+
+        if not self.incremental or self._high_water is None:
+            return False
+
+        synced = crdate is not None and crdate <= self._high_water
+        self._known_run = self._known_run + 1 if synced else 0
+        return self._known_run >= self.incremental
+
+    @property
+    def download_dir(self):
+        """Dossier où les GPX sont écrits (celui de l'archive en attente)"""
+        return self.archive.staging_dir if self.archive else self.output_dir
+
+    def close_stages(self):
+        """Attend la fin des étapes après téléchargement et les ferme"""
+        # Les GPX compressés sont ensuite confiés aux calculs sur les traces
+        stages = (self.compression, self.archive, self.tracks, self.parquet)
+        for stage in stages + (self.layer,):
+            if stage is not None:
+                stage.close()
+
+    def count(self, counter, amount=1):
+        """Incrémente un compteur (success_count, error_count, ...)"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def count_transfer(self, content_encoding, wire_bytes, body_bytes):
+        """Comptabilise le volume d'une réponse GPX"""
+        with self._lock:
+            self.wire_bytes += wire_bytes
+            self.body_bytes += body_bytes
+            if content_encoding and content_encoding != "identity":
+                self.compressed_count += 1
+
+    def reserve(self, save_path):
+        """
+        Réserve un fichier existant à revalider
+
+        Returns:
+            False s'il est déjà en cours de traitement par un autre worker
+        """
+        with self._lock:
+            if save_path.name in self._claimed:
+                return False
+            self._claimed.add(save_path.name)
+            return True
+
+    def claim(self, save_path):
+        """
+        Réserve un fichier de destination
+
+        Returns:
+            CLAIMED si le fichier peut être téléchargé, ALREADY_EXISTS s'il
+            est déjà sur disque, IN_PROGRESS s'il est réservé par un autre
+            worker
+        """
+        with self._lock:
+            if save_path.name in self._claimed:
+                return IN_PROGRESS
+            if self.archive is not None and save_path.name in self.archive:
+                return ALREADY_EXISTS
+            if find_stored(save_path):
+                return ALREADY_EXISTS
+            self._claimed.add(save_path.name)
+            return CLAIMED
+
+    @property
+    def total_count(self):
+        return (
+            self.success_count
+            + self.skipped_count
+            + self.error_count
+            + self.unchanged_count
+        )
+
+
+class TitleDate(NamedTuple):
+    """Date (et heure éventuelle) extraite d'un titre d'itinéraire"""
+
+    year: str  # Toujours sur 4 chiffres
+    month: str
+    day: str
+    hour: Optional[str]  # None pour le format compact
+    minute: Optional[str]
+    source: str  # Format reconnu (PATTERN_SOURCES)
+
+
+class TitleParser:
+    """
+    Extrait la date des titres avec des expressions compilées une fois
+
+    Les formats de patterns sont essayés dans l'ordre, comme l'ancienne
+    boucle de re.search, mais sans passer par le cache de re à chaque appel
+    et en lisant les groupes par numéro en un seul m.group(). Pas de cache
+    des titres: un export analyse chaque titre une fois.
+    """
+
+    def __init__(self, sources=None):
+        """
+        Args:
+            sources: Couples (nom, expression) par priorité décroissante
+                (défaut: PATTERN_SOURCES et patterns)
+        """
+        if sources is None:
+            sources = zip(PATTERN_SOURCES, patterns)
+        self.formats = []
+        for name, pattern in sources:
+            regex = re.compile(pattern)
+            # Numéros des groupes présents (le format compact n'a pas d'heure)
+            fields = tuple(
+                regex.groupindex[field]
+                for field in TitleDate._fields[:5]
+                if field in regex.groupindex
+            )
+            self.formats.append((regex.search, fields, name))
+
+    def parse(self, title):
+        for search, fields, source in self.formats:
+            m = search(title)
+            if m is None:
+                continue
+            groups = m.group(*fields)
+            year = groups[0]
+            # Handle 2-digit or 4-digit year
+            if len(year) == 2:
+                year = "20" + year
+            if len(groups) == 3:
+                return TitleDate(year, groups[1], groups[2], None, None, source)
+            return TitleDate(year, groups[1], groups[2], groups[3], groups[4], source)
+        return None
+
+
+TITLE_PARSER = TitleParser()
+
+
+def build_filename(way):
+    """
+    Calcule le nom du fichier GPX à partir du titre de l'itinéraire
+
+    Args:
+        way: Itinéraire renvoyé par findUserWaysByFilter
+
+    Returns:
+        Nom du fichier, ou None si aucune date n'a pu être extraite
+    """
+    title = way["title"]
+    parsed = TITLE_PARSER.parse(title)
+
+    if parsed is None:
+        # Fallback: use crdate timestamp with timezone awareness
+        # Check if title looks like a place name
+        # (contains letters/spaces)
+        if any(c.isalpha() for c in title) and not any(c.isdigit() for c in title[:4]):
+            print(
+                f"ℹ️  Titre personnalisé détecté "
+                f"('{title[:30]}...'), utilisation de crdate"
+            )
+        else:
+            print(
+                f"⚠️  Format de date non standard dans "
+                f"'{title}', utilisation de crdate"
+            )
+
+        if "crdate" not in way:
+            return None
+
+        # Use timezone-aware datetime
+        # (crdate is UTC timestamp)
+        dt = datetime.fromtimestamp(way["crdate"], tz=timezone.utc)
+        # Use sanitized title as prefix if it's short
+        # and has no special chars
+        safe_title = re.sub(r"[^\w\-]", "_", title)[:30]
+        if len(safe_title) > 3 and safe_title != title:
+            return f"{dt.strftime('%Y-%m-%d_%H-%M')}_UTC_" f"{safe_title}.gpx"
+        return dt.strftime("%Y-%m-%d_%H-%M") + "_UTC_Naviki.gpx"
+
+    date = f"{parsed.year}-{parsed.month}-{parsed.day}"
+    if parsed.hour is not None:
+        return f"{date}_{parsed.hour}-{parsed.minute}_Naviki.gpx"
+
+    # No time in the title (e.g., compact format 20241124): use crdate
+    if "crdate" in way:
+        dt = datetime.fromtimestamp(way["crdate"], tz=timezone.utc)
+        return f"{date}_{dt.strftime('%H-%M')}_UTC_Naviki.gpx"
+    return f"{date}_Naviki.gpx"
+
+
+def listing_url(ctx, route_types, offset, timestamp):
+    """URL d'une page de findUserWaysByFilter (tri par date décroissante)"""
+    return (
+        f"{ctx.api_url}/Way/2/"
+        f"findUserWaysByFilter/?filter={route_types}"
+        f"&sort=crdateDesc&offset={offset}&fullDataSet=0"
+        f"&_={timestamp}"
+    )
+
+
+def download_form(ctx, uuid):
+    """Formulaire POST de wayToFileWithUser (le token est passé ici)"""
+    return {
+        "wayUuid": uuid,
+        "oauth_token": ctx.oauth_token,
+        "format": "gpx",
+    }
+
+
+def report_listing_error(error):
+    """Affiche l'erreur d'une page de liste en échec (status ou exception)"""
+    if isinstance(error, Exception):
+        print(f"❌ Liste interrompue après plusieurs tentatives: {error}")
+        return
+    print(f"❌ Erreur API: {error}")
+    if error == 401:
+        print("⚠️  Token invalide ou expiré. " "Veuillez vous reconnecter.")
+
+
+# Erreurs du moteur sync qui justifient une nouvelle tentative
+RETRYABLE_ERRORS = (
+    TransientHTTPError,
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+def async_retryable_errors():
+    """Erreurs du moteur async qui justifient une nouvelle tentative"""
+    import asyncio
+    import aiohttp
+
+    return (TransientHTTPError, aiohttp.ClientError, asyncio.TimeoutError)
+
+
+def schedule_retry(ctx, attempt, error, what):
+    """
+    Décide d'une nouvelle tentative après une erreur transitoire
+
+    Un Retry-After suspend toutes les requêtes via le limiteur partagé;
+    sinon seule la requête en échec attend (backoff avec jitter).
+
+    Args:
+        ctx: ExportContext partagé
+        attempt: Numéro de la tentative échouée (0 pour la première)
+        error: Exception levée par la tentative
+        what: Description de la requête pour les messages
+
+    Returns:
+        Délai à attendre avant de réessayer, ou None pour abandonner
+    """
+    policy = ctx.retry_policy
+    if attempt >= policy.retries:
+        return None
+
+    ctx.count("retry_count")
+    status = getattr(error, "status", None)
+    if status in THROTTLE_STATUSES:
+        ctx.count("throttled_count")
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        ctx.rate_limiter.hold(retry_after)
+        delay, wait = 0.0, retry_after
+    else:
+        delay = wait = policy.delay(attempt)
+    print(
+        f"🔁 {what}: {error} - nouvelle tentative "
+        f"{attempt + 1}/{policy.retries} dans {wait:.1f}s"
+    )
+    return delay
+
+
+def call_with_retry(ctx, what, func, *args):
+    """
+    Appelle func(*args) sous le limiteur de débit, en réessayant sur
+    RETRYABLE_ERRORS; la dernière erreur est relevée après abandon
+    """
+    attempt = 0
+    while True:
+        ctx.rate_limiter.acquire()
+        try:
+            return func(*args)
+        except RETRYABLE_ERRORS as e:
+            delay = schedule_retry(ctx, attempt, e, what)
+            if delay is None:
+                raise
+        time.sleep(delay)
+        attempt += 1
+
+
+async def call_with_retry_async(ctx, what, func, *args):
+    """Équivalent asynchrone de call_with_retry (func est une coroutine)"""
+    import asyncio
+
+    retryable = async_retryable_errors()
+    attempt = 0
+    while True:
+        await ctx.rate_limiter.acquire_async()
+        try:
+            return await func(*args)
+        except retryable as e:
+            delay = schedule_retry(ctx, attempt, e, what)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def compress_file(src, dst, method):
+    """
+    Compresse src vers dst en flux, de façon atomique (fichier temporaire
+    puis os.replace), comme GpxFileWriter
+    """
+    tmp_path = dst.with_name(f".{dst.name}.{os.getpid()}.part")
+    level = COMPRESSION_LEVELS[method]
+    try:
+        with open(src, "rb") as raw, open(tmp_path, "wb") as out:
+            if method == "gzip":
+                import gzip
+
+                # Nom d'origine dans l'en-tête, pas celui du temporaire
+                writer = gzip.GzipFile(src.name, "wb", compresslevel=level, fileobj=out)
+            else:
+                import zstandard
+
+                writer = zstandard.ZstdCompressor(level=level).stream_writer(
+                    out, closefd=False
+                )
+            with writer:
+                for chunk in iter(lambda: raw.read(GPX_CHUNK_SIZE), b""):
+                    writer.write(chunk)
+        os.replace(tmp_path, dst)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+class CompressionStage:
+    """
+    Threads de compression des GPX téléchargés (--compress)
+
+    Les workers de téléchargement déposent le GPX brut validé puis lui
+    confient la suite: ils repartent aussitôt sur le réseau pendant que la
+    compression a lieu ici. close() attend la fin des compressions.
+    """
+
+    def __init__(self, method, workers=None):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.method = method
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or COMPRESSION_WORKERS,
+            thread_name_prefix="naviki-compress",
+        )
+
+    def submit(self, func, *args):
+        self._executor.submit(func, *args)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def local_name(tag):
+    """Nom d'une balise XML sans son espace de noms"""
+    return tag.rpartition("}")[2]
+
+
+def project_local(lat, lon):
+    """
+    Projection équirectangulaire (mètres) autour de la latitude moyenne,
+    suffisante à l'échelle d'une trace pour des distances de tolérance
+
+    Args:
+        lat, lon: Tableaux NumPy en degrés
+
+    Returns:
+        Tableau (n, 2) des coordonnées x, y en mètres
+    """
+    import numpy as np
+
+    lat_rad = np.radians(lat)
+    x = EARTH_RADIUS_M * np.radians(lon) * np.cos(lat_rad.mean())
+    return np.column_stack((x, EARTH_RADIUS_M * lat_rad))
+
+
+def douglas_peucker(xy, tolerance):
+    """
+    Points conservés par Douglas-Peucker
+
+    Les sous-segments à traiter sont gérés par une pile (pas de récursion
+    sur les longues traces); pour chacun, les distances de tous ses points
+    au segment sont calculées d'un bloc avec NumPy.
+
+    Args:
+        xy: Tableau (n, 2) de coordonnées en mètres
+        tolerance: Écart maximal toléré, en mètres
+
+    Returns:
+        Masque booléen des points conservés (extrémités toujours incluses)
+    """
+    import numpy as np
+
+    keep = np.zeros(len(xy), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(xy) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = xy[end] - xy[start]
+        offsets = xy[start + 1 : end] - xy[start]
+        length2 = segment @ segment
+        if length2:
+            # Distance au segment (projection bornée à ses extrémités)
+            t = np.clip(offsets @ segment / length2, 0.0, 1.0)
+            offsets = offsets - np.outer(t, segment)
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            middle = start + 1 + farthest
+            keep[middle] = True
+            stack.append((start, middle))
+            stack.append((middle, end))
+    return keep
+
+
+def point_parents(root):
+    """Éléments GPX contenant des points: segments (trkseg) et routes (rte)"""
+    return [
+        element
+        for element in root.iter()
+        if any(local_name(child.tag) in GPX_POINT_TAGS for child in element)
+    ]
+
+
+def child_text(element, name):
+    """Texte du premier enfant `name` (sans espace de noms), ou None"""
+    for child in element:
+        if local_name(child.tag) == name:
+            return child.text
+    return None
+
+
+def parse_gpx_times(values):
+    """
+    Horodatages GPX (ISO 8601 UTC) en secondes depuis l'epoch
+
+    Returns:
+        Tableau NumPy, NaN pour les points sans heure (ou toute la trace
+        si un horodatage est illisible)
+    """
+    import numpy as np
+
+    stamps = np.full(len(values), np.nan)
+    present = [i for i, value in enumerate(values) if value]
+    if present:
+        try:
+            parsed = np.array(
+                [values[i].strip().removesuffix("Z") for i in present],
+                dtype="datetime64[ms]",
+            )
+        except ValueError:
+            return stamps
+        stamps[present] = parsed.astype("int64") / 1000
+    return stamps
+
+
+def track_stats(src):
+    """
+    Statistiques d'un GPX stocké (dans un processus du pool)
+
+    Les distances entre points consécutifs sont calculées par la formule
+    de haversine, d'un bloc pour tout un segment. Le temps en mouvement
+    cumule les intervalles parcourus à plus de MOVING_SPEED_MIN.
+
+    Returns:
+        dict des colonnes STATS_COLUMNS (None pour les valeurs absentes
+        du GPX: heures, altitudes)
+    """
+    import numpy as np
+    import xml.etree.ElementTree as ET
+
+    with open_stored_gpx(src) as f:
+        root = ET.parse(f).getroot()
+
+    distance = moving = gain = loss = 0.0
+    lats, lons, times = [], [], []
+    has_ele = False
+    for parent in point_parents(root):
+        points = [c for c in parent if local_name(c.tag) in GPX_POINT_TAGS]
+        lat = np.array([float(p.get("lat")) for p in points])
+        lon = np.array([float(p.get("lon")) for p in points])
+        ele = np.array([float(child_text(p, "ele") or "nan") for p in points])
+        time_ = parse_gpx_times([child_text(p, "time") for p in points])
+        lats.append(lat)
+        lons.append(lon)
+        times.append(time_)
+
+        phi, lam = np.radians(lat), np.radians(lon)
+        a = (
+            np.sin(np.diff(phi) / 2) ** 2
+            + np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(np.diff(lam) / 2) ** 2
+        )
+        steps = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        distance += steps.sum()
+
+        dt = np.diff(time_)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            moving += dt[(dt > 0) & (steps / dt >= MOVING_SPEED_MIN)].sum()
+
+        known = ele[~np.isnan(ele)]
+        has_ele = has_ele or known.size > 0
+        climb = np.diff(known)
+        gain += climb[climb > 0].sum()
+        loss -= climb[climb < 0].sum()
+
+    lat = np.concatenate(lats) if lats else np.empty(0)
+    lon = np.concatenate(lons) if lons else np.empty(0)
+    time_ = np.concatenate(times) if times else np.empty(0)
+    timed = time_[~np.isnan(time_)]
+    return {
+        "points": int(lat.size),
+        "distance_m": float(distance),
+        "moving_time_s": float(moving) if timed.size else None,
+        "elevation_gain_m": float(gain) if has_ele else None,
+        "elevation_loss_m": float(loss) if has_ele else None,
+        "min_lat": float(lat.min()) if lat.size else None,
+        "min_lon": float(lon.min()) if lon.size else None,
+        "max_lat": float(lat.max()) if lat.size else None,
+        "max_lon": float(lon.max()) if lon.size else None,
+        "start_time": int(timed.min()) if timed.size else None,
+        "end_time": int(timed.max()) if timed.size else None,
+    }
+
+
+def track_points(src):
+    """
+    Points d'un GPX stocké, en colonnes (dans un processus du pool)
+
+    Returns:
+        dict de tableaux NumPy: lat, lon, ele (NaN si absente) et time
+        (secondes depuis l'epoch, NaN si absente)
+    """
+    import numpy as np
+    import xml.etree.ElementTree as ET
+
+    with open_stored_gpx(src) as f:
+        root = ET.parse(f).getroot()
+    points = [
+        child
+        for parent in point_parents(root)
+        for child in parent
+        if local_name(child.tag) in GPX_POINT_TAGS
+    ]
+    return {
+        "lat": np.array([float(p.get("lat")) for p in points]),
+        "lon": np.array([float(p.get("lon")) for p in points]),
+        "ele": np.array([float(child_text(p, "ele") or "nan") for p in points]),
+        "time": parse_gpx_times([child_text(p, "time") for p in points]),
+    }
+
+
+def route_feature(src, uuid, properties):
+    """
+    Feature GeoJSON d'un GPX stocké (dans un processus du pool)
+
+    Un segment donne une LineString, plusieurs une MultiLineString.
+
+    Returns:
+        Feature JSON sur une ligne, identifiant `uuid` en tête, ou None
+        si le GPX n'a aucun segment d'au moins deux points
+    """
+    import xml.etree.ElementTree as ET
+
+    with open_stored_gpx(src) as f:
+        root = ET.parse(f).getroot()
+    lines = []
+    for parent in point_parents(root):
+        line = [
+            [float(child.get("lon")), float(child.get("lat"))]
+            for child in parent
+            if local_name(child.tag) in GPX_POINT_TAGS
+        ]
+        if len(line) >= 2:
+            lines.append(line)
+    if not lines:
+        return None
+    if len(lines) == 1:
+        geometry = {"type": "LineString", "coordinates": lines[0]}
+    else:
+        geometry = {"type": "MultiLineString", "coordinates": lines}
+    feature = {
+        "type": "Feature",
+        "id": uuid,
+        "properties": properties,
+        "geometry": geometry,
+    }
+    return json.dumps(feature, ensure_ascii=False, separators=(",", ":"))
+
+
+def simplify_gpx_file(src, dst, tolerance):
+    """
+    Écrit dst, version simplifiée du GPX src (dans un processus du pool)
+
+    Chaque segment de trace (trkseg) et chaque route (rte) est simplifié
+    par Douglas-Peucker; les autres éléments sont recopiés tels quels.
+
+    Returns:
+        (nombre de points avant, nombre de points après)
+    """
+    import numpy as np
+    import xml.etree.ElementTree as ET
+
+    with open_stored_gpx(src) as f:
+        tree = ET.parse(f)
+    root = tree.getroot()
+    if root.tag.startswith("{"):
+        # Espace de noms GPX par défaut, sans préfixe ns0: à l'écriture
+        ET.register_namespace("", root.tag[1:].partition("}")[0])
+
+    before = after = 0
+    for parent in point_parents(root):
+        children = list(parent)
+        points = [c for c in children if local_name(c.tag) in GPX_POINT_TAGS]
+        before += len(points)
+        if len(points) < 3:
+            after += len(points)
+            continue
+        lat = np.array([float(p.get("lat")) for p in points])
+        lon = np.array([float(p.get("lon")) for p in points])
+        keep = douglas_peucker(project_local(lat, lon), tolerance)
+        after += int(keep.sum())
+        removed = {id(p) for p, kept in zip(points, keep) if not kept}
+        parent[:] = [c for c in children if id(c) not in removed]
+
+    tmp_path = dst.with_name(f".{dst.name}.{os.getpid()}.part")
+    try:
+        tree.write(tmp_path, encoding="UTF-8", xml_declaration=True)
+        os.replace(tmp_path, dst)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return before, after
+
+
+def simplified_path(stored_path):
+    """Fichier simplifié d'un GPX (X.gpx, X.gpx.gz -> X.simplified.gpx)"""
+    raw = raw_gpx_path(stored_path)
+    return raw.with_name(raw.name.removesuffix(".gpx") + SIMPLIFIED_SUFFIX)
+
+
+class TrackStage:
+    """
+    Processus de calcul sur les GPX enregistrés (--simplify, --stats,
+    --parquet, --geojson)
+
+    L'analyse XML et les calculs NumPy sont confiés à un pool de
+    processus: submit() rend la main aussitôt, les téléchargements ne
+    l'attendent jamais. close() attend la fin des calculs.
+    """
+
+    def __init__(self, tolerance=None, stats=False, workers=None):
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.tolerance = tolerance
+        self.stats = stats
+        self._executor = ProcessPoolExecutor(max_workers=workers or TRACK_WORKERS)
+        # Processus lancés maintenant, avant les threads de téléchargement de
+        # cet export. Avec --batch et --watch, d'autres threads tournent déjà
+        # au fork (téléchargements, compression, pool de navigateurs): les
+        # processus n'exécutent que les calculs soumis ici (XML, NumPy, sans
+        # print, réseau ni SQLite), qui ne prennent aucun verrou de ces
+        # threads, et CPython réinitialise le verrou d'import après un fork
+        self._executor.submit(int)
+
+    def submit(self, ctx, way, stored_path):
+        """Traitements d'un GPX qui vient d'être enregistré"""
+        if self.tolerance:
+            self.simplify(ctx, stored_path)
+        if self.stats:
+            self.measure(ctx, way["uuid"], stored_path)
+        # Une trace déjà en Parquet (revalidée) n'y est pas ajoutée deux fois
+        if ctx.parquet is not None and way["uuid"] not in ctx.parquet:
+            self.extract(ctx, way["uuid"], way.get("crdate"), stored_path)
+        if ctx.layer is not None and way["uuid"] not in ctx.layer:
+            self.add_to_layer(ctx, way["uuid"], way.get("crdate"), stored_path)
+
+    def simplify(self, ctx, stored_path):
+        future = self._executor.submit(
+            simplify_gpx_file,
+            stored_path,
+            simplified_path(stored_path),
+            self.tolerance,
+        )
+        future.add_done_callback(
+            functools.partial(self._simplified, ctx, stored_path.name)
+        )
+
+    def measure(self, ctx, uuid, stored_path):
+        future = self._executor.submit(track_stats, stored_path)
+        future.add_done_callback(
+            functools.partial(self._measured, ctx, uuid, stored_path.name)
+        )
+
+    def extract(self, ctx, uuid, crdate, stored_path):
+        future = self._executor.submit(track_points, stored_path)
+        future.add_done_callback(
+            functools.partial(self._extracted, ctx, uuid, crdate, stored_path.name)
+        )
+
+    def add_to_layer(self, ctx, uuid, crdate, stored_path):
+        properties = {"file": raw_gpx_path(stored_path).name, "crdate": crdate}
+        future = self._executor.submit(route_feature, stored_path, uuid, properties)
+        future.add_done_callback(
+            functools.partial(self._layered, ctx, uuid, stored_path.name)
+        )
+
+    @staticmethod
+    def _simplified(ctx, name, future):
+        try:
+            before, after = future.result()
+        except Exception as e:
+            print(f"⚠️  Simplification impossible de {name}: {e}")
+            return
+        ctx.count("simplified_count")
+        ctx.count("points_before", before)
+        ctx.count("points_after", after)
+
+    @staticmethod
+    def _measured(ctx, uuid, name, future):
+        try:
+            stats = future.result()
+        except Exception as e:
+            print(f"⚠️  Statistiques impossibles pour {name}: {e}")
+            return
+        ctx.manifest.record_stats(uuid, stats)
+        ctx.count("stats_count")
+
+    @staticmethod
+    def _extracted(ctx, uuid, crdate, name, future):
+        try:
+            points = future.result()
+            ctx.parquet.add(uuid, crdate, points)
+        except Exception as e:
+            print(f"⚠️  Points de {name} non exportés en Parquet: {e}")
+            return
+        ctx.count("parquet_ways")
+        ctx.count("parquet_points", len(points["lat"]))
+
+    @staticmethod
+    def _layered(ctx, uuid, name, future):
+        try:
+            feature = future.result()
+            if feature is None:
+                print(f"⚠️  {name} sans segment: absent de la couche GeoJSON")
+                return
+            added = ctx.layer.add(uuid, feature)
+        except Exception as e:
+            print(f"⚠️  {name} non ajouté à la couche GeoJSON: {e}")
+            return
+        if added:
+            ctx.count("layer_count")
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class ParquetSink:
+    """
+    Points des traces en fichiers Parquet partitionnés par année (--parquet)
+
+    Colonnes uuid, seq (rang du point dans sa trace), time, lat, lon,
+    ele, dans directory/year=AAAA/ (une année par dossier,
+    partitionnement "hive"). Chaque exécution ajoute un fichier par
+    année. Les points sont accumulés par PARQUET_BUFFER_ROWS, triés par
+    bande de latitude puis longitude, et écrits par groupes de
+    PARQUET_ROW_GROUP_ROWS: chaque groupe couvre une petite emprise, ses
+    statistiques min/max permettent à une lecture filtrée sur une
+    emprise d'ignorer les autres groupes. Une trace se reconstitue en
+    triant ses points par seq.
+
+    Un fichier n'apparaît sous son nom qu'une fois complet (close()).
+    Les UUID déjà présents dans le dossier sont lus à l'ouverture.
+    """
+
+    def __init__(self, directory):
+        import pyarrow as pa
+
+        self.directory = directory
+        self.schema = pa.schema(
+            [
+                ("uuid", pa.string()),
+                ("seq", pa.int32()),
+                ("time", pa.timestamp("ms", tz="UTC")),
+                ("lat", pa.float64()),
+                ("lon", pa.float64()),
+                ("ele", pa.float32()),
+            ]
+        )
+        self._known = self._read_uuids()
+        self._pending = {}
+        self._writers = {}
+        # Unique même pour deux synchronisations --watch dans la même seconde
+        stamp = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+        self._run = f"{stamp}-{os.urandom(4).hex()}"
+        self._lock = threading.Lock()
+
+    def _read_uuids(self):
+        import pyarrow.parquet as pq
+
+        known = set()
+        for path in self.directory.glob("year=*/*.parquet"):
+            if not path.name.startswith("."):
+                column = pq.read_table(path, columns=["uuid"]).column("uuid")
+                known.update(column.unique().to_pylist())
+        return known
+
+    def __contains__(self, uuid):
+        return uuid in self._known
+
+    def add(self, uuid, crdate, points):
+        """
+        Ajoute les points d'une trace (résultat de track_points)
+
+        L'année est celle du premier point horodaté, ou à défaut la date
+        de création de l'itinéraire.
+        """
+        import numpy as np
+        import pyarrow as pa
+
+        times = points["time"]
+        timed = times[~np.isnan(times)]
+        stamp = timed[0] if timed.size else crdate or time.time()
+        year = datetime.fromtimestamp(stamp, timezone.utc).year
+        table = pa.table(
+            {
+                "uuid": pa.repeat(uuid, len(times)),
+                "seq": np.arange(len(times), dtype="int32"),
+                "time": pa.array(
+                    np.nan_to_num(times * 1000).astype("int64"),
+                    type=pa.timestamp("ms", tz="UTC"),
+                    mask=np.isnan(times),
+                ),
+                "lat": points["lat"],
+                "lon": points["lon"],
+                "ele": pa.array(
+                    points["ele"].astype("float32"), mask=np.isnan(points["ele"])
+                ),
+            },
+            schema=self.schema,
+        )
+        with self._lock:
+            self._known.add(uuid)
+            pending = self._pending.setdefault(year, [])
+            pending.append(table)
+            if sum(t.num_rows for t in pending) >= PARQUET_BUFFER_ROWS:
+                self._flush(year)
+
+    def _flush(self, year):
+        """Écrit les points en attente d'une année, triés spatialement"""
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tables = self._pending.pop(year, None)
+        if not tables:
+            return
+        if year not in self._writers:
+            partition = self.directory / f"year={year}"
+            partition.mkdir(parents=True, exist_ok=True)
+            path = partition / f"part-{self._run}.parquet"
+            tmp_path = partition / f".{path.name}.part"
+            writer = pq.ParquetWriter(tmp_path, self.schema, compression="zstd")
+            self._writers[year] = (writer, tmp_path, path)
+        table = pa.concat_tables(tables)
+        lat = table.column("lat").to_numpy()
+        band = np.floor(lat / PARQUET_BAND_DEGREES)
+        order = np.lexsort((table.column("lon").to_numpy(), band))
+        self._writers[year][0].write_table(
+            table.take(order), row_group_size=PARQUET_ROW_GROUP_ROWS
+        )
+
+    def close(self):
+        with self._lock:
+            for year in list(self._pending):
+                self._flush(year)
+            for writer, tmp_path, path in self._writers.values():
+                writer.close()
+                os.replace(tmp_path, path)
+            self._writers.clear()
+
+
+class GeoJsonLayer:
+    """
+    Couche unique de tous les itinéraires (--geojson)
+
+    GeoJSON ligne par ligne (GeoJSONSeq, lu par QGIS, ogr2ogr ou
+    tippecanoe): une Feature par ligne, ajoutée en fin de fichier, les
+    précédentes ne sont jamais réécrites. À l'ouverture, le fichier est
+    parcouru ligne par ligne pour connaître les identifiants déjà
+    présents; une dernière ligne incomplète (arrêt brutal) est retirée.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._known = set()
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a+b")
+        self._scan()
+
+    def _scan(self):
+        self._file.seek(0)
+        complete = 0
+        for line in self._file:
+            if not line.endswith(b"\n"):
+                break
+            complete += len(line)
+            if line.strip():
+                self._known.add(self.feature_id(line))
+        self._file.truncate(complete)
+
+    @staticmethod
+    def feature_id(line):
+        """Identifiant d'une ligne, sans décoder toute la géométrie"""
+        if line.startswith(GEOJSON_FEATURE_PREFIX):
+            start = len(GEOJSON_FEATURE_PREFIX)
+            return line[start : line.index(b'"', start)].decode()
+        return json.loads(line).get("id")
+
+    def __contains__(self, uuid):
+        return uuid in self._known
+
+    def add(self, uuid, feature):
+        """
+        Ajoute une Feature (résultat de route_feature)
+
+        Returns:
+            False si l'itinéraire est déjà dans la couche
+        """
+        with self._lock:
+            if uuid in self._known:
+                return False
+            self._file.write(feature.encode() + b"\n")
+            self._file.flush()
+            self._known.add(uuid)
+            return True
+
+    def close(self):
+        self._file.close()
+
+
+class GpxArchive:
+    """
+    Archive zip ou tar unique recevant les GPX (--archive)
+
+    Les GPX sont téléchargés dans un dossier temporaire local puis ajoutés
+    un par un, en flux, par un unique thread d'écriture: l'archive grandit
+    par écritures séquentielles, sans être chargée en mémoire. Les noms
+    qu'elle contient déjà (lus à l'ouverture) servent à ignorer les GPX
+    présents, d'une exécution à l'autre.
+
+    Les ajouts se font dans une copie cachée de l'archive, qui ne la
+    remplace (os.replace) qu'une fois complète, dans close(): un
+    processus tué en cours d'exécution laisse l'archive précédente
+    intacte. Les itinéraires ne sont enregistrés dans le manifeste
+    (after_commit) qu'après ce remplacement. Les GPX déjà archivés sont
+    relus par un accès en lecture seule à l'archive en place, distinct de
+    la copie en écriture (tarfile ne lit pas une archive ouverte en "a").
+    """
+
+    def __init__(self, path):
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.path = path
+        self.format = ARCHIVE_FORMATS[path.suffix.lower()]
+        self._tmp_path = path.with_name(f".{path.name}.{os.getpid()}.part")
+        # Copies laissées par une exécution interrompue
+        from glob import escape
+
+        for stale in path.parent.glob(f".{escape(path.name)}.*.part"):
+            stale.unlink(missing_ok=True)
+        self._reader = self._open(path, "r") if path.exists() else None
+        self._names = set(self._member_names()) if self._reader else set()
+        self._archive = None
+        self._on_commit = []
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self.staging_dir = pathlib.Path(tempfile.mkdtemp(prefix="naviki-archive-"))
+        self._writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="naviki-archive"
+        )
+
+    def _open(self, path, mode):
+        if self.format == "zip":
+            import zipfile
+
+            return zipfile.ZipFile(
+                path, mode, zipfile.ZIP_DEFLATED, compresslevel=ARCHIVE_ZIP_LEVEL
+            )
+        import tarfile
+
+        return tarfile.open(path, mode)
+
+    def _member_names(self):
+        if self.format == "zip":
+            return self._reader.namelist()
+        return self._reader.getnames()
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __len__(self):
+        return len(self._names)
+
+    def submit(self, func, *args):
+        self._writer.submit(func, *args)
+
+    def after_commit(self, func, *args):
+        """func(*args) une fois l'archive remplacée, dans close()"""
+        self._on_commit.append((func, args))
+
+    def _begin_append(self):
+        """Passe à la copie de travail, au premier ajout (verrou tenu)"""
+        import shutil
+
+        if self._reader is not None:
+            shutil.copyfile(self.path, self._tmp_path)
+        self._archive = self._open(self._tmp_path, "a")
+
+    def add(self, path):
+        """Ajoute un fichier sous son nom (thread d'écriture uniquement)"""
+        with self._lock:
+            if self._archive is None:
+                self._begin_append()
+            if self.format == "zip":
+                self._archive.write(path, path.name)
+            else:
+                self._archive.add(path, arcname=path.name)
+            self._names.add(path.name)
+
+    def hash_member(self, name):
+        """SavedFile d'un GPX de l'archive en place (avant cette exécution)"""
+        with self._read_lock:
+            if self.format == "zip":
+                member = self._reader.open(name)
+            else:
+                member = self._reader.extractfile(name)
+            with member:
+                return hash_stream(member)
+
+    def close(self):
+        import shutil
+
+        self._writer.shutdown(wait=True)
+        try:
+            if self._reader is not None:
+                self._reader.close()
+            if self._archive is not None:
+                self._archive.close()
+                os.replace(self._tmp_path, self.path)
+                for func, args in self._on_commit:
+                    func(*args)
+        finally:
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+
+class GpxFileWriter:
+    """
+    Écriture en flux et atomique d'un GPX téléchargé
+
+    Les morceaux reçus sont écrits dans un fichier temporaire caché du
+    dossier de destination, puis le fichier est renommé avec os.replace()
+    une fois le contenu validé: save_path n'existe jamais sous une forme
+    tronquée, et la mémoire utilisée ne dépend pas de la taille du GPX.
+    Utilisé par les deux moteurs, qui écrivent donc les mêmes octets.
+
+    Usage:
+        with GpxFileWriter(save_path) as writer:
+            for chunk in response.iter_content(GPX_CHUNK_SIZE):
+                writer.write(chunk)
+            saved = writer.commit()
+    """
+
+    def __init__(self, save_path):
+        self.save_path = save_path
+        self.tmp_path = save_path.with_name(f".{save_path.name}.{os.getpid()}.part")
+        self._file = None
+        self._digest = hashlib.sha256()
+        self._size = 0
+        self._head = b""
+        self._tail = b""
+        self._committed = False
+
+    def __enter__(self):
+        self._file = open(self.tmp_path, "wb")
+        return self
+
+    @property
+    def size(self):
+        """Nombre d'octets de GPX (décompressés) reçus"""
+        return self._size
+
+    def write(self, chunk):
+        if not chunk:
+            return
+        if len(self._head) < len(GPX_HEADER):
+            self._head += chunk[: len(GPX_HEADER) - len(self._head)]
+        self._tail = (self._tail + chunk[-GPX_TAIL_SIZE:])[-GPX_TAIL_SIZE:]
+        self._digest.update(chunk)
+        self._size += len(chunk)
+        self._file.write(chunk)
+
+    def commit(self):
+        """
+        Valide le contenu et met le fichier en place
+
+        Returns:
+            SavedFile, ou None si le contenu n'est pas un GPX complet
+            (le fichier temporaire est alors supprimé à la sortie du bloc)
+        """
+        self._file.close()
+
+        if self._head != GPX_HEADER:
+            print("❌ Échec du téléchargement GPX " "(réponse invalide)")
+            return None
+        if GPX_FOOTER not in self._tail:
+            print("❌ Échec du téléchargement GPX (fichier tronqué)")
+            return None
+
+        os.replace(self.tmp_path, self.save_path)
+        self._committed = True
+        print(f"✅ Sauvegardé: {self.save_path}")
+        return SavedFile(self._size, self._digest.hexdigest())
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if not self._committed:
+            try:
+                os.remove(self.tmp_path)
+            except FileNotFoundError:
+                pass
+        return False
+
+
+def remove_stale_parts(output_dir):
+    """
+    Supprime les fichiers temporaires d'une exécution tuée (SIGKILL,
+    coupure): .<nom>.<pid>.part de GpxFileWriter, compress_file et
+    simplify_gpx_file, .<nom>.<pid>.link de link_duplicate
+
+    Appelé au démarrage, avant tout téléchargement dans output_dir.
+    """
+    removed = 0
+    for pattern in (".*.part", ".*.link"):
+        for stale in output_dir.glob(pattern):
+            stale.unlink(missing_ok=True)
+            removed += 1
+    if removed:
+        print(
+            f"🧹 {removed} fichiers temporaires d'une exécution interrompue supprimés"
+        )
+
+
+def is_not_modified(status):
+    """
+    Réponse à une requête conditionnelle sur un GPX inchangé
+
+    wayToFileWithUser étant un POST, un serveur conforme répond 412 à
+    If-None-Match plutôt que 304: les deux signifient "inchangé".
+    """
+    return status in (304, 412)
+
+
+def response_validators(headers):
+    """ETag et Last-Modified d'une réponse GPX"""
+    return {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+
+
+def report_unauthorized(ctx, uuid):
+    """Token refusé au téléchargement: échec, reconnexion à prévoir"""
+    ctx.auth_failed = True
+    print(f"❌ Token refusé (401): {uuid}")
+    return None
+
+
+def download_way(ctx, uuid, pending):
+    """
+    Télécharge le GPX d'un itinéraire via wayToFileWithUser
+
+    Les erreurs transitoires (réseau, flux interrompu, 429, 5xx) sont
+    réessayées; le fichier temporaire d'une tentative ratée est supprimé.
+
+    Args:
+        ctx: ExportContext partagé
+        uuid: UUID de l'itinéraire
+        pending: PendingDownload (destination et en-têtes conditionnels)
+
+    Returns:
+        SavedFile, NOT_MODIFIED, ou None en cas d'échec
+    """
+    try:
+        return call_with_retry(
+            ctx, f"Téléchargement {uuid}", _download_once, ctx, uuid, pending
+        )
+
+    except Exception as e:
+        print(f"❌ Erreur lors du téléchargement: {e}")
+        return None
+
+
+def _download_once(ctx, uuid, pending):
+    """
+    Une tentative de download_way
+
+    La place du budget --batch (download_slots) n'est tenue que pendant
+    la requête: pas pendant l'attente avant la tentative suivante.
+    """
+    with ctx.download_slots:
+        return _download_request(ctx, uuid, pending)
+
+
+def _download_request(ctx, uuid, pending):
+    # token is passed in form data
+    dl_headers = {"Authorization": None, **pending.headers}
+
+    with ctx.session.post(
+        f"{ctx.api_url}/Util/wayToFileWithUser/",
+        data=download_form(ctx, uuid),
+        headers=dl_headers,
+        stream=True,
+    ) as dl:
+        raise_for_transient(dl.status_code, dl.headers)
+        if dl.status_code == 401:
+            return report_unauthorized(ctx, uuid)
+        if is_not_modified(dl.status_code):
+            return NOT_MODIFIED
+        with GpxFileWriter(pending.save_path) as writer:
+            for chunk in dl.iter_content(chunk_size=GPX_CHUNK_SIZE):
+                writer.write(chunk)
+            saved = writer.commit()
+        # Octets lus sur le réseau, avant décompression
+        ctx.count_transfer(
+            dl.headers.get("Content-Encoding"),
+            int(dl.raw.tell()),
+            writer.size,
+        )
+        if saved is None:
+            return None
+        return saved._replace(**response_validators(dl.headers))
+
+
+def prepare_way(ctx, way):
+    """
+    Calcule la destination d'un itinéraire et détecte les doublons
+
+    Args:
+        ctx: ExportContext partagé
+        way: Itinéraire renvoyé par findUserWaysByFilter
+
+    Returns:
+        PendingDownload, ou None si l'itinéraire est ignoré
+        (les compteurs sont alors déjà mis à jour)
+    """
+    uuid = way["uuid"]
+    title = way["title"]
+
+    # Le manifeste est consulté avant tout calcul ou accès disque
+    if ctx.manifest is not None and uuid in ctx.manifest:
+        if ctx.revalidate:
+            return prepare_revalidation(ctx, way)
+        print(f"⏭️  Déjà synchronisé: {title}")
+        ctx.count("skipped_count")
+        return None
+
+    print(f"\nTraitement: {title}\nUUID: {uuid}")
+
+    new_title = build_filename(way)
+    if new_title is None:
+        print("❌ Impossible d'extraire la date, " "itinéraire ignoré")
+        ctx.count("error_count")
+        return None
+
+    # Check if file already exists (or is being downloaded by another worker)
+    save_path = ctx.download_dir.joinpath(new_title)
+    claim = ctx.claim(save_path)
+    if claim != CLAIMED:
+        print(f"⏭️  Déjà présent, ignoré: {new_title}")
+        if claim == ALREADY_EXISTS and ctx.manifest is not None:
+            # Fichier d'une synchronisation antérieure au manifeste
+            if ctx.archive is not None and new_title in ctx.archive:
+                ctx.manifest.record(way, new_title, ctx.archive.hash_member(new_title))
+            else:
+                existing = find_stored(save_path)
+                ctx.manifest.record(way, existing.name, hash_file(existing))
+        # Compté une fois l'enregistrement réussi: sinon, erreur seulement
+        ctx.count("skipped_count")
+        return None
+
+    return PendingDownload(save_path, {})
+
+
+def prepare_revalidation(ctx, way):
+    """
+    Prépare la revérification d'un itinéraire déjà synchronisé
+
+    Le fichier connu du manifeste est redemandé avec ses validateurs
+    (If-None-Match / If-Modified-Since): un GPX inchangé ne coûte qu'une
+    réponse vide. Sans validateur, ou si le fichier a disparu, le GPX est
+    retéléchargé entièrement.
+    """
+    filename, etag, last_modified = ctx.manifest.lookup(way["uuid"])
+    # Le GPX est retéléchargé brut, puis recompressé selon --compress
+    save_path = raw_gpx_path(ctx.output_dir.joinpath(filename))
+    print(f"\n🔁 Revérification: {way['title']}")
+
+    if not ctx.reserve(save_path):
+        print(f"⏭️  Déjà en cours, ignoré: {filename}")
+        ctx.count("skipped_count")
+        return None
+
+    headers = {}
+    if find_stored(save_path):
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    return PendingDownload(save_path, headers)
+
+
+def finish_way(ctx, way, pending, saved):
+    """Met à jour compteurs et manifeste après un téléchargement"""
+    if saved is None:
+        ctx.count("error_count")
+        return
+
+    if saved is NOT_MODIFIED:
+        print(f"♻️  Inchangé: {pending.save_path.name}")
+        ctx.count("unchanged_count")
+        return
+
+    if ctx.archive is not None:
+        ctx.archive.submit(store_archived, ctx, way, pending.save_path, saved)
+        return
+
+    if ctx.compression is not None:
+        # La suite (compression, manifeste) quitte le thread réseau
+        ctx.compression.submit(store_compressed, ctx, way, pending.save_path, saved)
+        return
+
+    # Un fichier compressé d'une synchronisation précédente est remplacé
+    remove_stale_variants(pending.save_path, pending.save_path)
+    if ctx.dedup is not None:
+        linked = link_duplicate(ctx, way["uuid"], pending.save_path)
+        if linked is not None:
+            # Le manifeste décrit le fichier sur disque, validateurs HTTP
+            # de l'itinéraire conservés
+            saved = linked._replace(etag=saved.etag, last_modified=saved.last_modified)
+    record_saved(ctx, way, pending.save_path, saved)
+
+
+def record_saved(ctx, way, stored_path, saved):
+    """Compte un GPX enregistré et l'ajoute au manifeste"""
+    ctx.count("success_count")
+    if ctx.manifest is not None:
+        ctx.manifest.record(way, stored_path.name, saved)
+    if ctx.tracks is not None:
+        ctx.tracks.submit(ctx, way, stored_path)
+
+
+def remove_stale_variants(raw_path, keep):
+    """Supprime les autres versions (brute ou compressées) d'un GPX"""
+    for variant in stored_variants(raw_path):
+        if variant != keep:
+            variant.unlink(missing_ok=True)
+
+
+def store_archived(ctx, way, raw_path, saved):
+    """Ajoute un GPX téléchargé à l'archive (thread d'écriture de l'archive)"""
+    try:
+        ctx.archive.add(raw_path)
+    except Exception as e:
+        print(f"❌ Erreur d'ajout de {raw_path.name} à l'archive: {e}")
+        ctx.count("error_count")
+        return
+    finally:
+        raw_path.unlink(missing_ok=True)
+    # Manifeste mis à jour une fois l'archive complète remplacée
+    ctx.archive.after_commit(record_saved, ctx, way, raw_path, saved)
+
+
+def store_compressed(ctx, way, raw_path, saved):
+    """
+    Compresse un GPX téléchargé et l'enregistre (thread de compression)
+
+    En cas d'échec, le GPX brut reste en place (et sera reconnu comme
+    présent), mais l'itinéraire compte comme une erreur.
+    """
+    method = ctx.compression.method
+    stored_path = raw_path.with_name(raw_path.name + COMPRESSION_SUFFIXES[method])
+    try:
+        compress_file(raw_path, stored_path, method)
+    except Exception as e:
+        print(f"❌ Erreur de compression de {raw_path.name}: {e}")
+        ctx.count("error_count")
+        return
+    remove_stale_variants(raw_path, stored_path)
+    ctx.count("stored_bytes", stored_path.stat().st_size)
+    record_saved(ctx, way, stored_path, saved)
+
+
+def process_way(ctx, way):
+    """
+    Traite un itinéraire: calcul du nom, détection des doublons,
+    téléchargement. Appelé depuis les workers du pool.
+
+    Args:
+        ctx: ExportContext partagé
+        way: Itinéraire renvoyé par findUserWaysByFilter
+    """
+    pending = prepare_way(ctx, way)
+    if pending is None:
+        return
+
+    saved = download_way(ctx, way["uuid"], pending)
+    finish_way(ctx, way, pending, saved)
+
+
+def report_incremental_stop(ctx):
+    """Termine la pagination incrémentale"""
+    ctx.listing_complete = True
+    print(
+        f"\n⏹️  {ctx.incremental} itinéraires consécutifs déjà synchronisés: "
+        "arrêt de la pagination (mode incrémental)"
+    )
+
+
+def iter_ways(ctx, route_types):
+    """
+    Parcourt les pages de findUserWaysByFilter jusqu'à la page vide
+
+    Args:
+        ctx: ExportContext partagé
+        route_types: Filtre findUserWaysByFilter (ex: "recordedMy")
+
+    Yields:
+        Les itinéraires, page après page. S'arrête à la première page vide,
+        sur une erreur API, ou en mode incrémental dès que la série
+        d'itinéraires déjà synchronisés est atteinte.
+    """
+    timestamp = str(int(time.time()))
+    offset = 0
+
+    while True:
+        try:
+            status, ways = call_with_retry(
+                ctx,
+                f"Liste (offset {offset})",
+                _fetch_listing_page,
+                ctx,
+                listing_url(ctx, route_types, offset, timestamp),
+            )
+        except RETRYABLE_ERRORS as e:
+            report_listing_error(e)
+            return
+
+        if status != 200:
+            if status == 401:
+                ctx.auth_failed = True
+            report_listing_error(status)
+            return
+
+        if not ways:
+            ctx.listing_complete = True
+            return
+        offset += len(ways)
+        for way in ways:
+            # Observé avant la mise en file: un worker pourrait sinon
+            # l'ajouter au manifeste avant qu'on le compte comme connu
+            stop = ctx.observe_listed(way)
+            yield way
+            if stop:
+                report_incremental_stop(ctx)
+                return
+
+
+def _fetch_listing_page(ctx, url):
+    """
+    Une tentative de lecture d'une page de liste
+
+    Returns:
+        (status HTTP, itinéraires de la page ou None si status != 200)
+    """
+    r = ctx.session.get(url)
+    raise_for_transient(r.status_code, r.headers)
+    if r.status_code != 200:
+        return r.status_code, None
+    return r.status_code, r.json()["ways"]
+
+
+def _download_worker(ctx, ways_queue):
+    """Consomme la file jusqu'au marqueur de fin (None)"""
+    while True:
+        way = ways_queue.get()
+        if way is None:
+            return
+        try:
+            process_way(ctx, way)
+        except Exception as e:
+            print(f"❌ Erreur inattendue sur {way.get('uuid')}: {e}")
+            ctx.count("error_count")
+
+
+def export_ways(ctx, route_types, jobs):
+    """
+    Exporte les GPX avec un pipeline producteur/consommateurs
+
+    La pagination (producteur, thread appelant) alimente une file bornée
+    consommée par `jobs` workers partageant la session HTTP: la page
+    suivante est demandée pendant que les workers téléchargent la
+    précédente, et la file pleine bloque la pagination (backpressure).
+
+    Args:
+        ctx: ExportContext partagé
+        route_types: Filtre findUserWaysByFilter (ex: "recordedMy")
+        jobs: Nombre de téléchargements simultanés
+    """
+    ways_queue = queue.Queue(maxsize=jobs * PIPELINE_QUEUE_PER_JOB)
+    workers = [
+        threading.Thread(
+            target=_download_worker,
+            args=(ctx, ways_queue),
+            name=f"naviki-download-{i}",
+            daemon=True,
+        )
+        for i in range(jobs)
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        for way in iter_ways(ctx, route_types):
+            ways_queue.put(way)
+    finally:
+        # Page vide (ou erreur): un marqueur de fin par worker
+        for _ in workers:
+            ways_queue.put(None)
+        for worker in workers:
+            worker.join()
+        ctx.close_stages()
+
+
+async def download_way_async(ctx, http, uuid, pending):
+    """Équivalent asynchrone de download_way (session aiohttp)"""
+    try:
+        return await call_with_retry_async(
+            ctx,
+            f"Téléchargement {uuid}",
+            _download_once_async,
+            ctx,
+            http,
+            uuid,
+            pending,
+        )
+
+    except Exception as e:
+        print(f"❌ Erreur lors du téléchargement: {e}")
+        return None
+
+
+async def _download_once_async(ctx, http, uuid, pending):
+    """Une tentative de download_way_async"""
+    async with http.post(
+        f"{ctx.api_url}/Util/wayToFileWithUser/",
+        data=download_form(ctx, uuid),
+        headers=pending.headers,
+    ) as dl:
+        raise_for_transient(dl.status, dl.headers)
+        if dl.status == 401:
+            return report_unauthorized(ctx, uuid)
+        if is_not_modified(dl.status):
+            return NOT_MODIFIED
+        with GpxFileWriter(pending.save_path) as writer:
+            async for chunk in dl.content.iter_chunked(GPX_CHUNK_SIZE):
+                writer.write(chunk)
+            saved = writer.commit()
+        # aiohttp décompresse avant le flux: la taille réseau n'est
+        # connue que par Content-Length
+        ctx.count_transfer(
+            dl.headers.get("Content-Encoding"),
+            dl.content_length or writer.size,
+            writer.size,
+        )
+        if saved is None:
+            return None
+        return saved._replace(**response_validators(dl.headers))
+
+
+async def process_way_async(ctx, http, way):
+    """Équivalent asynchrone de process_way"""
+    pending = prepare_way(ctx, way)
+    if pending is None:
+        return
+
+    saved = await download_way_async(ctx, http, way["uuid"], pending)
+    finish_way(ctx, way, pending, saved)
+
+
+async def iter_ways_async(ctx, http, route_types):
+    """Équivalent asynchrone de iter_ways"""
+    timestamp = str(int(time.time()))
+    offset = 0
+    auth_headers = {"Authorization": f"Bearer {ctx.oauth_token}"}
+
+    while True:
+        try:
+            status, ways = await call_with_retry_async(
+                ctx,
+                f"Liste (offset {offset})",
+                _fetch_listing_page_async,
+                http,
+                listing_url(ctx, route_types, offset, timestamp),
+                auth_headers,
+            )
+        except async_retryable_errors() as e:
+            report_listing_error(e)
+            return
+
+        if status != 200:
+            if status == 401:
+                ctx.auth_failed = True
+            report_listing_error(status)
+            return
+
+        if not ways:
+            ctx.listing_complete = True
+            return
+        offset += len(ways)
+        for way in ways:
+            # Observé avant la mise en file: un worker pourrait sinon
+            # l'ajouter au manifeste avant qu'on le compte comme connu
+            stop = ctx.observe_listed(way)
+            yield way
+            if stop:
+                report_incremental_stop(ctx)
+                return
+
+
+async def _fetch_listing_page_async(http, url, headers):
+    """Équivalent asynchrone de _fetch_listing_page"""
+    async with http.get(url, headers=headers) as r:
+        raise_for_transient(r.status, r.headers)
+        if r.status != 200:
+            return r.status, None
+        return r.status, (await r.json(content_type=None))["ways"]
+
+
+async def _download_worker_async(ctx, http, ways_queue):
+    while True:
+        way = await ways_queue.get()
+        if way is None:
+            return
+        try:
+            await process_way_async(ctx, http, way)
+        except Exception as e:
+            print(f"❌ Erreur inattendue sur {way.get('uuid')}: {e}")
+            ctx.count("error_count")
 
 
-# Multiple patterns to handle different date formats
-patterns = [
-    # Format: 16/10/2025, 07:20 (slashes, 4-digit year with time)
-    # MOST COMMON
-    (
-        r"(?P<day>\d\d)/(?P<month>\d\d)/(?P<year>\d{4}), "
-        r"(?P<hour>\d\d):(?P<minute>\d\d)"
-    ),
-    # Format: 16.10.25, 07:20 (points, 2-digit year with time)
-    (
-        r"(?P<day>\d\d)\.(?P<month>\d\d)\.(?P<year>\d\d), "
-        r"(?P<hour>\d\d):(?P<minute>\d\d)"
-    ),
-    # Format: 16-10-2025, 07:20 (dashes, 4-digit year with time)
-    (
-        r"(?P<day>\d\d)-(?P<month>\d\d)-(?P<year>\d{4}), "
-        r"(?P<hour>\d\d):(?P<minute>\d\d)"
-    ),
-    # Format: 20250422 or Text-20250422 (compact date without time)
-    # negative lookahead to avoid partial matches
-    r"(?P<year>\d{4})(?P<month>\d\d)(?P<day>\d\d)(?![\d])",
-]
+async def _export_ways_async(ctx, route_types, jobs):
+    import asyncio
+    import aiohttp
+
+    ways_queue = asyncio.Queue(maxsize=jobs * PIPELINE_QUEUE_PER_JOB)
+    connector = aiohttp.TCPConnector(limit=jobs + 1)
+    async with aiohttp.ClientSession(
+        connector=connector, headers={"Accept": "application/json"}
+    ) as http:
+        workers = [
+            asyncio.ensure_future(_download_worker_async(ctx, http, ways_queue))
+            for _ in range(jobs)
+        ]
+        try:
+            async for way in iter_ways_async(ctx, http, route_types):
+                await ways_queue.put(way)
+        finally:
+            for _ in workers:
+                await ways_queue.put(None)
+            await asyncio.gather(*workers)
+
+
+def export_ways_async(ctx, route_types, jobs):
+    """
+    Moteur asynchrone (--engine async): même pipeline que export_ways,
+    mais la pagination et les `jobs` workers sont des coroutines sur un
+    seul thread. Nécessite aiohttp.
+
+    Args:
+        ctx: ExportContext partagé (ctx.session n'est pas utilisée)
+        route_types: Filtre findUserWaysByFilter (ex: "recordedMy")
+        jobs: Nombre de téléchargements simultanés
+    """
+    import asyncio
+
+    try:
+        asyncio.run(_export_ways_async(ctx, route_types, jobs))
+    finally:
+        ctx.close_stages()
+
+
+def format_size(size):
+    """Taille lisible (o, Ko, Mo, Go)"""
+    for unit in ("o", "Ko", "Mo"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "o" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} Go"
+
+
+def create_session(oauth_token, jobs):
+    """
+    Crée la session HTTP partagée par les workers
+
+    Le pool de connexions compte une connexion keep-alive par worker plus
+    une pour la pagination; pool_block empêche d'ouvrir des connexions
+    jetables au-delà. Les nouvelles tentatives sont gérées par
+    call_with_retry (pas par urllib3), pour être comptées et respecter
+    Retry-After.
+    """
+    s = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1, pool_maxsize=jobs + 1, pool_block=True
+    )
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update({"Authorization": f"Bearer {oauth_token}"})
+    s.headers.update({"Accept": "application/json"})
+    # gzip/deflate, plus br et zstd si brotli / zstandard sont installés
+    s.headers.update({"Accept-Encoding": ACCEPT_ENCODING})
+    return s
+
+
+def open_manifest(args, output_dir, manifest_path=None):
+    """
+    Ouvre le manifeste d'un dossier de sortie
+
+    Returns:
+        SyncManifest (manifest_path, ou MANIFEST_FILENAME dans output_dir),
+        ou None avec --no-manifest
+    """
+    if args.no_manifest:
+        return None
+    if manifest_path:
+        return SyncManifest(pathlib.Path(manifest_path))
+    return SyncManifest(output_dir / MANIFEST_FILENAME)
+
+
+def new_export_context(
+    args,
+    oauth_token,
+    output_dir,
+    manifest,
+    rate_limiter=None,
+    download_slots=None,
+    session=None,
+):
+    """
+    ExportContext d'un compte, selon les options
+
+    Une nouvelle session HTTP est créée sauf si `session` est fournie
+    (--watch: la même session sert à toutes les synchronisations).
+    """
+    tracks = None
+    if args.simplify or args.stats or args.parquet or args.geojson:
+        tracks = TrackStage(args.simplify, args.stats)
+    ctx = ExportContext(
+        session or create_session(oauth_token, args.jobs),
+        oauth_token,
+        output_dir,
+        api_url=args.api_url,
+        manifest=manifest,
+        incremental=args.incremental,
+        revalidate=args.revalidate,
+        retry_policy=RetryPolicy(retries=args.retries),
+        rate_limiter=rate_limiter or RateLimiter(args.rate),
+        download_slots=download_slots,
+        compression=CompressionStage(args.compress) if args.compress else None,
+        archive=GpxArchive(pathlib.Path(args.archive)) if args.archive else None,
+        tracks=tracks,
+        parquet=ParquetSink(pathlib.Path(args.parquet)) if args.parquet else None,
+        layer=GeoJsonLayer(pathlib.Path(args.geojson)) if args.geojson else None,
+        dedup=ContentIndex(manifest, output_dir) if args.dedup else None,
+    )
+    if ctx.dedup is not None:
+        backfill_contents(ctx)
+    if ctx.tracks is not None and ctx.manifest is not None:
+        backfill_tracks(ctx)
+    return ctx
+
+
+def backfill_contents(ctx):
+    """
+    Indexe par contenu les GPX bruts synchronisés avant --dedup, en liant
+    ceux qui sont identiques
+    """
+    indexed = 0
+    for uuid, filename in ctx.manifest.missing_content():
+        path = ctx.output_dir.joinpath(filename)
+        if path.suffix == ".gpx" and path.exists():
+            linked = link_duplicate(ctx, uuid, path)
+            if linked is not None:
+                ctx.manifest.update_file_hash(uuid, linked)
+            indexed += 1
+    if indexed:
+        print(f"🔗 {indexed} GPX déjà synchronisés indexés par contenu")
+
+
+def backfill_tracks(ctx):
+    """
+    Confie aux calculs les GPX déjà synchronisés qui manquent au catalogue
+    de statistiques (--stats), aux fichiers Parquet (--parquet) ou à la
+    couche GeoJSON (--geojson)
+    """
+    measured = extracted = layered = 0
+    if ctx.tracks.stats:
+        for uuid, filename in ctx.manifest.missing_stats():
+            stored = find_stored(raw_gpx_path(ctx.output_dir.joinpath(filename)))
+            if stored is not None:
+                ctx.tracks.measure(ctx, uuid, stored)
+                measured += 1
+    if ctx.parquet is not None:
+        for uuid, filename, crdate in ctx.manifest.synced_ways():
+            if uuid in ctx.parquet:
+                continue
+            stored = find_stored(raw_gpx_path(ctx.output_dir.joinpath(filename)))
+            if stored is not None:
+                ctx.tracks.extract(ctx, uuid, crdate, stored)
+                extracted += 1
+    if ctx.layer is not None:
+        for uuid, filename, crdate in ctx.manifest.synced_ways():
+            if uuid in ctx.layer:
+                continue
+            stored = find_stored(raw_gpx_path(ctx.output_dir.joinpath(filename)))
+            if stored is not None:
+                ctx.tracks.add_to_layer(ctx, uuid, crdate, stored)
+                layered += 1
+    if measured:
+        print(f"📐 {measured} GPX déjà synchronisés ajoutés au catalogue")
+    if extracted:
+        print(f"🧱 {extracted} GPX déjà synchronisés ajoutés aux fichiers Parquet")
+    if layered:
+        print(f"🗺️  {layered} GPX déjà synchronisés ajoutés à la couche GeoJSON")
+
+
+def print_export_settings(args):
+    """Options d'export communes à tous les comptes"""
+    if args.api_url != NAVIKI_API_URL:
+        print(f"🌐 API: {args.api_url}")
+    print(f"⚡ Téléchargements parallèles: {args.jobs} (moteur {args.engine})")
+    if args.incremental:
+        print(f"⏩ Mode incrémental (arrêt après {args.incremental} connus)")
+    if args.rate:
+        print(f"🚦 Débit limité à {args.rate:g} requêtes/s")
+    if args.archive:
+        print(f"🗄️  Archive: {args.archive}")
+    if args.dedup:
+        print("🔗 GPX identiques remplacés par des liens physiques")
+    if args.stats:
+        print("📐 Statistiques des traces dans le catalogue du manifeste")
+    if args.parquet:
+        print(f"🧱 Points des traces en Parquet: {args.parquet}")
+    if args.geojson:
+        print(f"🗺️  Couche GeoJSON de tous les itinéraires: {args.geojson}")
+    if args.simplify:
+        print(f"📉 Traces simplifiées à {args.simplify:g} m ({SIMPLIFIED_SUFFIX})")
+    if args.compress:
+        suffix = COMPRESSION_SUFFIXES[args.compress]
+        print(f"🗜️  GPX compressés en {args.compress} (.gpx{suffix})")
+
+
+def format_duration(seconds):
+    """Durée lisible (h et min)"""
+    minutes = round(seconds / 60)
+    return f"{minutes // 60} h {minutes % 60:02d}"
+
+
+def print_stats_report(args):
+    """
+    Totaux par année du catalogue de statistiques (--stats-report)
+
+    Returns:
+        False si le manifeste n'existe pas
+    """
+    path = pathlib.Path(args.manifest or pathlib.Path(args.output) / MANIFEST_FILENAME)
+    if not path.exists():
+        print(f"❌ Manifeste introuvable: {path}")
+        return False
+    manifest = SyncManifest(path)
+    try:
+        rows = manifest.stats_by_year(args.stats_report or None)
+    finally:
+        manifest.close()
+    if not rows:
+        print("📐 Catalogue vide: lancez un export avec --stats")
+        return True
+
+    print(f"📐 Catalogue: {path}\n")
+    print(f"{'Année':<6} {'Traces':>7} {'Distance':>12} {'En mouvement':>13} {'D+':>9}")
+    totals = [0, 0.0, 0.0, 0.0]
+    for year, count, distance, moving, gain in rows:
+        values = (count, distance, moving or 0.0, gain or 0.0)
+        totals = [total + value for total, value in zip(totals, values)]
+        print_stats_row(year or "?", *values)
+    if len(rows) > 1:
+        print("-" * 51)
+        print_stats_row("Total", *totals)
+    return True
+
+
+def print_stats_row(label, count, distance, moving, gain):
+    print(
+        f"{label:<6} {count:>7} {distance / 1000:>9.1f} km "
+        f"{format_duration(moving) if moving else '-':>13} {gain:>7.0f} m"
+    )
+
+
+def print_summary(ctx, revalidate=False):
+    """Compteurs de fin d'export"""
+    print(f"✅ Téléchargés: {ctx.success_count}")
+    print(f"⏭️  Ignorés (déjà présents): {ctx.skipped_count}")
+    if revalidate:
+        print(f"♻️  Inchangés (revérifiés): {ctx.unchanged_count}")
+    print(f"❌ Erreurs: {ctx.error_count}")
+    if ctx.body_bytes:
+        print(
+            f"📦 Transfert: {format_size(ctx.wire_bytes)} reçus pour "
+            f"{format_size(ctx.body_bytes)} de GPX "
+            f"({ctx.compressed_count} réponses compressées)"
+        )
+    if ctx.stored_bytes:
+        print(
+            f"🗜️  Stockage: {format_size(ctx.stored_bytes)} sur disque "
+            f"({ctx.stored_bytes / ctx.body_bytes:.0%} du GPX brut)"
+        )
+    if ctx.stats_count:
+        print(f"📐 Statistiques: {ctx.stats_count} traces ajoutées au catalogue")
+    if ctx.parquet_ways:
+        print(
+            f"🧱 Parquet: {ctx.parquet_ways} traces ajoutées, "
+            f"{ctx.parquet_points} points"
+        )
+    if ctx.dedup_count:
+        print(
+            f"🔗 Doublons: {ctx.dedup_count} GPX liés à un GPX identique, "
+            f"{format_size(ctx.dedup_bytes)} économisés"
+        )
+    if ctx.layer_count:
+        print(f"🗺️  Couche GeoJSON: {ctx.layer_count} itinéraires ajoutés")
+    if ctx.simplified_count:
+        print(
+            f"📉 Simplification: {ctx.simplified_count} traces, "
+            f"{ctx.points_before} → {ctx.points_after} points "
+            f"({ctx.points_after / max(ctx.points_before, 1):.0%})"
+        )
+    print(
+        f"🔁 Nouvelles tentatives: {ctx.retry_count} "
+        f"(dont {ctx.throttled_count} limitées par le serveur)"
+    )
+    print(f"📊 Total traité: {ctx.total_count}")
+
+
+def record_high_water(ctx):
+    """Met à jour le high-water du manifeste après une synchronisation"""
+    if ctx.manifest is None:
+        return
+    # Le high-water n'avance qu'après une synchronisation sans erreur
+    if ctx.listing_complete and ctx.error_count == 0 and ctx.max_crdate:
+        ctx.manifest.update_high_water(ctx.max_crdate)
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+@contextlib.contextmanager
+def sigterm_as_interrupt():
+    """
+    SIGTERM traité comme Ctrl+C: les blocs finally de l'export ferment
+    les étapes en cours (archive, fichiers Parquet, couche GeoJSON)
+    """
+    import signal
+
+    previous = signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+def finish_export(ctx):
+    """Met à jour le high-water du manifeste et le ferme"""
+    if ctx.manifest is None:
+        return
+    record_high_water(ctx)
+    ctx.manifest.close()
+
+
+class BatchAccount(NamedTuple):
+    """Compte d'un fichier --batch"""
+
+    name: str
+    output: pathlib.Path
+    types: str
+    username: Optional[str] = None
+    password: Optional[str] = None
+    token: Optional[str] = None
+    manifest: Optional[str] = None
+
+
+# Clés acceptées pour un compte du fichier --batch; *_env désigne une
+# variable d'environnement (pour ne pas écrire le secret dans le fichier)
+BATCH_ACCOUNT_KEYS = frozenset(
+    {
+        "name",
+        "username",
+        "password",
+        "password_env",
+        "token",
+        "token_env",
+        "output",
+        "types",
+        "manifest",
+    }
+)
+
+
+def load_batch_config(path, default_output, default_types):
+    """
+    Lit le fichier JSON du mode --batch
+
+    Format: {"accounts": [{"username": ..., "password": ...},
+    {"name": ..., "token": ...}, ...]}. Par compte: name (défaut: le
+    login), username + password (ou password_env), ou token (ou
+    token_env), output (défaut: <--output>/<name>), types (défaut:
+    --types) et manifest.
+
+    Args:
+        path: Fichier de configuration
+        default_output: Dossier parent des comptes sans output
+        default_types: Types de routes des comptes sans types
+
+    Returns:
+        Liste de BatchAccount
+
+    Raises:
+        ValueError: Fichier illisible ou compte incomplet
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"lecture impossible ({e})")
+
+    entries = config.get("accounts") if isinstance(config, dict) else config
+    if not isinstance(entries, list) or not entries:
+        raise ValueError('liste "accounts" absente ou vide')
+
+    accounts = []
+    for i, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"compte n°{i}: objet JSON attendu")
+        unknown = set(entry) - BATCH_ACCOUNT_KEYS
+        if unknown:
+            raise ValueError(f"compte n°{i}: clés inconnues {sorted(unknown)}")
+
+        secrets = {}
+        for key in ("password", "token"):
+            secrets[key] = entry.get(key)
+            variable = entry.get(f"{key}_env")
+            if variable and not secrets[key]:
+                secrets[key] = os.environ.get(variable)
+                if not secrets[key]:
+                    raise ValueError(
+                        f"compte n°{i}: variable d'environnement {variable} vide"
+                    )
+
+        username = entry.get("username")
+        name = entry.get("name") or username or f"compte{i}"
+        if not secrets["token"] and not (username and secrets["password"]):
+            raise ValueError(f"{name}: token ou username + password requis")
+
+        accounts.append(
+            BatchAccount(
+                name=name,
+                output=pathlib.Path(
+                    entry.get("output") or pathlib.Path(default_output) / name
+                ),
+                types=entry.get("types") or default_types,
+                username=username,
+                password=secrets["password"],
+                token=secrets["token"],
+                manifest=entry.get("manifest"),
+            )
+        )
+
+    for field in ("name", "output"):
+        values = [getattr(account, field) for account in accounts]
+        duplicates = sorted({str(v) for v in values if values.count(v) > 1})
+        if duplicates:
+            raise ValueError(f"{field} en double: {', '.join(duplicates)}")
+    return accounts
+
+
+def batch_account_token(account, args, browser_pool=None):
+    """
+    Token OAuth d'un compte du batch: fourni, en cache (un fichier par
+    compte) ou obtenu par connexion
+
+    Returns:
+        Le token, ou None si l'authentification a échoué
+    """
+    if account.token:
+        token = account.token
+        return token[7:] if token.startswith("Bearer ") else token
+
+    cache = token_cache_path(account.username)
+    if not args.no_token_cache:
+        token = reuse_cached_token(account.username, cache, api_url=args.api_url)
+        if token:
+            return token
+
+    token = get_oauth_token(
+        account.username,
+        account.password,
+        method=args.auth_method,
+        headless=args.headless,
+        browser_profile=args.browser_profile,
+        browser_pool=browser_pool,
+    )
+    if token and not args.no_token_cache:
+        save_cached_token(token, account.username, cache)
+    return token
+
+
+def batch_login(args):
+    """
+    Authentifie les comptes de --batch, plusieurs à la fois
+
+    Jusqu'à --browser-pool connexions ont lieu en parallèle; celles qui
+    passent par Selenium partagent un BrowserPool (navigateurs réutilisés
+    d'un compte à l'autre, limités par --browser-memory).
+
+    Returns:
+        dict nom du compte -> token, ou None si l'authentification a échoué
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    pool = BrowserPool(
+        size=args.browser_pool,
+        memory_budget=(
+            args.browser_memory * 1024 * 1024 if args.browser_memory else None
+        ),
+        headless=args.headless,
+        profile=args.browser_profile,
+    )
+
+    def login(account):
+        print(f"\n👤 Compte {account.name}")
+        return batch_account_token(account, args, pool)
+
+    try:
+        with ThreadPoolExecutor(
+            max_workers=pool.size, thread_name_prefix="naviki-login"
+        ) as executor:
+            tokens = list(executor.map(login, args.accounts))
+    finally:
+        pool.close()
+
+    if pool.launched_count:
+        print(
+            f"\n🦊 Navigateurs: {pool.launched_count} lancés, "
+            f"{pool.reused_count} connexions sur un navigateur réutilisé"
+        )
+    return {account.name: token for account, token in zip(args.accounts, tokens)}
+
+
+# Compteurs additionnés dans le total du mode --batch
+SUMMARY_COUNTERS = (
+    "success_count",
+    "skipped_count",
+    "unchanged_count",
+    "error_count",
+    "retry_count",
+    "throttled_count",
+    "wire_bytes",
+    "body_bytes",
+    "compressed_count",
+    "stored_bytes",
+    "simplified_count",
+    "points_before",
+    "points_after",
+    "stats_count",
+    "parquet_ways",
+    "parquet_points",
+    "layer_count",
+    "dedup_count",
+    "dedup_bytes",
+)
+
+
+def run_batch(args):
+    """
+    Synchronise tous les comptes de --batch dans ce processus
+
+    Les comptes se connectent d'abord (batch_login), puis sont exportés
+    en parallèle, chacun avec sa session, sa pagination et son manifeste.
+    Un sémaphore commun limite à args.jobs les téléchargements simultanés
+    de tous les comptes, et le limiteur de débit (--rate, Retry-After)
+    est partagé.
+
+    Returns:
+        True si tous les comptes ont pu être authentifiés
+    """
+    slots = threading.BoundedSemaphore(args.jobs)
+    rate_limiter = RateLimiter(args.rate)
+    contexts = {}
+
+    tokens = batch_login(args)
+    for account in args.accounts:
+        oauth_token = tokens[account.name]
+        if not oauth_token:
+            print(f"❌ {account.name}: impossible de récupérer le token, ignoré")
+            contexts[account.name] = None
+            continue
+        account.output.mkdir(parents=True, exist_ok=True)
+        remove_stale_parts(account.output)
+        manifest = open_manifest(args, account.output, account.manifest)
+        contexts[account.name] = new_export_context(
+            args, oauth_token, account.output, manifest, rate_limiter, slots
+        )
+
+    print(f"\n{'='*50}")
+    print(f"👥 Mode batch: {len(args.accounts)} comptes ({args.batch})")
+    print_export_settings(args)
+    print(f"{'='*50}\n")
+
+    threads = [
+        threading.Thread(
+            target=export_ways,
+            args=(contexts[account.name], account.types, args.jobs),
+            name=f"naviki-account-{account.name}",
+        )
+        for account in args.accounts
+        if contexts[account.name] is not None
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    total = ExportContext(None, None, None)
+    print(f"\n{'='*50}")
+    print("Synchronisation terminée!")
+    width = max(len(account.name) for account in args.accounts)
+    for account in args.accounts:
+        ctx = contexts[account.name]
+        if ctx is None:
+            print(f"  {account.name:<{width}}  ❌ authentification impossible")
+            continue
+        finish_export(ctx)
+        print(
+            f"  {account.name:<{width}}  ✅ {ctx.success_count}  "
+            f"⏭️  {ctx.skipped_count}  ❌ {ctx.error_count}  → {account.output}"
+        )
+        for counter in SUMMARY_COUNTERS:
+            total.count(counter, getattr(ctx, counter))
+
+    authenticated = sum(ctx is not None for ctx in contexts.values())
+    print(f"{'-'*50}")
+    print(f"Total ({authenticated}/{len(args.accounts)} comptes):")
+    print_summary(total, args.revalidate)
+    return authenticated == len(args.accounts)
+
+
+def login_with_credentials(args):
+    """
+    Token OAuth de --username/--password: depuis le cache s'il est encore
+    valide, sinon par connexion (puis mis en cache)
+
+    Returns:
+        Le token, ou None si l'authentification a échoué
+    """
+    if not args.no_token_cache:
+        oauth_token = reuse_cached_token(args.username, api_url=args.api_url)
+        if oauth_token:
+            return oauth_token
+
+    oauth_token = get_oauth_token(
+        args.username,
+        args.password,
+        method=args.auth_method,
+        headless=args.headless,
+        browser_profile=args.browser_profile,
+    )
+    if oauth_token and not args.no_token_cache:
+        save_cached_token(oauth_token, args.username)
+    return oauth_token
+
+
+def watch_delay(interval):
+    """Attente avant la prochaine synchronisation (secondes, avec jitter)"""
+    return interval * random.uniform(1 - WATCH_JITTER, 1 + WATCH_JITTER)
+
+
+def reauthenticate(args, session):
+    """
+    Nouveau token après un 401, installé dans la session
+
+    Returns:
+        Le nouveau token, ou None (token fourni par --token, ou échec de
+        la connexion)
+    """
+    if not args.username:
+        print("❌ Token refusé: fournissez un nouveau token (--token)")
+        return None
+    print("\n🔑 Token refusé: nouvelle connexion")
+    if not args.no_token_cache:
+        clear_cached_token()
+    oauth_token = login_with_credentials(args)
+    if oauth_token:
+        session.headers["Authorization"] = f"Bearer {oauth_token}"
+    return oauth_token
+
+
+def run_watch(args, oauth_token, output_dir, manifest):
+    """
+    Mode --watch: synchronisations incrémentales périodiques
+
+    La session HTTP, le token et le manifeste sont conservés d'une
+    synchronisation à l'autre. L'intervalle varie de ±WATCH_JITTER pour
+    ne pas solliciter l'API à heure fixe. Après un 401, une nouvelle
+    connexion a lieu et la synchronisation est relancée aussitôt; le
+    high-water n'ayant pas avancé, elle liste au moins tout ce que la
+    synchronisation interrompue n'a pas téléchargé (observe_listed).
+    SIGUSR1 déclenche une synchronisation immédiate, SIGTERM (ou Ctrl+C)
+    arrête proprement entre deux synchronisations.
+
+    Returns:
+        False si le mode s'est arrêté faute de token valide
+    """
+    import signal
+
+    session = create_session(oauth_token, args.jobs)
+    wake = threading.Event()
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+        wake.set()
+
+    handlers = {signal.SIGTERM: stop}
+    sync_now = getattr(signal, "SIGUSR1", None)  # Absent sous Windows
+    if sync_now is not None:
+        handlers[sync_now] = lambda signum, frame: wake.set()
+    previous = {signum: signal.signal(signum, h) for signum, h in handlers.items()}
+
+    cycle = 0
+    reauthenticated = False
+    try:
+        while not stopping.is_set():
+            cycle += 1
+            wake.clear()
+            print(
+                f"\n🔄 Synchronisation n°{cycle} ({datetime.now():%Y-%m-%d %H:%M:%S})"
+            )
+            ctx = new_export_context(
+                args, oauth_token, output_dir, manifest, session=session
+            )
+            if args.engine == "async":
+                export_ways_async(ctx, args.types, args.jobs)
+            else:
+                export_ways(ctx, args.types, args.jobs)
+            print_summary(ctx)
+            record_high_water(ctx)
+
+            if ctx.auth_failed:
+                # Un 401 juste après une reconnexion: inutile d'insister
+                if reauthenticated:
+                    print("❌ Nouveau token refusé: arrêt du mode --watch")
+                    return False
+                oauth_token = reauthenticate(args, session)
+                if not oauth_token:
+                    return False
+                reauthenticated = True
+                continue
+            reauthenticated = False
+
+            delay = watch_delay(args.watch * 60)
+            next_sync = datetime.fromtimestamp(time.time() + delay)
+            print(f"\n⏰ Prochaine synchronisation à {next_sync:%H:%M:%S}", end="")
+            if sync_now is not None:
+                print(f" (kill -USR1 {os.getpid()} pour synchroniser maintenant)")
+            else:
+                print()
+            wake.wait(delay)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+        session.close()
+        if manifest is not None:
+            manifest.close()
+
+    print("\n👋 Mode --watch arrêté")
+    return True
 
 
 def main():
     # Parse arguments
     args = parse_arguments()
 
+    if args.stats_report is not None:
+        if not print_stats_report(args):
+            sys.exit(1)
+        return
+
+    if args.batch:
+        if not run_batch(args):
+            sys.exit(1)
+        return
+
     # Obtenir le token OAuth
     credentials_used_from_args = False
     if args.token:
@@ -412,10 +4611,7 @@ def main():
             arg in sys.argv for arg in ["--username", "--login", "--password"]
         )
 
-        oauth_token = get_oauth_token_with_selenium(
-            args.username, args.password, headless=args.headless
-        )
-
+        oauth_token = login_with_credentials(args)
         if not oauth_token:
             print("\n❌ Impossible de récupérer le token")
             print("\n📋 Solution alternative:")
@@ -468,166 +4664,49 @@ def main():
 
     # Créer le dossier de sortie si nécessaire
     output_dir.mkdir(parents=True, exist_ok=True)
+    remove_stale_parts(output_dir)
+
+    manifest = open_manifest(args, output_dir, args.manifest)
 
     print(f"\n{'='*50}")
     print(f"📁 Destination: {output_dir}")
     print(f"🔍 Types de routes: {route_types}")
+    print_export_settings(args)
+    if manifest is not None:
+        print(f"🗃️  Manifeste: {len(manifest)} itinéraires déjà synchronisés")
     print(f"{'='*50}\n")
-    print("Début du téléchargement...\n")
 
-    timestamp = str(int(time.time()))
-
-    s = requests.Session()
-    s.headers.update({"Authorization": f"Bearer {oauth_token}"})
-    s.headers.update({"Accept": "application/json"})
-
-    more_to_download = True
-    offset = 0
-    success_count = 0
-    error_count = 0
-    skipped_count = 0
-
-    while more_to_download:
-        r = s.get(
-            "https://www.naviki.org/naviki/api/v6/Way/2/"
-            f"findUserWaysByFilter/?filter={route_types}"
-            f"&sort=crdateDesc&offset={offset}&fullDataSet=0"
-            f"&_={timestamp}"
-        )
+    if args.watch:
+        print(f"👀 Mode --watch: synchronisation toutes les {args.watch:g} minutes")
+        if not run_watch(args, oauth_token, output_dir, manifest):
+            sys.exit(1)
+        return
 
-        if r.status_code != 200:
-            print(f"❌ Erreur API: {r.status_code}")
-            if r.status_code == 401:
-                print("⚠️  Token invalide ou expiré. " "Veuillez vous reconnecter.")
-            break
-
-        j = r.json()
-        more_to_download = len(j["ways"]) > 0
-        offset += len(j["ways"])
-
-        for way in j["ways"]:
-            uuid = way["uuid"]
-            title = way["title"]
-            print(f"\nTraitement: {title}")
-            print(f"UUID: {uuid}")
-
-            # Try each pattern
-            m = None
-            for pattern in patterns:
-                m = re.search(pattern, title)
-                if m:
-                    break
+    print("Début du téléchargement...\n")
 
-            if m is None:
-                # Fallback: use crdate timestamp with timezone awareness
-                # Check if title looks like a place name
-                # (contains letters/spaces)
-                if any(c.isalpha() for c in title) and not any(
-                    c.isdigit() for c in title[:4]
-                ):
-                    print(
-                        f"ℹ️  Titre personnalisé détecté "
-                        f"('{title[:30]}...'), utilisation de crdate"
-                    )
-                else:
-                    print(
-                        f"⚠️  Format de date non standard dans "
-                        f"'{title}', utilisation de crdate"
-                    )
+    ctx = new_export_context(args, oauth_token, output_dir, manifest)
 
-                if "crdate" in way:
-                    # Use timezone-aware datetime
-                    # (crdate is UTC timestamp)
-                    dt = datetime.fromtimestamp(way["crdate"], tz=timezone.utc)
-                    # Use sanitized title as prefix if it's short
-                    # and has no special chars
-                    safe_title = re.sub(r"[^\w\-]", "_", title)[:30]
-                    if len(safe_title) > 3 and safe_title != title:
-                        new_title = (
-                            f"{dt.strftime('%Y-%m-%d_%H-%M')}_UTC_" f"{safe_title}.gpx"
-                        )
-                    else:
-                        new_title = dt.strftime("%Y-%m-%d_%H-%M") + "_UTC_Naviki.gpx"
-                else:
-                    print("❌ Impossible d'extraire la date, " "itinéraire ignoré")
-                    error_count += 1
-                    continue
+    try:
+        with sigterm_as_interrupt():
+            if args.engine == "async":
+                export_ways_async(ctx, route_types, args.jobs)
             else:
-                # Extract date components
-                year = m.group("year")
-                # Handle 2-digit or 4-digit year
-                if len(year) == 2:
-                    year = "20" + year
-
-                month = m.group("month")
-                day = m.group("day")
-
-                # Check if pattern includes time
-                # (check if groups exist in the match)
-                try:
-                    hour = m.group("hour")
-                    minute = m.group("minute")
-                    if hour and minute:
-                        new_title = (
-                            f"{year}-{month}-{day}_{hour}-{minute}" "_Naviki.gpx"
-                        )
-                    else:
-                        raise IndexError  # Fall through to crdate
-                except (IndexError, AttributeError):
-                    # No time in the pattern
-                    # (e.g., compact format 20241124)
-                    # Use crdate for time
-                    if "crdate" in way:
-                        dt = datetime.fromtimestamp(way["crdate"], tz=timezone.utc)
-                        time_str = dt.strftime("%H-%M")
-                        new_title = f"{year}-{month}-{day}_{time_str}_UTC_" "Naviki.gpx"
-                    else:
-                        new_title = f"{year}-{month}-{day}_Naviki.gpx"
-
-            # Check if file already exists
-            save_path = output_dir.joinpath(new_title)
-            if save_path.exists():
-                print(f"⏭️  Déjà présent, ignoré: {new_title}")
-                skipped_count += 1
-                continue
-
-            # Download GPX
-            form_data = {
-                "wayUuid": uuid,
-                "oauth_token": oauth_token,
-                "format": "gpx",
-            }
-            dl_headers = {"Authorization": None}  # token is passed in form data
-
-            try:
-                dl = s.post(
-                    "https://www.naviki.org/naviki/api/v6/Util/" "wayToFileWithUser/",
-                    data=form_data,
-                    headers=dl_headers,
-                )
-
-                if not dl.text.startswith("<?xml"):
-                    print("❌ Échec du téléchargement GPX " "(réponse invalide)")
-                    error_count += 1
-                    continue
-
-                with open(save_path, "wb") as f:
-                    f.write(dl.text.encode())
-                print(f"✅ Sauvegardé: {save_path}")
-                success_count += 1
-
-            except Exception as e:
-                print(f"❌ Erreur lors du téléchargement: {e}")
-                error_count += 1
-                continue
+                export_ways(ctx, route_types, args.jobs)
+    except KeyboardInterrupt:
+        print("\n⛔ Export interrompu: fichiers en cours fermés")
+        if manifest is not None:
+            manifest.close()
+        sys.exit(130)
 
     print(f"\n{'='*50}")
     print("Téléchargement terminé!")
-    print(f"✅ Téléchargés: {success_count}")
-    print(f"⏭️  Ignorés (déjà présents): {skipped_count}")
-    print(f"❌ Erreurs: {error_count}")
-    print(f"📊 Total traité: " f"{success_count + skipped_count + error_count}")
-    print(f"📁 Fichiers sauvegardés dans: {output_dir}")
+    print_summary(ctx, args.revalidate)
+    if args.archive:
+        print(f"🗄️  GPX ajoutés à l'archive: {args.archive}")
+    else:
+        print(f"📁 Fichiers sauvegardés dans: {output_dir}")
+
+    finish_export(ctx)
 
 
 if __name__ == "__main__":
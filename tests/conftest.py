@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Fixtures communes: script chargé, API simulée des benchmarks, export complet
+"""
+
+import importlib.util
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def load(name, path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    # Pas d'enregistrement dans sys.modules: les patchs "naviki_exporter.*"
+    # des autres fichiers de tests visent leur propre instance du module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def naviki_exporter():
+    """naviki-gpx-exporter.py, une instance par fichier de tests"""
+    return load("naviki_exporter", "naviki-gpx-exporter.py")
+
+
+@pytest.fixture(scope="module")
+def fake_naviki_server():
+    """API Naviki simulée (benchmarks/fake_naviki_server.py)"""
+    return load("fake_naviki_server", "benchmarks/fake_naviki_server.py")
+
+
+@pytest.fixture
+def run_main(naviki_exporter):
+    """main() contre un FakeNavikiServer: run_main(server, output_dir, *options)"""
+
+    def run(server, output_dir, *options):
+        argv = [
+            "prog",
+            "--token",
+            server.token,
+            "--api-url",
+            server.api_url,
+            "--output",
+            str(output_dir),
+            *options,
+        ]
+        with patch("sys.argv", argv):
+            naviki_exporter.main()
+
+    return run
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Tests de l'export vers une archive zip ou tar unique (--archive)
+"""
+
+import io
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tarfile
+import threading
+import zipfile
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def run_archive(run_main):
+    """run_main() avec --archive `archive`"""
+
+    def run(server, output_dir, archive, *options):
+        run_main(server, output_dir, "--archive", str(archive), *options)
+
+    return run
+
+
+def archive_names(path):
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            return archive.namelist()
+    with tarfile.open(path) as archive:
+        return archive.getnames()
+
+
+def read_member(path, name):
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            return archive.read(name)
+    with tarfile.open(path) as archive:
+        return archive.extractfile(name).read()
+
+
+def drop_member(path, name):
+    """Réécrit l'archive sans le membre `name`"""
+    kept = {n: read_member(path, n) for n in archive_names(path) if n != name}
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(path, "w") as archive:
+            for member, data in kept.items():
+                archive.writestr(member, data)
+        return
+    with tarfile.open(path, "w") as archive:
+        for member, data in kept.items():
+            info = tarfile.TarInfo(member)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+class TestArchive:
+    """Export --archive contre l'API simulée"""
+
+    @pytest.mark.parametrize("suffix", [".zip", ".tar"])
+    def test_export_into_archive(
+        self, tmp_path, suffix, fake_naviki_server, run_archive
+    ):
+        """Les GPX sont dans l'archive, aucun fichier séparé"""
+        archive = tmp_path / f"traces{suffix}"
+        with fake_naviki_server.FakeNavikiServer(ways=8) as server:
+            run_archive(server, tmp_path / "out", archive, "--jobs", "3")
+
+        names = archive_names(archive)
+        assert len(names) == 8
+        assert all(name.endswith(".gpx") for name in names)
+        assert not list((tmp_path / "out").glob("*.gpx"))
+        assert read_member(archive, names[0]).startswith(b"<?xml")
+
+    @pytest.mark.parametrize("suffix", [".zip", ".tar"])
+    def test_appended_across_runs(
+        self, tmp_path, suffix, fake_naviki_server, run_archive
+    ):
+        """Un deuxième export n'ajoute que les nouveaux itinéraires"""
+        archive = tmp_path / f"traces{suffix}"
+        with fake_naviki_server.FakeNavikiServer(ways=5) as server:
+            run_archive(server, tmp_path, archive, "--no-manifest")
+        # Le compte a trois itinéraires de plus (les plus anciens)
+        with fake_naviki_server.FakeNavikiServer(ways=8) as server:
+            run_archive(server, tmp_path, archive, "--no-manifest")
+
+        names = archive_names(archive)
+        assert len(names) == len(set(names)) == 8
+        assert server.stats["downloads"] == 3
+
+    @pytest.mark.parametrize("suffix", [".zip", ".tar"])
+    def test_manifest_from_archive(
+        self, tmp_path, suffix, capsys, naviki_exporter, fake_naviki_server, run_archive
+    ):
+        """Les GPX d'avant le manifeste y sont enregistrés depuis l'archive"""
+        archive = tmp_path / f"traces{suffix}"
+        with fake_naviki_server.FakeNavikiServer(ways=8, points=10) as server:
+            run_archive(server, tmp_path, archive, "--no-manifest")
+            # Le plus récent manque: il est ajouté avant la relecture des autres
+            drop_member(archive, max(archive_names(archive)))
+            capsys.readouterr()
+            run_archive(server, tmp_path, archive, "--jobs", "1")
+
+        assert server.stats["downloads"] == 9
+        out = capsys.readouterr().out
+        assert "⏭️  Ignorés (déjà présents): 7" in out
+        assert "❌ Erreurs: 0" in out
+        manifest = tmp_path / naviki_exporter.MANIFEST_FILENAME
+        with sqlite3.connect(str(manifest)) as conn:
+            rows = conn.execute("SELECT uuid, sha256 FROM ways").fetchall()
+        assert len(rows) == 8
+        for uuid, sha256 in rows:
+            expected = naviki_exporter.hashlib.sha256(
+                fake_naviki_server.gpx_for(uuid, 10)
+            ).hexdigest()
+            assert sha256 == expected
+
+    def test_staging_dir_removed(self, tmp_path, naviki_exporter, fake_naviki_server):
+        """Le dossier temporaire des téléchargements est supprimé"""
+        archive = naviki_exporter.GpxArchive(tmp_path / "traces.tar")
+        gpx = archive.staging_dir / "trace.gpx"
+        gpx.write_bytes(fake_naviki_server.gpx_for("uuid", 1))
+        archive.add(gpx)
+        archive.close()
+
+        assert not archive.staging_dir.exists()
+        assert archive_names(tmp_path / "traces.tar") == ["trace.gpx"]
+
+    @pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="POSIX")
+    @pytest.mark.parametrize("suffix", [".zip", ".tar"])
+    def test_killed_writer_keeps_archive(
+        self, tmp_path, suffix, naviki_exporter, fake_naviki_server
+    ):
+        """Un processus tué en plein ajout laisse l'archive précédente lisible"""
+        path = tmp_path / f"traces{suffix}"
+        archive = naviki_exporter.GpxArchive(path)
+        gpx = archive.staging_dir / "ancien.gpx"
+        gpx.write_bytes(fake_naviki_server.gpx_for("ancien", 10))
+        archive.add(gpx)
+        archive.close()
+
+        script = (
+            "import importlib.util, os, pathlib, signal\n"
+            "spec = importlib.util.spec_from_file_location('m', {module!r})\n"
+            "m = importlib.util.module_from_spec(spec)\n"
+            "spec.loader.exec_module(m)\n"
+            "archive = m.GpxArchive(pathlib.Path({path!r}))\n"
+            "gpx = archive.staging_dir / 'nouveau.gpx'\n"
+            "gpx.write_bytes(b'<gpx>' * 100000)\n"
+            "archive.add(gpx)\n"
+            "os.kill(os.getpid(), signal.SIGKILL)\n"
+        ).format(module=naviki_exporter.__file__, path=str(path))
+        result = subprocess.run([sys.executable, "-c", script])
+
+        assert result.returncode == -signal.SIGKILL
+        assert archive_names(path) == ["ancien.gpx"]
+        # La copie abandonnée est supprimée à la réouverture
+        reopened = naviki_exporter.GpxArchive(path)
+        assert "ancien.gpx" in reopened and "nouveau.gpx" not in reopened
+        reopened.close()
+        assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+    @pytest.mark.skipif(
+        threading.current_thread() is not threading.main_thread(),
+        reason="signaux reçus par le thread principal",
+    )
+    def test_sigterm_closes_archive(
+        self, tmp_path, capsys, naviki_exporter, fake_naviki_server, run_archive
+    ):
+        """SIGTERM: archive fermée, complète, cohérente avec le manifeste"""
+        archive = tmp_path / "traces.zip"
+        timer = threading.Timer(0.3, os.kill, (os.getpid(), signal.SIGTERM))
+        with fake_naviki_server.FakeNavikiServer(ways=200, latency=0.02) as server:
+            timer.start()
+            with pytest.raises(SystemExit) as exit_info:
+                run_archive(server, tmp_path, archive, "--jobs", "2")
+        timer.join()
+
+        assert exit_info.value.code == 130
+        names = archive_names(archive)
+        assert 0 < len(names) < 200
+        manifest = tmp_path / naviki_exporter.MANIFEST_FILENAME
+        with sqlite3.connect(str(manifest)) as conn:
+            recorded = {row[0] for row in conn.execute("SELECT filename FROM ways")}
+        assert recorded == set(names)
+        assert "Export interrompu" in capsys.readouterr().out
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            ["--archive", "traces.7z"],
+            ["--archive", "traces.zip", "--revalidate"],
+            ["--archive", "traces.zip", "--compress", "gzip"],
+        ],
+    )
+    def test_invalid_options(self, options, naviki_exporter):
+        """Extension inconnue ou option incompatible: erreur"""
+        with patch("sys.argv", ["prog", "--token", "t", *options]):
+            with pytest.raises(SystemExit):
+                naviki_exporter.parse_arguments()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -185,6 +185,66 @@ class TestParseArguments:
         assert args.types == "routedAll,recordedMy,recordedOthers"  # Default types
         assert args.headless is True  # Default headless
 
+    def test_parse_jobs(self, monkeypatch):
+        """Test du nombre de téléchargements parallèles"""
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["naviki-gpx-exporter.py", "--token", "abc", "--jobs", "8"],
+        )
+
+        spec.loader.exec_module(naviki_exporter)
+        args = naviki_exporter.parse_arguments()
+
+        assert args.jobs == 8
+
+    def test_parse_jobs_must_be_positive(self, monkeypatch):
+        """Test que --jobs 0 est refusé"""
+        monkeypatch.setattr(
+            sys, "argv", ["naviki-gpx-exporter.py", "--token", "abc", "--jobs", "0"]
+        )
+
+        spec.loader.exec_module(naviki_exporter)
+
+        with pytest.raises(SystemExit):
+            naviki_exporter.parse_arguments()
+
+    def test_parse_incremental(self, monkeypatch):
+        """Test --incremental avec et sans valeur"""
+        monkeypatch.setattr(
+            sys, "argv", ["naviki-gpx-exporter.py", "--token", "abc", "--incremental"]
+        )
+        spec.loader.exec_module(naviki_exporter)
+        args = naviki_exporter.parse_arguments()
+        assert args.incremental == naviki_exporter.INCREMENTAL_DEFAULT_RUN
+
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["naviki-gpx-exporter.py", "--token", "abc", "--incremental", "5"],
+        )
+        args = naviki_exporter.parse_arguments()
+        assert args.incremental == 5
+
+    def test_parse_incremental_requires_manifest(self, monkeypatch):
+        """Test que --incremental est refusé avec --no-manifest"""
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "naviki-gpx-exporter.py",
+                "--token",
+                "abc",
+                "--incremental",
+                "--no-manifest",
+            ],
+        )
+
+        spec.loader.exec_module(naviki_exporter)
+
+        with pytest.raises(SystemExit):
+            naviki_exporter.parse_arguments()
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tests du mode multi-comptes (--batch)
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+
+def write_config(tmp_path, accounts):
+    path = tmp_path / "comptes.json"
+    path.write_text(json.dumps({"accounts": accounts}))
+    return path
+
+
+class TestBatchConfig:
+    """Lecture du fichier --batch"""
+
+    def test_defaults(self, tmp_path, naviki_exporter):
+        """Nom, dossier et types par défaut"""
+        path = write_config(
+            tmp_path,
+            [
+                {"username": "alice", "password": "pw"},
+                {"name": "bob", "token": "tok", "types": "recordedMy"},
+            ],
+        )
+
+        alice, bob = naviki_exporter.load_batch_config(path, "traces", "routedAll")
+
+        assert alice.name == "alice"
+        assert alice.output == naviki_exporter.pathlib.Path("traces/alice")
+        assert alice.types == "routedAll"
+        assert bob.token == "tok"
+        assert bob.types == "recordedMy"
+
+    def test_secret_from_environment(self, tmp_path, monkeypatch, naviki_exporter):
+        """password_env lit le mot de passe dans l'environnement"""
+        monkeypatch.setenv("ALICE_PASSWORD", "depuis-env")
+        path = write_config(
+            tmp_path, [{"username": "alice", "password_env": "ALICE_PASSWORD"}]
+        )
+
+        (alice,) = naviki_exporter.load_batch_config(path, "traces", "routedAll")
+
+        assert alice.password == "depuis-env"
+
+    @pytest.mark.parametrize(
+        "accounts, message",
+        [
+            ([], "accounts"),
+            ([{"username": "alice"}], "token ou username"),
+            ([{"token": "t", "pasword": "x"}], "clés inconnues"),
+            ([{"token": "t", "password_env": "NAVIKI_TEST_UNSET"}], "vide"),
+            ([{"name": "a", "token": "t"}, {"name": "a", "token": "u"}], "double"),
+        ],
+    )
+    def test_invalid(self, tmp_path, accounts, message, naviki_exporter):
+        """Un fichier incomplet est refusé avec un message explicite"""
+        path = write_config(tmp_path, accounts)
+
+        with pytest.raises(ValueError, match=message):
+            naviki_exporter.load_batch_config(path, "traces", "routedAll")
+
+    def test_engine_async_rejected(self, tmp_path, naviki_exporter):
+        """--batch n'accepte que le moteur sync"""
+        path = write_config(tmp_path, [{"token": "t"}])
+
+        with patch("sys.argv", ["prog", "--batch", str(path), "--engine", "async"]):
+            with patch.object(
+                naviki_exporter.importlib.util, "find_spec", return_value=True
+            ):
+                with pytest.raises(SystemExit):
+                    naviki_exporter.parse_arguments()
+
+
+class TestRunBatch:
+    """Synchronisation de plusieurs comptes contre l'API simulée"""
+
+    def test_accounts_share_jobs_budget(
+        self, tmp_path, capsys, naviki_exporter, fake_naviki_server
+    ):
+        """Chaque compte est exporté, --jobs borne le total simultané"""
+        with fake_naviki_server.FakeNavikiServer(ways=12, latency=0.02) as server:
+            accounts = [
+                {"name": name, "token": server.token, "output": str(tmp_path / name)}
+                for name in ("alice", "bob", "carol")
+            ]
+            argv = [
+                "prog",
+                "--batch",
+                str(write_config(tmp_path, accounts)),
+                "--api-url",
+                server.api_url,
+                "--jobs",
+                "2",
+            ]
+            with patch("sys.argv", argv):
+                naviki_exporter.main()
+
+        for name in ("alice", "bob", "carol"):
+            assert len(list((tmp_path / name).glob("*.gpx"))) == 12
+        assert server.stats["max_in_flight"] == 2
+        out = capsys.readouterr().out
+        assert "Total (3/3 comptes):" in out
+        assert "✅ Téléchargés: 36" in out
+
+    def test_slot_released_during_backoff(
+        self, tmp_path, naviki_exporter, fake_naviki_server
+    ):
+        """Un compte limité (429) rend sa place pendant l'attente Retry-After"""
+        slots = naviki_exporter.threading.BoundedSemaphore(1)
+        free_while_sleeping = []
+
+        def fake_sleep(delay):
+            free = slots.acquire(blocking=False)
+            if free:
+                slots.release()
+            free_while_sleeping.append(free)
+
+        with fake_naviki_server.FakeNavikiServer(
+            ways=1, throttle_rate=1.0, retry_after=0.01
+        ) as server:
+            ctx = naviki_exporter.ExportContext(
+                naviki_exporter.create_session(server.token, 1),
+                server.token,
+                tmp_path,
+                api_url=server.api_url,
+                retry_policy=naviki_exporter.RetryPolicy(retries=2),
+                download_slots=slots,
+            )
+            way = {"uuid": "uuid", "title": "Sortie", "crdate": 1760599200}
+            with patch.object(naviki_exporter.time, "sleep", side_effect=fake_sleep):
+                naviki_exporter.process_way(ctx, way)
+
+        assert ctx.error_count == 1
+        assert len(free_while_sleeping) >= 2 and all(free_while_sleeping)
+
+    def test_failed_login_skips_account(
+        self, tmp_path, capsys, naviki_exporter, fake_naviki_server
+    ):
+        """Un compte sans token est ignoré, les autres sont exportés"""
+        with fake_naviki_server.FakeNavikiServer(ways=5) as server:
+            accounts = [
+                {"username": "alice", "password": "faux"},
+                {"name": "bob", "token": server.token},
+            ]
+            argv = [
+                "prog",
+                "--batch",
+                str(write_config(tmp_path, accounts)),
+                "--api-url",
+                server.api_url,
+                "--output",
+                str(tmp_path),
+                "--no-token-cache",
+            ]
+            with patch("sys.argv", argv):
+                with patch.object(
+                    naviki_exporter, "get_oauth_token", return_value=None
+                ):
+                    with pytest.raises(SystemExit) as exit_info:
+                        naviki_exporter.main()
+
+        assert exit_info.value.code == 1
+        assert not (tmp_path / "alice").exists()
+        assert len(list((tmp_path / "bob").glob("*.gpx"))) == 5
+        out = capsys.readouterr().out
+        assert "authentification impossible" in out
+        assert "Total (1/2 comptes):" in out
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
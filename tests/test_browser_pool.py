@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tests du pool de navigateurs des connexions Selenium (--batch)
+"""
+
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+@pytest.fixture
+def firefox(naviki_exporter):
+    """webdriver.Firefox simulé: connexion aboutie sur Naviki avec un token"""
+
+    def fake_driver(**kwargs):
+        driver = MagicMock()
+        driver.current_url = f"{naviki_exporter.NAVIKI_BASE_URL}/mobile.html"
+        driver.capabilities = {"moz:processID": None}
+        driver.execute_script.return_value = {"token": "pool-token"}
+        return driver
+
+    def fake_webdriver_wait(driver, *args, **kwargs):
+        # Formulaire trouvé tout de suite, token lu une fois
+        wait = MagicMock()
+        wait.until.side_effect = lambda condition: (
+            condition(driver)
+            if condition is naviki_exporter.token_or_login_error
+            else MagicMock()
+        )
+        return wait
+
+    with patch.object(
+        naviki_exporter.webdriver, "Firefox", side_effect=fake_driver
+    ) as firefox:
+        with patch.object(
+            naviki_exporter, "WebDriverWait", side_effect=fake_webdriver_wait
+        ):
+            yield firefox
+
+
+class TestBrowserPool:
+    """Réutilisation et limites du pool"""
+
+    def test_browser_reused_with_clean_session(self, firefox, naviki_exporter):
+        """La deuxième connexion réutilise le navigateur, session effacée"""
+        with naviki_exporter.BrowserPool(size=2) as pool:
+            for _ in range(3):
+                token = naviki_exporter.get_oauth_token_with_selenium(
+                    "alice", "pw", browser_pool=pool
+                )
+                assert token == "pool-token"
+            driver = pool._idle[0]
+
+            assert firefox.call_count == 1
+            assert pool.reused_count == 2
+            assert driver.delete_all_cookies.call_count == 3
+            driver.execute_script.assert_any_call(naviki_exporter.RESET_SESSION_SCRIPT)
+            driver.quit.assert_not_called()
+
+        driver.quit.assert_called_once()
+
+    def test_browser_off_site_discarded(self, firefox, naviki_exporter):
+        """Un navigateur resté hors de Naviki est fermé, pas réutilisé"""
+        pool = naviki_exporter.BrowserPool()
+        driver = pool.acquire()
+        driver.current_url = "about:neterror"
+
+        pool.release(driver)
+
+        driver.quit.assert_called_once()
+        driver.delete_all_cookies.assert_not_called()
+        assert pool.acquire() is not driver
+        assert firefox.call_count == 2
+        pool.close()
+
+    def test_size_limit_waits_for_release(self, firefox, naviki_exporter):
+        """Au-delà de size, acquire() attend qu'un navigateur soit rendu"""
+        pool = naviki_exporter.BrowserPool(size=1)
+        first = pool.acquire()
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+        waiter.start()
+        waiter.join(0.2)
+
+        assert acquired == []
+        pool.release(first)
+        waiter.join(5)
+
+        assert acquired == [first]
+        assert firefox.call_count == 1
+        pool.close()
+
+    def test_memory_budget(self, firefox, naviki_exporter):
+        """Pas de deuxième navigateur si la mémoire dépasserait le budget"""
+        pool = naviki_exporter.BrowserPool(size=4, memory_budget=1000)
+        pool.acquire()
+
+        with patch.object(naviki_exporter, "browser_rss", return_value=600):
+            assert not pool._can_launch()
+        with patch.object(naviki_exporter, "browser_rss", return_value=400):
+            assert pool._can_launch()
+        pool.close()
+
+    def test_acquire_after_close(self, firefox, naviki_exporter):
+        """Après close(), acquire() échoue sans lancer de navigateur"""
+        pool = naviki_exporter.BrowserPool(size=1)
+        pool.close()
+
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+        firefox.assert_not_called()
+
+    def test_close_wakes_waiter(self, firefox, naviki_exporter):
+        """Un acquire() en attente échoue à la fermeture du pool"""
+        pool = naviki_exporter.BrowserPool(size=1)
+        pool.acquire()
+        errors = []
+
+        def wait_for_browser():
+            try:
+                pool.acquire()
+            except RuntimeError as e:
+                errors.append(e)
+
+        waiter = threading.Thread(target=wait_for_browser)
+        waiter.start()
+        waiter.join(0.2)
+        pool.close()
+        waiter.join(5)
+
+        assert len(errors) == 1
+        assert firefox.call_count == 1
+
+
+class TestBatchLogin:
+    """Connexions simultanées du mode --batch"""
+
+    def test_logins_share_pool(self, tmp_path, naviki_exporter):
+        """Les comptes se connectent via un même BrowserPool, fermé à la fin"""
+        config = tmp_path / "comptes.json"
+        config.write_text(
+            json.dumps(
+                {
+                    "accounts": [
+                        {"username": name, "password": "pw"}
+                        for name in ("alice", "bob", "carol")
+                    ]
+                }
+            )
+        )
+        argv = ["prog", "--batch", str(config), "--no-token-cache"]
+        pools = []
+
+        def login(username, password, **kwargs):
+            pools.append(kwargs["browser_pool"])
+            return f"token-{username}"
+
+        with patch("sys.argv", argv):
+            args = naviki_exporter.parse_arguments()
+        with patch.object(naviki_exporter, "get_oauth_token", side_effect=login):
+            tokens = naviki_exporter.batch_login(args)
+
+        assert tokens == {
+            "alice": "token-alice",
+            "bob": "token-bob",
+            "carol": "token-carol",
+        }
+        assert len(set(map(id, pools))) == 1
+        assert pools[0].size == naviki_exporter.BROWSER_POOL_SIZE
+        assert pools[0]._closed
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests du stockage compressé des GPX (--compress)
+"""
+
+import gzip
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def manifest_filenames(naviki_exporter):
+    def filenames(output_dir):
+        path = output_dir / naviki_exporter.MANIFEST_FILENAME
+        with sqlite3.connect(str(path)) as conn:
+            return {row[0] for row in conn.execute("SELECT filename FROM ways")}
+
+    return filenames
+
+
+class TestCompressFile:
+    """Compression d'un GPX sur disque"""
+
+    def test_gzip_roundtrip(self, tmp_path, naviki_exporter, fake_naviki_server):
+        """Le contenu est conservé, l'en-tête porte le nom d'origine"""
+        raw = tmp_path / "trace.gpx"
+        raw.write_bytes(fake_naviki_server.gpx_for("uuid", 500))
+        dst = tmp_path / "trace.gpx.gz"
+
+        naviki_exporter.compress_file(raw, dst, "gzip")
+
+        assert gzip.decompress(dst.read_bytes()) == raw.read_bytes()
+        assert dst.stat().st_size < raw.stat().st_size / 5
+        assert dst.read_bytes()[10:19] == b"trace.gpx"
+        # Pas de fichier temporaire restant
+        assert {p.name for p in tmp_path.iterdir()} == {"trace.gpx", "trace.gpx.gz"}
+
+    def test_hash_of_compressed_file(
+        self, tmp_path, naviki_exporter, fake_naviki_server
+    ):
+        """hash_file décompresse: même SavedFile que le GPX brut"""
+        raw = tmp_path / "trace.gpx"
+        raw.write_bytes(fake_naviki_server.gpx_for("uuid", 50))
+        naviki_exporter.compress_file(raw, tmp_path / "trace.gpx.gz", "gzip")
+
+        assert naviki_exporter.hash_file(
+            tmp_path / "trace.gpx.gz"
+        ) == naviki_exporter.hash_file(raw)
+
+    def test_zstd_roundtrip(self, tmp_path, naviki_exporter, fake_naviki_server):
+        """zstd, si zstandard est installé"""
+        zstandard = pytest.importorskip("zstandard")
+        raw = tmp_path / "trace.gpx"
+        raw.write_bytes(fake_naviki_server.gpx_for("uuid", 500))
+        dst = tmp_path / "trace.gpx.zst"
+
+        naviki_exporter.compress_file(raw, dst, "zstd")
+
+        reader = zstandard.ZstdDecompressor().stream_reader(dst.read_bytes())
+        assert reader.read() == raw.read_bytes()
+
+    def test_stored_variants(self, tmp_path, naviki_exporter):
+        """find_stored reconnaît les GPX bruts et compressés"""
+        path = tmp_path / "trace.gpx"
+        assert naviki_exporter.find_stored(path) is None
+
+        (tmp_path / "trace.gpx.zst").write_bytes(b"")
+
+        assert naviki_exporter.find_stored(path) == tmp_path / "trace.gpx.zst"
+        assert naviki_exporter.raw_gpx_path(tmp_path / "trace.gpx.zst") == path
+
+
+class TestCompressedExport:
+    """Export --compress contre l'API simulée"""
+
+    def test_export_gzip(
+        self, tmp_path, capsys, fake_naviki_server, run_main, manifest_filenames
+    ):
+        """Seuls des .gpx.gz restent, enregistrés dans le manifeste"""
+        with fake_naviki_server.FakeNavikiServer(ways=12) as server:
+            run_main(server, tmp_path, "--compress", "gzip", "--jobs", "3")
+
+        stored = sorted(tmp_path.glob("*.gpx*"))
+        assert len(stored) == 12
+        assert all(path.name.endswith(".gpx.gz") for path in stored)
+        assert not list(tmp_path.glob(".*.part"))
+        assert gzip.decompress(stored[0].read_bytes()).startswith(b"<?xml")
+        assert manifest_filenames(tmp_path) == {path.name for path in stored}
+        out = capsys.readouterr().out
+        assert "❌ Erreurs: 0" in out
+        assert "🗜️  Stockage:" in out
+
+    def test_compressed_files_skipped(self, tmp_path, fake_naviki_server, run_main):
+        """Sans manifeste, un .gpx.gz existant n'est pas retéléchargé"""
+        with fake_naviki_server.FakeNavikiServer(ways=6) as server:
+            run_main(server, tmp_path, "--compress", "gzip", "--no-manifest")
+            run_main(server, tmp_path, "--no-manifest")
+
+        assert server.stats["downloads"] == 6
+        assert not list(tmp_path.glob("*.gpx"))
+
+    def test_raw_files_kept(
+        self, tmp_path, fake_naviki_server, run_main, manifest_filenames
+    ):
+        """Les GPX bruts d'avant --compress comptent comme présents"""
+        with fake_naviki_server.FakeNavikiServer(ways=6) as server:
+            run_main(server, tmp_path, "--no-manifest")
+            run_main(server, tmp_path, "--compress", "gzip")
+
+        assert server.stats["downloads"] == 6
+        assert len(list(tmp_path.glob("*.gpx"))) == 6
+        assert len(manifest_filenames(tmp_path)) == 6
+
+    def test_revalidate_replaces_variant(
+        self, tmp_path, fake_naviki_server, run_main, manifest_filenames
+    ):
+        """Retéléchargé sans --compress, le GPX remplace le .gpx.gz"""
+        with fake_naviki_server.FakeNavikiServer(ways=4) as server:
+            run_main(server, tmp_path, "--compress", "gzip")
+            run_main(server, tmp_path, "--revalidate")
+
+        assert len(list(tmp_path.glob("*.gpx"))) == 4
+        assert not list(tmp_path.glob("*.gpx.gz"))
+        assert all(name.endswith(".gpx") for name in manifest_filenames(tmp_path))
+
+    def test_zstd_requires_zstandard(self, naviki_exporter):
+        """--compress zstd sans zstandard: erreur explicite"""
+        argv = ["prog", "--token", "t", "--compress", "zstd"]
+        with patch("sys.argv", argv):
+            with patch.object(
+                naviki_exporter.importlib.util, "find_spec", return_value=None
+            ):
+                with pytest.raises(SystemExit):
+                    naviki_exporter.parse_arguments()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests de la déduplication des GPX par contenu (--dedup)
+"""
+
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+TRACK = (
+    "<trk><name>Sortie</name><trkseg>"
+    + "".join(f'<trkpt lat="48.{i:04d}" lon="2.0"/>' for i in range(200))
+    + "</trkseg></trk></gpx>\n"
+)
+
+
+def same_track(uuid, points):
+    """gpx_for simulé: même trace, métadonnées propres à chaque itinéraire"""
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<gpx version="1.1">'
+        f"<metadata><name>{uuid}</name><time>2025-10-16T07:20:00Z</time>"
+        f"</metadata>{TRACK}"
+    ).encode()
+
+
+@pytest.fixture
+def assert_manifest_matches_disk(naviki_exporter):
+    """Taille et SHA-256 du manifeste: ceux des fichiers sur disque"""
+
+    def check(output_dir):
+        manifest = output_dir / naviki_exporter.MANIFEST_FILENAME
+        with sqlite3.connect(str(manifest)) as conn:
+            rows = conn.execute("SELECT filename, size, sha256 FROM ways").fetchall()
+        assert rows
+        for filename, size, sha256 in rows:
+            on_disk = naviki_exporter.hash_file(output_dir / filename)
+            assert (size, sha256) == (on_disk.size, on_disk.sha256)
+
+    return check
+
+
+class TestContentKey:
+    """Empreinte de contenu"""
+
+    def test_metadata_ignored(self, tmp_path, naviki_exporter):
+        """Seul le bloc <metadata> est ignoré"""
+        a, b, c = (tmp_path / name for name in ("a.gpx", "b.gpx", "c.gpx"))
+        a.write_bytes(same_track("a", 0))
+        b.write_bytes(same_track("b", 0))
+        c.write_bytes(same_track("c", 0).replace(b"48.0001", b"48.0002"))
+
+        key = naviki_exporter.content_key(a)
+
+        assert naviki_exporter.content_key(b) == key
+        assert naviki_exporter.content_key(c) != key
+
+    def test_empty_metadata(self, tmp_path, naviki_exporter):
+        """<metadata/> vide"""
+        a, b = tmp_path / "a.gpx", tmp_path / "b.gpx"
+        a.write_text(f'<gpx version="1.1"><metadata/>{TRACK}')
+        b.write_text(f'<gpx version="1.1">{TRACK}')
+
+        assert naviki_exporter.content_key(a) == naviki_exporter.content_key(b)
+
+
+class TestDedupExport:
+    """Export --dedup contre l'API simulée"""
+
+    def test_duplicates_linked(
+        self,
+        tmp_path,
+        capsys,
+        monkeypatch,
+        fake_naviki_server,
+        run_main,
+        assert_manifest_matches_disk,
+    ):
+        """Un seul fichier sur disque pour des itinéraires identiques"""
+        monkeypatch.setattr(fake_naviki_server, "gpx_for", same_track)
+        with fake_naviki_server.FakeNavikiServer(ways=4) as server:
+            run_main(server, tmp_path, "--dedup", "--jobs", "2")
+
+        paths = list(tmp_path.glob("*.gpx"))
+        assert len(paths) == 4
+        assert {path.stat().st_ino for path in paths} == {paths[0].stat().st_ino}
+        assert paths[0].stat().st_nlink == 4
+        assert_manifest_matches_disk(tmp_path)
+        out = capsys.readouterr().out
+        assert "🔗 Doublons: 3 GPX liés à un GPX identique" in out
+
+    def test_backfill(
+        self,
+        tmp_path,
+        capsys,
+        monkeypatch,
+        naviki_exporter,
+        fake_naviki_server,
+        run_main,
+        assert_manifest_matches_disk,
+    ):
+        """Les GPX d'avant --dedup sont indexés, puis liés entre eux"""
+        monkeypatch.setattr(fake_naviki_server, "gpx_for", same_track)
+        with fake_naviki_server.FakeNavikiServer(ways=3) as server:
+            run_main(server, tmp_path)
+            run_main(server, tmp_path, "--dedup")
+
+        assert server.stats["downloads"] == 3
+        assert {p.stat().st_nlink for p in tmp_path.glob("*.gpx")} == {3}
+        assert_manifest_matches_disk(tmp_path)
+        out = capsys.readouterr().out
+        assert "🔗 3 GPX déjà synchronisés indexés par contenu" in out
+        manifest = tmp_path / naviki_exporter.MANIFEST_FILENAME
+        with sqlite3.connect(str(manifest)) as conn:
+            keys = conn.execute("SELECT DISTINCT content_sha256 FROM way_content")
+            assert len(keys.fetchall()) == 1
+
+    def test_distinct_tracks_kept(self, tmp_path, fake_naviki_server, run_main):
+        """Des traces différentes ne sont pas liées"""
+        with fake_naviki_server.FakeNavikiServer(ways=3) as server:
+            run_main(server, tmp_path, "--dedup")
+
+        assert {p.stat().st_nlink for p in tmp_path.glob("*.gpx")} == {1}
+
+    @pytest.mark.parametrize("option", ["--no-manifest", "--compress"])
+    def test_incompatible(self, option, naviki_exporter):
+        """--dedup a besoin du manifeste et de GPX bruts"""
+        argv = ["prog", "--token", "t", "--dedup", option]
+        if option == "--compress":
+            argv.append("gzip")
+        with patch("sys.argv", argv):
+            with pytest.raises(SystemExit):
+                naviki_exporter.parse_arguments()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
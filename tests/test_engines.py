@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Tests des moteurs de téléchargement (sync et async) contre un serveur
+HTTP local qui imite l'API Naviki
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+PAGE_SIZE = 5
+
+WAYS = [
+    {"uuid": "uuid-slash", "title": "16/10/2025, 07:20", "crdate": 1760599200},
+    {"uuid": "uuid-dot", "title": "15.10.25, 18:05", "crdate": 1760544300},
+    {"uuid": "uuid-compact", "title": "Prep - 20241124", "crdate": 1732429080},
+    {"uuid": "uuid-custom", "title": "Route de la Chapelle", "crdate": 1729065600},
+    {"uuid": "uuid-dup", "title": "16/10/2025, 07:20", "crdate": 1760599200},
+    {"uuid": "uuid-bad", "title": "14/10/2025, 09:00", "crdate": 1760432400},
+    {"uuid": "uuid-accent", "title": "Tour du Léman", "crdate": 1729000000},
+]
+
+
+# Révision du contenu GPX par UUID (modifiable par les tests)
+REVISIONS = {}
+
+# Pannes à injecter: clé ("list:<offset>" ou UUID) -> liste de
+# (status, en-têtes) renvoyés avant la réponse normale, ou "truncate"
+# pour couper le corps du GPX en cours de transfert
+FAILURES = {}
+
+
+def next_failure(key):
+    pending = FAILURES.get(key)
+    return pending.pop(0) if pending else None
+
+
+def gpx_for(uuid):
+    revision = REVISIONS.get(uuid, 0)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<gpx version="1.1" creator="Naviki"><trk><name>{uuid} – é</name>'
+        f"<desc>rev {revision}</desc><trkseg>"
+        + '<trkpt lat="48.85" lon="2.35"/>' * 50
+        + "</trkseg></trk></gpx>\n"
+    )
+
+
+class FakeNavikiHandler(BaseHTTPRequestHandler):
+    """Liste paginée + téléchargement GPX"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_failure(self, failure):
+        status, headers = failure
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        if self.headers.get("Authorization") != "Bearer test-token":
+            self.send_response(401)
+            self.end_headers()
+            return
+        offset = int(query["offset"][0])
+        failure = next_failure(f"list:{offset}")
+        if failure:
+            self.send_failure(failure)
+            return
+        body = json.dumps({"ways": WAYS[offset : offset + PAGE_SIZE]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        form = parse_qs(self.rfile.read(length).decode())
+        uuid = form["wayUuid"][0]
+        failure = next_failure(uuid)
+        if failure and failure != "truncate":
+            self.send_failure(failure)
+            return
+        if uuid == "uuid-bad":
+            body = b"Error: way not found"
+        else:
+            body = gpx_for(uuid).encode("utf-8")
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/gpx+xml; charset=UTF-8")
+        self.send_header("ETag", etag)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if failure == "truncate":
+            self.wfile.write(body[: len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def fake_api():
+    REVISIONS.clear()
+    FAILURES.clear()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeNavikiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/naviki/api/v6"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def run_engine(naviki_exporter):
+    def run(engine, api_url, output_dir, jobs=3, **options):
+        session = naviki_exporter.create_session("test-token", jobs)
+        ctx = naviki_exporter.ExportContext(
+            session, "test-token", output_dir, api_url, **options
+        )
+        if engine == "async":
+            naviki_exporter.export_ways_async(ctx, "recordedMy", jobs)
+        else:
+            naviki_exporter.export_ways(ctx, "recordedMy", jobs)
+        return ctx
+
+    return run
+
+
+def read_tree(directory):
+    return {p.name: p.read_bytes() for p in sorted(directory.iterdir())}
+
+
+class TestEngines:
+    """Les moteurs sync et async produisent la même arborescence"""
+
+    @pytest.mark.parametrize("engine", ["sync", "async"])
+    def test_engine_counters(self, fake_api, tmp_path, engine, run_engine):
+        """Compteurs: 5 téléchargés, 1 doublon ignoré, 1 erreur"""
+        if engine == "async":
+            pytest.importorskip("aiohttp")
+
+        ctx = run_engine(engine, fake_api, tmp_path)
+
+        assert ctx.success_count == 5
+        assert ctx.skipped_count == 1
+        assert ctx.error_count == 1
+        assert len(list(tmp_path.glob("*.gpx"))) == 5
+
+    def test_engines_byte_identical(self, fake_api, tmp_path, run_engine):
+        """Les deux moteurs écrivent exactement les mêmes octets"""
+        pytest.importorskip("aiohttp")
+
+        sync_dir = tmp_path / "sync"
+        async_dir = tmp_path / "async"
+        sync_dir.mkdir()
+        async_dir.mkdir()
+
+        run_engine("sync", fake_api, sync_dir)
+        run_engine("async", fake_api, async_dir)
+
+        assert read_tree(sync_dir) == read_tree(async_dir)
+        assert len(read_tree(sync_dir)) == 5
+
+    @pytest.mark.parametrize("engine", ["sync", "async"])
+    def test_engine_stops_on_invalid_token(
+        self, fake_api, tmp_path, engine, naviki_exporter
+    ):
+        """Un 401 sur la liste arrête l'export sans téléchargement"""
+        if engine == "async":
+            pytest.importorskip("aiohttp")
+
+        session = naviki_exporter.create_session("wrong-token", 2)
+        ctx = naviki_exporter.ExportContext(session, "wrong-token", tmp_path, fake_api)
+        if engine == "async":
+            naviki_exporter.export_ways_async(ctx, "recordedMy", 2)
+        else:
+            naviki_exporter.export_ways(ctx, "recordedMy", 2)
+
+        assert ctx.total_count == 0
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestCompressionAndRevalidation:
+    """Transfert compressé et revérification conditionnelle"""
+
+    @pytest.mark.parametrize("engine", ["sync", "async"])
+    def test_compressed_transfer(self, fake_api, tmp_path, engine, run_engine):
+        """Les GPX arrivent compressés et sont écrits décompressés"""
+        if engine == "async":
+            pytest.importorskip("aiohttp")
+
+        ctx = run_engine(engine, fake_api, tmp_path)
+
+        # 5 GPX + la réponse d'erreur de uuid-bad
+        assert ctx.compressed_count == 6
+        assert ctx.wire_bytes < ctx.body_bytes
+        saved = tmp_path / "2025-10-16_07-20_Naviki.gpx"
+        assert saved.read_bytes() == gpx_for("uuid-slash").encode()
+
+    @pytest.mark.parametrize("engine", ["sync", "async"])
+    def test_revalidation_not_modified(
+        self, fake_api, tmp_path, engine, naviki_exporter, run_engine
+    ):
+        """Un GPX inchangé ne coûte qu'une réponse 304"""
+        if engine == "async":
+            pytest.importorskip("aiohttp")
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        run_engine(engine, fake_api, tmp_path, manifest=manifest)
+
+        ctx = run_engine(engine, fake_api, tmp_path, manifest=manifest, revalidate=True)
+
+        assert ctx.unchanged_count == 5
+        assert ctx.success_count == 0
+        # Seule la réponse d'erreur de uuid-bad, absente du manifeste, transite
+        assert ctx.body_bytes == len(b"Error: way not found")
+
+    @pytest.mark.parametrize("engine", ["sync", "async"])
+    def test_revalidation_updates_changed_track(
+        self, fake_api, tmp_path, engine, naviki_exporter, run_engine
+    ):
+        """Un GPX modifié côté serveur est retéléchargé et remplacé"""
+        if engine == "async":
+            pytest.importorskip("aiohttp")
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        run_engine(engine, fake_api, tmp_path, manifest=manifest)
+        REVISIONS["uuid-dot"] = 1
+
+        ctx = run_engine(engine, fake_api, tmp_path, manifest=manifest, revalidate=True)
+
+        assert ctx.success_count == 1
+        assert ctx.unchanged_count == 4
+        saved = tmp_path / "2025-10-15_18-05_Naviki.gpx"
+        assert b"<desc>rev 1</desc>" in saved.read_bytes()
+
+
+@pytest.fixture
+def fast_retry(naviki_exporter):
+    return naviki_exporter.RetryPolicy(retries=3, backoff=0.01)
+
+
+class TestRetries:
+    """Nouvelles tentatives sur erreurs transitoires"""
+
+    @pytest.mark.parametrize("engine", ["sync", "async"])
+    def test_transient_failures_recovered(
+        self, fake_api, tmp_path, engine, run_engine, fast_retry
+    ):
+        """503, 500 et flux coupé sont réessayés sans perdre d'itinéraire"""
+        if engine == "async":
+            pytest.importorskip("aiohttp")
+        FAILURES["list:5"] = [(500, {})]
+        FAILURES["uuid-dot"] = [(503, {"Retry-After": "0"}), (502, {})]
+        FAILURES["uuid-custom"] = ["truncate"]
+
+        ctx = run_engine(engine, fake_api, tmp_path, retry_policy=fast_retry)
+
+        assert ctx.success_count == 5
+        assert ctx.error_count == 1
+        assert ctx.retry_count == 4
+        assert ctx.throttled_count == 1
+        assert ctx.listing_complete
+        assert not list(tmp_path.glob("*.part"))
+
+    @pytest.mark.parametrize("engine", ["sync", "async"])
+    def test_gives_up_after_retries(
+        self, fake_api, tmp_path, engine, run_engine, fast_retry
+    ):
+        """Une panne persistante finit en erreur, sans bloquer les autres"""
+        if engine == "async":
+            pytest.importorskip("aiohttp")
+        FAILURES["uuid-dot"] = [(500, {})] * 10
+
+        ctx = run_engine(engine, fake_api, tmp_path, retry_policy=fast_retry)
+
+        assert ctx.success_count == 4
+        assert ctx.error_count == 2
+        assert ctx.retry_count == fast_retry.retries
+
+    @pytest.mark.parametrize("engine", ["sync", "async"])
+    def test_listing_failure_stops_cleanly(
+        self, fake_api, tmp_path, engine, run_engine, fast_retry
+    ):
+        """Une page de liste toujours en échec arrête la pagination"""
+        if engine == "async":
+            pytest.importorskip("aiohttp")
+        FAILURES["list:5"] = [(503, {})] * 10
+
+        ctx = run_engine(engine, fake_api, tmp_path, retry_policy=fast_retry)
+
+        assert ctx.success_count == 4
+        assert not ctx.listing_complete
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests de bout en bout de main() contre l'API simulée des benchmarks
+(benchmarks/fake_naviki_server.py) via --api-url
+"""
+
+import pytest
+
+
+class TestFakeApi:
+    """Export complet contre FakeNavikiServer"""
+
+    def test_full_export(self, tmp_path, fake_naviki_server, run_main):
+        """Tous les itinéraires de toutes les pages sont exportés"""
+        with fake_naviki_server.FakeNavikiServer(ways=45, page_size=10) as server:
+            run_main(server, tmp_path, "--jobs", "3")
+
+        assert len(list(tmp_path.glob("*.gpx"))) == 45
+        assert server.stats["list_requests"] == 6
+        assert server.stats["downloads"] == 45
+
+    def test_throttling_recovered(self, tmp_path, capsys, fake_naviki_server, run_main):
+        """Les 429 et 500 injectés sont réessayés jusqu'au succès"""
+        with fake_naviki_server.FakeNavikiServer(
+            ways=30, throttle_rate=0.1, error_rate=0.1, retry_after=0.01, seed=1
+        ) as server:
+            run_main(server, tmp_path, "--retries", "10", "--no-manifest")
+
+        assert len(list(tmp_path.glob("*.gpx"))) == 30
+        assert server.stats["throttled"] + server.stats["errors"] > 0
+        assert "❌ Erreurs: 0" in capsys.readouterr().out
+
+    def test_expired_token(self, tmp_path, capsys, fake_naviki_server, run_main):
+        """Après expiration du token, les téléchargements échouent proprement"""
+        with fake_naviki_server.FakeNavikiServer(
+            ways=20, page_size=50, expire_after=5
+        ) as server:
+            run_main(server, tmp_path, "--jobs", "1", "--no-manifest")
+
+        assert len(list(tmp_path.glob("*.gpx"))) == 5
+        assert server.stats["download_requests"] - server.stats["downloads"] == 15
+        assert "❌ Erreurs: 15" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Tests de la couche GeoJSON de tous les itinéraires (--geojson)
+"""
+
+import json
+import multiprocessing
+import sys
+
+import pytest
+
+
+def feature_line(uuid):
+    """Feature sur une ligne, au format de route_feature"""
+    feature = {
+        "type": "Feature",
+        "id": uuid,
+        "properties": {},
+        "geometry": {"type": "LineString", "coordinates": [[2, 48], [2, 49]]},
+    }
+    return json.dumps(feature, separators=(",", ":"))
+
+
+class TestRouteFeature:
+    """Conversion d'un GPX en Feature"""
+
+    def test_line_string(self, tmp_path, naviki_exporter, fake_naviki_server):
+        """Un segment: LineString en (lon, lat), identifiant en tête"""
+        path = tmp_path / "trace.gpx"
+        path.write_bytes(fake_naviki_server.gpx_for("uuid", 3))
+
+        line = naviki_exporter.route_feature(path, "abc", {"crdate": 1})
+
+        assert line.encode().startswith(naviki_exporter.GEOJSON_FEATURE_PREFIX)
+        feature = json.loads(line)
+        assert feature["id"] == "abc"
+        assert feature["properties"] == {"crdate": 1}
+        assert feature["geometry"]["type"] == "LineString"
+        assert len(feature["geometry"]["coordinates"]) == 3
+        lon, lat = feature["geometry"]["coordinates"][0]
+        assert 40 < lat < 50 and lon < lat
+
+    def test_segments(self, tmp_path, naviki_exporter):
+        """Plusieurs segments: MultiLineString; un GPX vide: None"""
+        trkseg = '<trkseg><trkpt lat="48" lon="2"/><trkpt lat="48.1" lon="2"/></trkseg>'
+        path = tmp_path / "trace.gpx"
+        path.write_text(
+            '<gpx xmlns="http://www.topografix.com/GPX/1/1">'
+            f"<trk>{trkseg}{trkseg}</trk></gpx>"
+        )
+        line = naviki_exporter.route_feature(path, "abc", {})
+        assert json.loads(line)["geometry"]["type"] == "MultiLineString"
+
+        path.write_text('<gpx xmlns="http://www.topografix.com/GPX/1/1"/>')
+        assert naviki_exporter.route_feature(path, "abc", {}) is None
+
+
+class TestGeoJsonLayer:
+    """Fichier de la couche"""
+
+    def test_append_only(self, tmp_path, naviki_exporter):
+        """Les identifiants présents sont relus, pas d'ajout en double"""
+        path = tmp_path / "routes.geojsonl"
+        layer = naviki_exporter.GeoJsonLayer(path)
+        assert layer.add("a", feature_line("a"))
+        layer.close()
+        before = path.read_bytes()
+
+        layer = naviki_exporter.GeoJsonLayer(path)
+        assert "a" in layer
+        assert not layer.add("a", feature_line("a"))
+        assert layer.add("b", feature_line("b"))
+        layer.close()
+
+        content = path.read_bytes()
+        assert content.startswith(before)
+        assert [json.loads(line)["id"] for line in content.splitlines()] == ["a", "b"]
+
+    def test_truncated_line_removed(self, tmp_path, naviki_exporter):
+        """Une dernière ligne incomplète (arrêt brutal) est retirée"""
+        path = tmp_path / "routes.geojsonl"
+        path.write_text(feature_line("a") + "\n" + feature_line("b")[:20])
+
+        layer = naviki_exporter.GeoJsonLayer(path)
+        layer.add("c", feature_line("c"))
+        layer.close()
+
+        ids = [json.loads(line)["id"] for line in path.read_text().splitlines()]
+        assert ids == ["a", "c"]
+
+    def test_foreign_key_order(self, tmp_path, naviki_exporter):
+        """Une ligne réécrite par un autre outil est lue entièrement"""
+        path = tmp_path / "routes.geojsonl"
+        path.write_text(json.dumps({"id": "a", "type": "Feature"}) + "\n")
+
+        assert "a" in naviki_exporter.GeoJsonLayer(path)
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="les processus du pool doivent hériter du module chargé",
+)
+class TestGeoJsonExport:
+    """Étape --geojson de l'export"""
+
+    def test_export_and_backfill(
+        self,
+        tmp_path,
+        capsys,
+        monkeypatch,
+        naviki_exporter,
+        fake_naviki_server,
+        run_main,
+    ):
+        """Export, ajout des GPX déjà synchronisés, sans doublon ensuite"""
+        # Le pool de processus retrouve les fonctions par nom de module
+        monkeypatch.setitem(sys.modules, "naviki_exporter", naviki_exporter)
+        layer = tmp_path / "routes.geojsonl"
+        with fake_naviki_server.FakeNavikiServer(ways=3) as server:
+            run_main(server, tmp_path, "--compress", "gzip")
+        with fake_naviki_server.FakeNavikiServer(ways=5) as server:
+            run_main(server, tmp_path, "--geojson", str(layer))
+            run_main(server, tmp_path, "--geojson", str(layer), "--revalidate")
+
+        out = capsys.readouterr().out
+        assert "🗺️  3 GPX déjà synchronisés ajoutés à la couche GeoJSON" in out
+        assert "🗺️  Couche GeoJSON: 5 itinéraires ajoutés" in out
+        features = [json.loads(line) for line in layer.read_text().splitlines()]
+        assert len({feature["id"] for feature in features}) == len(features) == 5
+        assert all(f["properties"]["file"].endswith(".gpx") for f in features)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests de l'écriture en flux et atomique des GPX
+"""
+
+import hashlib
+
+import pytest
+
+GPX = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n<gpx version="1.1"><trk><trkseg>'
+    + b'<trkpt lat="48.85" lon="2.35"/>' * 5000
+    + b"</trkseg></trk></gpx>\n"
+)
+
+
+def chunks(data, size=7):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestGpxFileWriter:
+    """Tests de GpxFileWriter"""
+
+    def test_streamed_write(self, tmp_path, naviki_exporter):
+        """Les morceaux sont assemblés, hachés et mis en place"""
+        save_path = tmp_path / "trace.gpx"
+
+        with naviki_exporter.GpxFileWriter(save_path) as writer:
+            for chunk in chunks(GPX, 4096):
+                writer.write(chunk)
+            saved = writer.commit()
+
+        assert save_path.read_bytes() == GPX
+        assert saved.size == len(GPX)
+        assert saved.sha256 == hashlib.sha256(GPX).hexdigest()
+        assert list(tmp_path.iterdir()) == [save_path]
+
+    def test_header_split_across_chunks(self, tmp_path, naviki_exporter):
+        """L'en-tête <?xml peut arriver en plusieurs morceaux"""
+        save_path = tmp_path / "trace.gpx"
+
+        with naviki_exporter.GpxFileWriter(save_path) as writer:
+            for chunk in chunks(GPX, 2):
+                writer.write(chunk)
+            assert writer.commit() is not None
+
+        assert save_path.read_bytes() == GPX
+
+    def test_invalid_response_leaves_nothing(self, tmp_path, naviki_exporter):
+        """Une réponse qui n'est pas un GPX ne laisse aucun fichier"""
+        save_path = tmp_path / "trace.gpx"
+
+        with naviki_exporter.GpxFileWriter(save_path) as writer:
+            writer.write(b'{"error": "not found"}')
+            assert writer.commit() is None
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_truncated_gpx_rejected(self, tmp_path, naviki_exporter):
+        """Un GPX sans balise fermante n'est jamais mis en place"""
+        save_path = tmp_path / "trace.gpx"
+
+        with naviki_exporter.GpxFileWriter(save_path) as writer:
+            writer.write(GPX[: len(GPX) // 2])
+            assert writer.commit() is None
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_interrupted_download_leaves_nothing(self, tmp_path, naviki_exporter):
+        """Une exception en cours de flux supprime le fichier temporaire"""
+        save_path = tmp_path / "trace.gpx"
+
+        with pytest.raises(ConnectionError):
+            with naviki_exporter.GpxFileWriter(save_path) as writer:
+                writer.write(GPX[:1000])
+                assert writer.tmp_path.exists()
+                raise ConnectionError("connexion coupée")
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_existing_file_replaced_atomically(self, tmp_path, naviki_exporter):
+        """Le fichier final n'est remplacé qu'une fois le contenu validé"""
+        save_path = tmp_path / "trace.gpx"
+        save_path.write_bytes(b"ancien")
+
+        with naviki_exporter.GpxFileWriter(save_path) as writer:
+            writer.write(GPX[:1000])
+            assert save_path.read_bytes() == b"ancien"
+            writer.write(GPX[1000:])
+            writer.commit()
+
+        assert save_path.read_bytes() == GPX
+
+    def test_killed_run_parts_removed(self, tmp_path, fake_naviki_server, run_main):
+        """Les temporaires d'une exécution tuée disparaissent au lancement suivant"""
+        stale = [
+            tmp_path / ".2025-10-16_07-20_Naviki.gpx.4242.part",
+            tmp_path / ".2025-10-16_07-20_Naviki.gpx.gz.4242.part",
+            tmp_path / ".2025-10-15_18-05_Naviki.gpx.4242.link",
+        ]
+        for path in stale:
+            path.write_bytes(GPX[:1000])
+        (tmp_path / ".keep").write_bytes(b"")
+
+        with fake_naviki_server.FakeNavikiServer(ways=2) as server:
+            run_main(server, tmp_path, "--no-manifest")
+
+        assert not any(path.exists() for path in stale)
+        assert (tmp_path / ".keep").exists()
+        assert len(list(tmp_path.glob("*.gpx"))) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Tests de l'authentification HTTP (sans navigateur) contre un serveur
+OAuth2 local qui imite la page de connexion Naviki
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+USERNAME = "alice"
+PASSWORD = "s3cret"
+CSRF = "csrf-42"
+SESSION = "sess-1"
+CODE = "code-xyz"
+TOKEN = "http-token-0123456789abcdef"
+
+LOGIN_PAGE = """<html><body>
+<form id="search" action="/search"><input name="q"></form>
+<form method="post" action="login">
+  <input type="hidden" name="_csrf" value="{csrf}">
+  <input type="text" name="username">
+  <input type="password" name="password">
+  <input type="submit" name="go" value="Connexion">
+  {error}
+</form>
+</body></html>"""
+
+
+class FakeOAuthHandler(BaseHTTPRequestHandler):
+    """Connexion -> consentement -> redirect_uri?code=... -> /oauth2/token"""
+
+    # Client OAuth attendu, fourni par la fixture oauth_server
+    client_id = None
+    redirect_uri = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def login_page(self, error=""):
+        page = LOGIN_PAGE.format(csrf=CSRF, error=error).encode()
+        self.send(
+            200,
+            page,
+            {"Content-Type": "text/html", "Set-Cookie": f"session={SESSION}"},
+        )
+
+    def read_form(self):
+        length = int(self.headers["Content-Length"])
+        form = parse_qs(self.rfile.read(length).decode())
+        return {key: values[0] for key, values in form.items()}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/oauth2/auth":
+            assert query["client_id"] == [self.client_id]
+            assert query["response_type"] == ["code"]
+            self.login_page()
+        elif url.path == "/oauth2/consent":
+            location = f"{self.redirect_uri}?code={CODE}"
+            self.send(302, headers={"Location": location})
+        else:
+            self.send(404)
+
+    def do_POST(self):
+        form = self.read_form()
+        if self.path == "/oauth2/login":
+            valid = (
+                form.get("_csrf") == CSRF
+                and f"session={SESSION}" in self.headers.get("Cookie", "")
+                and form.get("username") == USERNAME
+                and form.get("password") == PASSWORD
+                and "go" not in form
+            )
+            if valid:
+                self.send(302, headers={"Location": "/oauth2/consent"})
+            else:
+                self.login_page('<p class="error">Identifiants invalides</p>')
+        elif self.path == "/oauth2/token":
+            valid = form == {
+                "grant_type": "authorization_code",
+                "code": CODE,
+                "redirect_uri": self.redirect_uri,
+                "client_id": self.client_id,
+            }
+            if valid:
+                body = json.dumps({"access_token": TOKEN, "token_type": "bearer"})
+                self.send(200, body.encode(), {"Content-Type": "application/json"})
+            else:
+                self.send(400, b'{"error": "invalid_grant"}')
+        else:
+            self.send(404)
+
+
+@pytest.fixture
+def oauth_server(naviki_exporter):
+    handler = type(
+        "OAuthHandler",
+        (FakeOAuthHandler,),
+        {
+            "client_id": naviki_exporter.OAUTH_CLIENT_ID,
+            "redirect_uri": naviki_exporter.OAUTH_REDIRECT_URI,
+        },
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestHttpAuth:
+    """Tests de get_oauth_token_with_http"""
+
+    def test_successful_login(self, oauth_server, naviki_exporter):
+        """Formulaire, redirections et échange du code donnent le token"""
+        token = naviki_exporter.get_oauth_token_with_http(
+            USERNAME, PASSWORD, base_url=oauth_server
+        )
+
+        assert token == TOKEN
+
+    def test_wrong_password(self, oauth_server, naviki_exporter):
+        """Des identifiants refusés ne donnent pas de token"""
+        token = naviki_exporter.get_oauth_token_with_http(
+            USERNAME, "mauvais", base_url=oauth_server
+        )
+
+        assert token is None
+
+    def test_unreachable_server(self, naviki_exporter):
+        """Un serveur injoignable ne lève pas d'exception"""
+        token = naviki_exporter.get_oauth_token_with_http(
+            USERNAME, PASSWORD, base_url="http://127.0.0.1:9"
+        )
+
+        assert token is None
+
+    def test_code_in_fragment(self, naviki_exporter):
+        """Le code est aussi lu dans le fragment de redirect_uri"""
+        assert (
+            naviki_exporter.authorization_code(
+                "https://www.naviki.org/mobile.html#state=1&code=abc"
+            )
+            == "abc"
+        )
+        assert naviki_exporter.authorization_code("/oauth2/consent") is None
+
+
+class TestAuthMethod:
+    """Tests du choix de la méthode (--auth-method)"""
+
+    def test_auto_falls_back_to_selenium(self, naviki_exporter):
+        """En mode auto, un échec HTTP passe à Selenium"""
+        with patch.object(
+            naviki_exporter, "get_oauth_token_with_http", return_value=None
+        ):
+            with patch.object(
+                naviki_exporter,
+                "get_oauth_token_with_selenium",
+                return_value="selenium-token",
+            ) as selenium:
+                token = naviki_exporter.get_oauth_token(USERNAME, PASSWORD)
+
+        assert token == "selenium-token"
+        selenium.assert_called_once_with(
+            USERNAME, PASSWORD, headless=True, browser_profile="lean", browser_pool=None
+        )
+
+    def test_auto_skips_selenium_on_success(self, naviki_exporter):
+        """En mode auto, Selenium n'est pas lancé si HTTP réussit"""
+        with patch.object(
+            naviki_exporter, "get_oauth_token_with_http", return_value=TOKEN
+        ):
+            with patch.object(
+                naviki_exporter, "get_oauth_token_with_selenium"
+            ) as selenium:
+                token = naviki_exporter.get_oauth_token(USERNAME, PASSWORD)
+
+        assert token == TOKEN
+        selenium.assert_not_called()
+
+    def test_http_only_does_not_fall_back(self, naviki_exporter):
+        """--auth-method http n'utilise jamais Selenium"""
+        with patch.object(
+            naviki_exporter, "get_oauth_token_with_http", return_value=None
+        ):
+            with patch.object(
+                naviki_exporter, "get_oauth_token_with_selenium"
+            ) as selenium:
+                token = naviki_exporter.get_oauth_token(
+                    USERNAME, PASSWORD, method="http"
+                )
+
+        assert token is None
+        selenium.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -7,6 +7,8 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock, mock_open, call
 import sys
 import os
+import threading
+import time
 from pathlib import Path
 
 # Import the module
@@ -26,10 +28,21 @@ sys.modules["naviki_exporter"] = naviki_exporter
 spec.loader.exec_module(naviki_exporter)
 
 
+def gpx_response(body=b"<?xml version='1.0'?><gpx><trk/></gpx>"):
+    """Réponse wayToFileWithUser mockée (stream=True, context manager)"""
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.status_code = 200
+    response.headers = {}
+    response.iter_content.return_value = [body]
+    response.raw.tell.return_value = len(body)
+    return response
+
+
 class TestMainFunction:
     """Tests pour la fonction main avec mocks"""
 
-    @patch("sys.argv", ["prog", "--token", "test-token-123"])
+    @patch("sys.argv", ["prog", "--token", "test-token-123", "--no-manifest"])
     @patch("naviki_exporter.requests.Session")
     @patch("naviki_exporter.pathlib.Path")
     @patch("builtins.open", new_callable=mock_open)
@@ -60,8 +73,7 @@ class TestMainFunction:
         ]
 
         # Mock download response
-        mock_download = MagicMock()
-        mock_download.text = "<?xml version='1.0'?><gpx>test</gpx>"
+        mock_download = gpx_response(b"<?xml version='1.0'?><gpx>test</gpx>")
         mock_session_instance.post.return_value = mock_download
 
         # Mock path
@@ -69,6 +81,8 @@ class TestMainFunction:
         mock_path.return_value = mock_output_dir
         mock_file_path = MagicMock()
         mock_file_path.exists.return_value = False
+        # Variantes compressées (.gpx.gz, .gpx.zst) absentes aussi
+        mock_file_path.with_name.return_value.exists.return_value = False
         mock_output_dir.joinpath.return_value = mock_file_path
 
         # Call main
@@ -79,7 +93,20 @@ class TestMainFunction:
         mock_session_instance.post.assert_called_once()
         mock_output_dir.mkdir.assert_called_once()
 
-    @patch("sys.argv", ["prog", "--username", "testuser", "--password", "testpass"])
+    @patch(
+        "sys.argv",
+        [
+            "prog",
+            "--username",
+            "testuser",
+            "--password",
+            "testpass",
+            "--no-manifest",
+            "--no-token-cache",
+            "--auth-method",
+            "selenium",
+        ],
+    )
     @patch("naviki_exporter.get_oauth_token_with_selenium")
     @patch("naviki_exporter.sys.exit")
     def test_main_with_failed_auth(self, mock_exit, mock_auth):
@@ -94,7 +121,7 @@ class TestMainFunction:
         # Should call sys.exit(1)
         mock_exit.assert_called_once_with(1)
 
-    @patch("sys.argv", ["prog", "--token", "test-token-123"])
+    @patch("sys.argv", ["prog", "--token", "test-token-123", "--no-manifest"])
     @patch("naviki_exporter.requests.Session")
     @patch("naviki_exporter.pathlib.Path")
     def test_main_with_api_error(self, mock_path, mock_session):
@@ -119,7 +146,7 @@ class TestMainFunction:
         # Should stop after error
         mock_session_instance.post.assert_not_called()
 
-    @patch("sys.argv", ["prog", "--token", "test-token-123"])
+    @patch("sys.argv", ["prog", "--token", "test-token-123", "--no-manifest"])
     @patch("naviki_exporter.requests.Session")
     @patch("naviki_exporter.pathlib.Path")
     @patch("builtins.open", new_callable=mock_open)
@@ -161,7 +188,7 @@ class TestMainFunction:
         # Should not download if file exists
         mock_session_instance.post.assert_not_called()
 
-    @patch("sys.argv", ["prog", "--token", "test-token-123"])
+    @patch("sys.argv", ["prog", "--token", "test-token-123", "--no-manifest"])
     @patch("naviki_exporter.requests.Session")
     @patch("naviki_exporter.pathlib.Path")
     @patch("builtins.open", new_callable=mock_open)
@@ -191,8 +218,7 @@ class TestMainFunction:
         ]
 
         # Mock download response
-        mock_download = MagicMock()
-        mock_download.text = "<?xml version='1.0'?><gpx>test</gpx>"
+        mock_download = gpx_response(b"<?xml version='1.0'?><gpx>test</gpx>")
         mock_session_instance.post.return_value = mock_download
 
         # Mock path
@@ -200,6 +226,8 @@ class TestMainFunction:
         mock_path.return_value = mock_output_dir
         mock_file_path = MagicMock()
         mock_file_path.exists.return_value = False
+        # Variantes compressées (.gpx.gz, .gpx.zst) absentes aussi
+        mock_file_path.with_name.return_value.exists.return_value = False
         mock_output_dir.joinpath.return_value = mock_file_path
 
         # Call main
@@ -208,7 +236,7 @@ class TestMainFunction:
         # Should still download using crdate
         mock_session_instance.post.assert_called_once()
 
-    @patch("sys.argv", ["prog", "--token", "test-token-123"])
+    @patch("sys.argv", ["prog", "--token", "test-token-123", "--no-manifest"])
     @patch("naviki_exporter.requests.Session")
     @patch("naviki_exporter.pathlib.Path")
     def test_main_handle_download_error(self, mock_path, mock_session):
@@ -237,8 +265,7 @@ class TestMainFunction:
         ]
 
         # Mock download response - invalid GPX
-        mock_download = MagicMock()
-        mock_download.text = "Error: not a GPX file"  # Doesn't start with <?xml
+        mock_download = gpx_response(b"Error: not a GPX file")  # Not <?xml
         mock_session_instance.post.return_value = mock_download
 
         # Mock path
@@ -246,6 +273,8 @@ class TestMainFunction:
         mock_path.return_value = mock_output_dir
         mock_file_path = MagicMock()
         mock_file_path.exists.return_value = False
+        # Variantes compressées (.gpx.gz, .gpx.zst) absentes aussi
+        mock_file_path.with_name.return_value.exists.return_value = False
         mock_output_dir.joinpath.return_value = mock_file_path
 
         # Call main - should not crash
@@ -254,7 +283,20 @@ class TestMainFunction:
         # Download was attempted but failed
         mock_session_instance.post.assert_called_once()
 
-    @patch("sys.argv", ["prog", "--username", "testuser", "--password", "testpass"])
+    @patch(
+        "sys.argv",
+        [
+            "prog",
+            "--username",
+            "testuser",
+            "--password",
+            "testpass",
+            "--no-manifest",
+            "--no-token-cache",
+            "--auth-method",
+            "selenium",
+        ],
+    )
     @patch("naviki_exporter.requests.Session")
     @patch("naviki_exporter.pathlib.Path")
     @patch("builtins.open", new_callable=mock_open)
@@ -268,7 +310,7 @@ class TestMainFunction:
         # Mock Firefox to return a token
         mock_driver = MagicMock()
         mock_firefox.return_value = mock_driver
-        mock_driver.execute_script.return_value = "selenium-token-123"
+        mock_driver.execute_script.return_value = {"token": "selenium-token-123"}
 
         # Mock form elements
         mock_username_field = MagicMock()
@@ -281,7 +323,11 @@ class TestMainFunction:
 
         # Mock WebDriverWait
         with patch("naviki_exporter.WebDriverWait") as mock_wait:
-            mock_wait.return_value.until.return_value = mock_username_field
+            # Formulaire trouvé, puis token apparu dans localStorage
+            mock_wait.return_value.until.side_effect = [
+                mock_username_field,
+                {"token": "selenium-token-123"},
+            ]
 
             # Setup mock session
             mock_session_instance = MagicMock()
@@ -302,8 +348,11 @@ class TestMainFunction:
 
             # Verify Firefox was called (authentication happened)
             mock_firefox.assert_called_once()
+            mock_session.return_value.headers.update.assert_any_call(
+                {"Authorization": "Bearer selenium-token-123"}
+            )
 
-    @patch("sys.argv", ["prog", "--token", "Bearer test-token-123"])
+    @patch("sys.argv", ["prog", "--token", "Bearer test-token-123", "--no-manifest"])
     @patch("naviki_exporter.requests.Session")
     @patch("naviki_exporter.pathlib.Path")
     def test_main_bearer_token_strip(self, mock_path, mock_session):
@@ -337,5 +386,170 @@ class TestMainFunction:
         assert auth_header == "Bearer test-token-123"
 
 
+class TestConcurrentDownloads:
+    """Tests du pool de téléchargement (--jobs)"""
+
+    def _ways_response(self, ways):
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {"ways": ways}
+        return response
+
+    def test_pool_downloads_all_ways(self, tmp_path):
+        """Tous les itinéraires sont téléchargés et comptés"""
+        ways = [
+            {"uuid": f"uuid-{i}", "title": f"Balade {i}", "crdate": 1729065600 + i * 60}
+            for i in range(12)
+        ]
+        session = MagicMock()
+        session.get.side_effect = [
+            self._ways_response(ways),
+            self._ways_response([]),
+        ]
+        session.post.return_value = gpx_response()
+
+        ctx = naviki_exporter.ExportContext(session, "token", tmp_path)
+        naviki_exporter.export_ways(ctx, "recordedMy", jobs=4)
+
+        assert session.post.call_count == 12
+        assert ctx.success_count == 12
+        assert ctx.skipped_count == 0
+        assert ctx.error_count == 0
+        assert len(list(tmp_path.glob("*.gpx"))) == 12
+
+    def test_pool_duplicate_names_downloaded_once(self, tmp_path):
+        """Deux itinéraires au même nom: un seul téléchargement, un ignoré"""
+        ways = [
+            {"uuid": "uuid-a", "title": "16/10/2025, 07:20", "crdate": 1729065600},
+            {"uuid": "uuid-b", "title": "16/10/2025, 07:20", "crdate": 1729065600},
+        ]
+        session = MagicMock()
+        session.get.side_effect = [
+            self._ways_response(ways),
+            self._ways_response([]),
+        ]
+        session.post.return_value = gpx_response()
+
+        ctx = naviki_exporter.ExportContext(session, "token", tmp_path)
+        naviki_exporter.export_ways(ctx, "recordedMy", jobs=2)
+
+        session.post.assert_called_once()
+        assert ctx.success_count == 1
+        assert ctx.skipped_count == 1
+
+    def test_pool_counts_errors(self, tmp_path):
+        """Les échecs de téléchargement sont comptés comme erreurs"""
+        ways = [
+            {"uuid": f"uuid-{i}", "title": f"Balade {i}", "crdate": 1729065600 + i * 60}
+            for i in range(5)
+        ]
+        session = MagicMock()
+        session.get.side_effect = [
+            self._ways_response(ways),
+            self._ways_response([]),
+        ]
+        session.post.side_effect = Exception("connexion perdue")
+
+        ctx = naviki_exporter.ExportContext(session, "token", tmp_path)
+        naviki_exporter.export_ways(ctx, "recordedMy", jobs=3)
+
+        assert ctx.error_count == 5
+        assert ctx.total_count == 5
+        assert list(tmp_path.glob("*.gpx")) == []
+
+
+class TestPipeline:
+    """Tests du pipeline pagination -> file bornée -> workers"""
+
+    def _paged_session(self, pages):
+        session = MagicMock()
+        responses_ = []
+        for ways in pages + [[]]:
+            response = MagicMock(status_code=200)
+            response.json.return_value = {"ways": ways}
+            responses_.append(response)
+        session.get.side_effect = responses_
+        return session
+
+    def _pages(self, count, size):
+        return [
+            [
+                {
+                    "uuid": f"uuid-{p}-{i}",
+                    "title": f"Balade {p}-{i}",
+                    "crdate": 1729065600 + (p * size + i) * 60,
+                }
+                for i in range(size)
+            ]
+            for p in range(count)
+        ]
+
+    def test_next_page_prefetched_during_downloads(self, tmp_path):
+        """La page suivante est demandée avant la fin des téléchargements"""
+        release = threading.Event()
+        session = self._paged_session(self._pages(3, 2))
+
+        def slow_post(*args, **kwargs):
+            release.wait(5)
+            return gpx_response()
+
+        session.post.side_effect = slow_post
+        ctx = naviki_exporter.ExportContext(session, "token", tmp_path)
+        runner = threading.Thread(
+            target=naviki_exporter.export_ways, args=(ctx, "recordedMy", 2)
+        )
+        runner.start()
+
+        # Aucun téléchargement n'est terminé, mais la liste a avancé
+        deadline = time.monotonic() + 5
+        while session.get.call_count < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert session.get.call_count >= 2
+        assert ctx.success_count == 0
+
+        release.set()
+        runner.join(5)
+        assert not runner.is_alive()
+        assert ctx.success_count == 6
+        assert session.get.call_count == 4  # 3 pages + page vide
+
+    def test_backpressure_bounds_prefetch(self, tmp_path):
+        """Une file pleine bloque la pagination"""
+        release = threading.Event()
+        session = self._paged_session(self._pages(10, 5))
+
+        def slow_post(*args, **kwargs):
+            release.wait(5)
+            return gpx_response()
+
+        session.post.side_effect = slow_post
+        ctx = naviki_exporter.ExportContext(session, "token", tmp_path)
+        runner = threading.Thread(
+            target=naviki_exporter.export_ways, args=(ctx, "recordedMy", 1)
+        )
+        runner.start()
+
+        time.sleep(0.2)
+        # 1 worker + file de 2: la première page n'est même pas consommée
+        assert session.get.call_count == 1
+
+        release.set()
+        runner.join(5)
+        assert not runner.is_alive()
+        assert ctx.success_count == 50
+
+    def test_worker_exception_does_not_stall_pipeline(self, tmp_path):
+        """Un itinéraire mal formé est compté en erreur sans bloquer"""
+        pages = [[{"title": "sans uuid"}] + self._pages(1, 3)[0]]
+        session = self._paged_session(pages)
+        session.post.return_value = gpx_response()
+
+        ctx = naviki_exporter.ExportContext(session, "token", tmp_path)
+        naviki_exporter.export_ways(ctx, "recordedMy", 1)
+
+        assert ctx.error_count == 1
+        assert ctx.success_count == 3
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
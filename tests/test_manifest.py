@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Tests du manifeste de synchronisation SQLite
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+GPX = "<?xml version='1.0'?><gpx>test</gpx>"
+
+
+def gpx_response(body=GPX.encode()):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.status_code = 200
+    response.headers = {}
+    response.iter_content.return_value = [body]
+    response.raw.tell.return_value = len(body)
+    return response
+
+
+WAYS = [
+    {"uuid": "uuid-1", "title": "16/10/2025, 07:20", "crdate": 1760599200},
+    {"uuid": "uuid-2", "title": "Route de la Chapelle", "crdate": 1729065600},
+]
+
+
+def make_session(ways):
+    session = MagicMock()
+    pages = []
+    for page in (ways, []):
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"ways": page}
+        pages.append(response)
+    session.get.side_effect = pages
+    session.post.return_value = gpx_response()
+    return session
+
+
+@pytest.fixture
+def run_export(naviki_exporter):
+    def run(output_dir, manifest, ways=WAYS):
+        session = make_session(ways)
+        ctx = naviki_exporter.ExportContext(
+            session, "token", output_dir, manifest=manifest
+        )
+        naviki_exporter.export_ways(ctx, "recordedMy", 2)
+        return ctx, session
+
+    return run
+
+
+class TestSyncManifest:
+    """Tests de SyncManifest"""
+
+    def test_record_and_reload(self, tmp_path, naviki_exporter):
+        """Les itinéraires enregistrés sont connus après réouverture"""
+        path = tmp_path / "manifest.sqlite3"
+        manifest = naviki_exporter.SyncManifest(path)
+        manifest.record(
+            WAYS[0],
+            "2025-10-16_07-20_Naviki.gpx",
+            naviki_exporter.SavedFile(42, "ab" * 32),
+        )
+        manifest.close()
+
+        reopened = naviki_exporter.SyncManifest(path)
+        assert "uuid-1" in reopened
+        assert "uuid-2" not in reopened
+        assert len(reopened) == 1
+        row = reopened._conn.execute(
+            "SELECT crdate, filename, size, sha256 FROM ways WHERE uuid = ?",
+            ("uuid-1",),
+        ).fetchone()
+        assert row == (1760599200, "2025-10-16_07-20_Naviki.gpx", 42, "ab" * 32)
+        reopened.close()
+
+    def test_download_recorded_with_hash(self, tmp_path, naviki_exporter, run_export):
+        """Un téléchargement réussi est enregistré avec taille et SHA-256"""
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        ctx, _ = run_export(tmp_path, manifest)
+
+        assert ctx.success_count == 2
+        assert len(manifest) == 2
+        expected = naviki_exporter.hash_file(tmp_path / "2025-10-16_07-20_Naviki.gpx")
+        row = manifest._conn.execute(
+            "SELECT size, sha256 FROM ways WHERE uuid = 'uuid-1'"
+        ).fetchone()
+        assert row == (expected.size, expected.sha256)
+
+    def test_rerun_skips_without_filesystem_access(
+        self, tmp_path, naviki_exporter, run_export
+    ):
+        """Un itinéraire connu est ignoré sans calcul de nom ni stat"""
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        run_export(tmp_path, manifest)
+
+        with patch.object(naviki_exporter, "build_filename") as build:
+            with patch.object(naviki_exporter.ExportContext, "claim") as claim:
+                ctx, session = run_export(tmp_path, manifest)
+
+        build.assert_not_called()
+        claim.assert_not_called()
+        session.post.assert_not_called()
+        assert ctx.skipped_count == 2
+
+    def test_existing_files_adopted(self, tmp_path, naviki_exporter, run_export):
+        """Les fichiers d'avant le manifeste y sont ajoutés sans téléchargement"""
+        existing = tmp_path / "2025-10-16_07-20_Naviki.gpx"
+        existing.write_text(GPX)
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+
+        ctx, session = run_export(tmp_path, manifest, WAYS[:1])
+
+        session.post.assert_not_called()
+        assert ctx.skipped_count == 1
+        assert "uuid-1" in manifest
+
+    def test_renamed_file_not_redownloaded(self, tmp_path, naviki_exporter, run_export):
+        """Le manifeste ne dépend pas du nom de fichier dérivé du titre"""
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        run_export(tmp_path, manifest)
+
+        renamed = [dict(way, title=f"Nouveau titre {way['uuid']}") for way in WAYS]
+        ctx, session = run_export(tmp_path, manifest, renamed)
+
+        session.post.assert_not_called()
+        assert ctx.skipped_count == 2
+
+
+def paged_session(pages):
+    session = MagicMock()
+    responses_ = []
+    for page in pages + [[]]:
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"ways": page}
+        responses_.append(response)
+    session.get.side_effect = responses_
+    session.post.return_value = gpx_response()
+    return session
+
+
+def account_ways(count, newest=1760599200):
+    """Itinéraires triés par crdate décroissant, comme l'API"""
+    return [
+        {"uuid": f"uuid-{i}", "title": f"Balade {i}", "crdate": newest - i * 3600}
+        for i in range(count)
+    ]
+
+
+def paginate(ways, size=10):
+    return [ways[i : i + size] for i in range(0, len(ways), size)]
+
+
+class TestIncrementalSync:
+    """Tests du mode incrémental"""
+
+    def _run(self, naviki_exporter, tmp_path, manifest, ways, incremental, failing=()):
+        session = paged_session(paginate(ways))
+
+        def post(url, data, **kwargs):
+            if data["wayUuid"] in failing:
+                raise ValueError("GPX illisible")
+            return gpx_response()
+
+        session.post.side_effect = post
+        ctx = naviki_exporter.ExportContext(
+            session, "token", tmp_path, manifest=manifest, incremental=incremental
+        )
+        naviki_exporter.export_ways(ctx, "recordedMy", 2)
+        naviki_exporter.record_high_water(ctx)
+        return ctx, session
+
+    def test_stops_after_known_run(self, tmp_path, naviki_exporter):
+        """Deux nouveaux itinéraires en tête: une seule page demandée"""
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        ways = account_ways(100)
+        self._run(naviki_exporter, tmp_path, manifest, ways[2:], incremental=None)
+
+        ctx, session = self._run(
+            naviki_exporter, tmp_path, manifest, ways, incremental=5
+        )
+
+        assert session.get.call_count == 1
+        assert ctx.success_count == 2
+        assert ctx.listing_complete
+
+    def test_partial_first_sync_listed_again(self, tmp_path, naviki_exporter):
+        """Première synchronisation en erreur: pas d'arrêt sur les connus"""
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        ways = account_ways(40)
+        first, _ = self._run(
+            naviki_exporter, tmp_path, manifest, ways, None, failing={"uuid-25"}
+        )
+        assert first.error_count == 1
+        assert manifest.high_water_crdate is None
+
+        ctx, session = self._run(
+            naviki_exporter, tmp_path, manifest, ways, incremental=5
+        )
+
+        assert session.get.call_count == 5
+        assert ctx.success_count == 1
+        assert "uuid-25" in manifest
+        assert manifest.high_water_crdate == ways[0]["crdate"]
+
+    def test_gap_above_high_water(self, tmp_path, naviki_exporter):
+        """Les itinéraires plus récents que le high-water sont tous listés"""
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        ways = account_ways(60)
+        self._run(naviki_exporter, tmp_path, manifest, ways[30:], incremental=None)
+        # Synchronisation suivante en erreur sur un itinéraire ancien
+        self._run(
+            naviki_exporter,
+            tmp_path,
+            manifest,
+            ways,
+            incremental=5,
+            failing={"uuid-25"},
+        )
+
+        ctx, session = self._run(
+            naviki_exporter, tmp_path, manifest, ways, incremental=5
+        )
+
+        assert ctx.success_count == 1
+        assert "uuid-25" in manifest
+        # Arrêt après 5 itinéraires sous le high-water (uuid-30 à uuid-34)
+        assert session.get.call_count == 4
+
+    def test_full_listing_without_incremental(self, tmp_path, naviki_exporter):
+        """Sans --incremental, toutes les pages sont parcourues"""
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        ways = account_ways(30)
+        self._run(naviki_exporter, tmp_path, manifest, ways, incremental=None)
+
+        ctx, session = self._run(
+            naviki_exporter, tmp_path, manifest, ways, incremental=None
+        )
+
+        assert session.get.call_count == 4
+        assert ctx.skipped_count == 30
+
+    def test_run_resets_on_unknown_way(self, tmp_path, naviki_exporter):
+        """Un itinéraire inconnu au milieu remet la série à zéro"""
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        ways = account_ways(40)
+        known = ways[:3] + ways[4:]
+        self._run(naviki_exporter, tmp_path, manifest, known, incremental=None)
+
+        ctx, _ = self._run(naviki_exporter, tmp_path, manifest, ways, incremental=5)
+
+        assert ctx.success_count == 1
+        assert "uuid-3" in manifest
+
+    def test_high_water_counts_as_synced(self, tmp_path, naviki_exporter):
+        """Un itinéraire antérieur au high-water est considéré synchronisé"""
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        ways = account_ways(50)
+        manifest.update_high_water(ways[0]["crdate"])
+
+        ctx, session = self._run(
+            naviki_exporter, tmp_path, manifest, ways, incremental=3
+        )
+
+        assert session.get.call_count == 1
+        assert ctx.success_count == 3
+
+    def test_high_water_never_moves_back(self, tmp_path, naviki_exporter):
+        """Le high-water crdate ne recule jamais"""
+        manifest = naviki_exporter.SyncManifest(tmp_path / "m.sqlite3")
+        manifest.update_high_water(2000)
+        manifest.update_high_water(1000)
+
+        assert manifest.high_water_crdate == 2000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Tests de l'export des points en Parquet (--parquet)
+"""
+
+import multiprocessing
+import sys
+from unittest.mock import patch
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def points(lat, times):
+    """Colonnes de track_points pour une trace vers le nord"""
+    n = len(times)
+    return {
+        "lat": lat + np.arange(n) * 1e-4,
+        "lon": np.full(n, 2.0),
+        "ele": np.full(n, np.nan),
+        "time": np.array(times, dtype=float),
+    }
+
+
+class TestTrackPoints:
+    """Extraction des points d'un GPX"""
+
+    def test_columns(self, tmp_path, naviki_exporter, fake_naviki_server):
+        """Coordonnées et altitudes, heures absentes en NaN"""
+        path = tmp_path / "trace.gpx"
+        path.write_bytes(fake_naviki_server.gpx_for("uuid", 4))
+
+        result = naviki_exporter.track_points(path)
+
+        assert len(result["lat"]) == 4
+        assert not np.isnan(result["ele"]).any()
+        assert np.isnan(result["time"]).all()
+
+
+class TestParquetSink:
+    """Écriture des fichiers partitionnés"""
+
+    def test_year_partitions(self, tmp_path, naviki_exporter):
+        """Année du premier point horodaté, sinon date de création"""
+        sink = naviki_exporter.ParquetSink(tmp_path)
+        sink.add("a", None, points(48.0, [1717228800, 1717228810]))  # 2024
+        sink.add("b", 1735732800, points(49.0, [np.nan] * 3))  # 2025
+        sink.close()
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "year=2024",
+            "year=2025",
+        ]
+        assert not list(tmp_path.glob("year=*/.*"))
+        table = pq.read_table(tmp_path, filters=[("year", "=", 2025)])
+        assert table.num_rows == 3
+        assert set(table.column("uuid").to_pylist()) == {"b"}
+        assert table.column("time").null_count == 3
+        assert table.column("ele").null_count == 3
+
+    def test_spatial_row_groups(self, tmp_path, naviki_exporter):
+        """Groupes triés par emprise: une lecture filtrée n'en garde qu'un"""
+        with patch.object(naviki_exporter, "PARQUET_ROW_GROUP_ROWS", 5):
+            sink = naviki_exporter.ParquetSink(tmp_path)
+            # 5 traces vers le nord, chacune traversant 4 degrés de latitude
+            for i in range(5):
+                track = points(40.0, [1717228800.0] * 4)
+                track["lat"] = 40.0 + np.arange(4.0)
+                track["lon"] = np.full(4, 2.0 + i * 0.01)
+                sink.add(f"w{i}", None, track)
+            sink.close()
+
+        (path,) = tmp_path.glob("year=2024/*.parquet")
+        metadata = pq.ParquetFile(path).metadata
+        assert metadata.num_row_groups == 4
+        bounds = [
+            (
+                metadata.row_group(i).column(3).statistics.min,
+                metadata.row_group(i).column(3).statistics.max,
+            )
+            for i in range(metadata.num_row_groups)
+        ]
+        # Emprise 41.5°-42.5°: un seul groupe à lire
+        assert sum(low <= 42.5 and high >= 41.5 for low, high in bounds) == 1
+
+        table = pq.read_table(path, filters=[("lat", ">=", 41.5), ("lat", "<=", 42.5)])
+        assert table.num_rows == 5
+
+    def test_track_order_kept(self, tmp_path, naviki_exporter):
+        """seq rend l'ordre des points d'une trace après le tri spatial"""
+        sink = naviki_exporter.ParquetSink(tmp_path)
+        track = points(48.0, [np.nan] * 6)
+        track["lat"] = np.array([48.5, 48.0, 48.3, 48.1, 48.4, 48.2])
+        sink.add("a", 1735732800, track)
+        sink.close()
+
+        table = pq.read_table(tmp_path).sort_by("seq")
+        assert table.column("lat").to_pylist() == track["lat"].tolist()
+
+    def test_runs_in_same_second(self, tmp_path, naviki_exporter):
+        """Deux écritures de la même seconde ne s'écrasent pas"""
+        for uuid in ("a", "b"):
+            sink = naviki_exporter.ParquetSink(tmp_path)
+            sink.add(uuid, None, points(48.0, [1717228800]))
+            sink.close()
+
+        assert len(list(tmp_path.glob("year=2024/*.parquet"))) == 2
+        assert pq.read_table(tmp_path).num_rows == 2
+
+    def test_known_uuids(self, tmp_path, naviki_exporter):
+        """Les traces des exécutions précédentes sont reconnues"""
+        sink = naviki_exporter.ParquetSink(tmp_path)
+        sink.add("a", None, points(48.0, [1717228800]))
+        sink.close()
+
+        assert "a" in naviki_exporter.ParquetSink(tmp_path)
+
+    def test_incompatible_with_archive(self, naviki_exporter):
+        """--parquet et --archive: erreur"""
+        argv = ["prog", "--token", "t", "--parquet", "p", "--archive", "a.zip"]
+        with patch("sys.argv", argv):
+            with pytest.raises(SystemExit):
+                naviki_exporter.parse_arguments()
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="les processus du pool doivent hériter du module chargé",
+)
+class TestParquetExport:
+    """Étape --parquet de l'export"""
+
+    def test_export_and_backfill(
+        self,
+        tmp_path,
+        capsys,
+        monkeypatch,
+        naviki_exporter,
+        fake_naviki_server,
+        run_main,
+    ):
+        """Export, ajout des GPX déjà synchronisés, sans doublon ensuite"""
+        # Le pool de processus retrouve les fonctions par nom de module
+        monkeypatch.setitem(sys.modules, "naviki_exporter", naviki_exporter)
+        parquet = tmp_path / "points"
+        with fake_naviki_server.FakeNavikiServer(ways=3, points=7) as server:
+            run_main(server, tmp_path, "--compress", "gzip")
+        with fake_naviki_server.FakeNavikiServer(ways=5, points=7) as server:
+            run_main(server, tmp_path, "--parquet", str(parquet))
+            run_main(server, tmp_path, "--parquet", str(parquet), "--revalidate")
+
+        out = capsys.readouterr().out
+        assert "🧱 3 GPX déjà synchronisés ajoutés aux fichiers Parquet" in out
+        assert "🧱 Parquet: 5 traces ajoutées, 35 points" in out
+        table = pq.read_table(parquet)
+        assert table.num_rows == 35
+        assert len(set(table.column("uuid").to_pylist())) == 5
+        # GPX simulés sans heures: année de création des itinéraires
+        assert set(table.column("year").to_pylist()) == {2025}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests des nouvelles tentatives, de Retry-After et du limiteur de débit
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class TestRetryAfter:
+    """Tests de parse_retry_after"""
+
+    def test_seconds(self, naviki_exporter):
+        """Retry-After en secondes"""
+        assert naviki_exporter.parse_retry_after("3") == 3.0
+
+    def test_http_date(self, naviki_exporter):
+        """Retry-After en date HTTP"""
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+        delay = naviki_exporter.parse_retry_after(format_datetime(when, usegmt=True))
+        assert 25 <= delay <= 30
+
+    def test_capped_and_invalid(self, naviki_exporter):
+        """Délai plafonné, valeurs absentes ou illisibles ignorées"""
+        assert (
+            naviki_exporter.parse_retry_after("86400")
+            == naviki_exporter.RETRY_AFTER_MAX
+        )
+        assert naviki_exporter.parse_retry_after("-5") == 0.0
+        assert naviki_exporter.parse_retry_after(None) is None
+        assert naviki_exporter.parse_retry_after("bientôt") is None
+
+
+class TestRetryPolicy:
+    """Tests du backoff exponentiel"""
+
+    def test_delay_bounded(self, naviki_exporter):
+        """Le jitter reste sous le backoff exponentiel plafonné"""
+        policy = naviki_exporter.RetryPolicy(backoff=1.0, backoff_max=5.0)
+        for attempt in range(10):
+            assert 0 <= policy.delay(attempt) <= min(5.0, 2**attempt)
+
+    def test_call_with_retry_raises_after_retries(self, naviki_exporter):
+        """La dernière erreur est relevée après abandon"""
+        ctx = naviki_exporter.ExportContext(
+            MagicMock(),
+            "token",
+            None,
+            retry_policy=naviki_exporter.RetryPolicy(retries=2, backoff=0),
+        )
+        func = MagicMock(side_effect=naviki_exporter.TransientHTTPError(500))
+
+        with pytest.raises(naviki_exporter.TransientHTTPError):
+            naviki_exporter.call_with_retry(ctx, "test", func)
+
+        assert func.call_count == 3
+        assert ctx.retry_count == 2
+
+    def test_other_errors_not_retried(self, naviki_exporter):
+        """Une erreur non transitoire n'est pas réessayée"""
+        ctx = naviki_exporter.ExportContext(MagicMock(), "token", None)
+        func = MagicMock(side_effect=ValueError("JSON invalide"))
+
+        with pytest.raises(ValueError):
+            naviki_exporter.call_with_retry(ctx, "test", func)
+
+        assert func.call_count == 1
+        assert ctx.retry_count == 0
+
+
+class TestRateLimiter:
+    """Tests du seau de jetons"""
+
+    def test_unlimited_by_default(self, naviki_exporter):
+        """Sans débit, aucune attente"""
+        limiter = naviki_exporter.RateLimiter()
+        assert all(limiter._reserve() == 0 for _ in range(100))
+
+    def test_rate_paces_requests(self, naviki_exporter):
+        """Au-delà du burst, les requêtes sont espacées de 1/rate"""
+        limiter = naviki_exporter.RateLimiter(rate=10, burst=2)
+        waits = [limiter._reserve() for _ in range(4)]
+
+        assert waits[:2] == [0, 0]
+        assert waits[2] == pytest.approx(0.1, abs=0.01)
+        assert waits[3] == pytest.approx(0.2, abs=0.01)
+
+    def test_hold_pauses_all_requests(self, naviki_exporter):
+        """Un Retry-After suspend toutes les requêtes"""
+        limiter = naviki_exporter.RateLimiter()
+        limiter.hold(0.2)
+
+        start = time.monotonic()
+        limiter.acquire()
+
+        assert time.monotonic() - start >= 0.15
+        assert limiter._reserve() == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -7,6 +7,7 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock
 import sys
 import os
+from urllib.parse import unquote
 
 # Import the module
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -26,6 +27,31 @@ sys.modules["naviki_exporter"] = naviki_exporter
 spec.loader.exec_module(naviki_exporter)
 
 
+def fake_webdriver_wait(username_field, form_timeout=False):
+    """
+    Remplace WebDriverWait: le formulaire est trouvé tout de suite (ou
+    jamais), et la condition du token est évaluée une fois sur le driver
+    """
+    from selenium.common.exceptions import TimeoutException
+
+    def make_wait(driver, *args, **kwargs):
+        def until(condition):
+            if condition is naviki_exporter.token_or_login_error:
+                result = condition(driver)
+                if not result:
+                    raise TimeoutException("token")
+                return result
+            if form_timeout:
+                raise TimeoutException("Form not found")
+            return username_field
+
+        wait = MagicMock()
+        wait.until.side_effect = until
+        return wait
+
+    return make_wait
+
+
 class TestSeleniumAuth:
     """Tests pour get_oauth_token_with_selenium avec mocks"""
 
@@ -37,7 +63,7 @@ class TestSeleniumAuth:
         mock_firefox.return_value = mock_driver
 
         # Mock localStorage containing the token
-        mock_driver.execute_script.return_value = "test-token-12345"
+        mock_driver.execute_script.return_value = {"token": "test-token-12345"}
 
         # Mock form elements
         mock_username_field = MagicMock()
@@ -50,8 +76,10 @@ class TestSeleniumAuth:
         ]
 
         # Mock WebDriverWait
-        with patch("naviki_exporter.WebDriverWait") as mock_wait:
-            mock_wait.return_value.until.return_value = mock_username_field
+        with patch(
+            "naviki_exporter.WebDriverWait",
+            side_effect=fake_webdriver_wait(mock_username_field),
+        ):
 
             # Call function
             token = naviki_exporter.get_oauth_token_with_selenium(
@@ -71,7 +99,7 @@ class TestSeleniumAuth:
         mock_firefox.return_value = mock_driver
 
         # Mock localStorage containing the token
-        mock_driver.execute_script.return_value = "test-token-visible"
+        mock_driver.execute_script.return_value = {"token": "test-token-visible"}
 
         # Mock form elements
         mock_username_field = MagicMock()
@@ -84,8 +112,10 @@ class TestSeleniumAuth:
         ]
 
         # Mock WebDriverWait
-        with patch("naviki_exporter.WebDriverWait") as mock_wait:
-            mock_wait.return_value.until.return_value = mock_username_field
+        with patch(
+            "naviki_exporter.WebDriverWait",
+            side_effect=fake_webdriver_wait(mock_username_field),
+        ):
 
             # Call function with headless=False
             token = naviki_exporter.get_oauth_token_with_selenium(
@@ -97,29 +127,25 @@ class TestSeleniumAuth:
             mock_driver.quit.assert_called_once()
 
     @patch("naviki_exporter.webdriver.Firefox")
-    @patch("naviki_exporter.time.sleep")  # Speed up test
-    def test_authentication_timeout(self, mock_sleep, mock_firefox):
+    def test_authentication_timeout(self, mock_firefox):
         """Test timeout si le token n'apparaît pas"""
         # Setup mock driver
         mock_driver = MagicMock()
         mock_firefox.return_value = mock_driver
 
-        # Mock localStorage never returning a token
+        # Mock localStorage never returning a token (and no error message)
         mock_driver.execute_script.return_value = None
 
-        # Mock body element for error checking
-        mock_body = MagicMock()
-        mock_body.text = "normal page content"
-        mock_driver.find_element.return_value = mock_body
-
         # Mock form elements
         mock_username_field = MagicMock()
         mock_password_field = MagicMock()
         mock_submit_button = MagicMock()
 
         # Mock WebDriverWait
-        with patch("naviki_exporter.WebDriverWait") as mock_wait:
-            mock_wait.return_value.until.return_value = mock_username_field
+        with patch(
+            "naviki_exporter.WebDriverWait",
+            side_effect=fake_webdriver_wait(mock_username_field),
+        ):
 
             # We need to set up find_element to return different things
             def find_element_side_effect(by, value):
@@ -127,8 +153,6 @@ class TestSeleniumAuth:
                     return mock_password_field
                 elif value == "submit" or "submit" in str(value):
                     return mock_submit_button
-                elif value == "body":
-                    return mock_body
                 return MagicMock()
 
             mock_driver.find_element.side_effect = find_element_side_effect
@@ -150,40 +174,34 @@ class TestSeleniumAuth:
         mock_driver = MagicMock()
         mock_firefox.return_value = mock_driver
 
-        # Mock localStorage never returning a token
-        mock_driver.execute_script.return_value = None
-
-        # Mock body element with error message
-        mock_body = MagicMock()
-        mock_body.text = "Error: Invalid credentials"
-        mock_driver.find_element.return_value = mock_body
+        # Mock the login form showing an error message
+        mock_driver.execute_script.return_value = {"error": "Invalid credentials"}
 
         # Mock form elements
         mock_username_field = MagicMock()
         mock_password_field = MagicMock()
 
         # Mock WebDriverWait
-        with patch("naviki_exporter.WebDriverWait") as mock_wait:
-            mock_wait.return_value.until.return_value = mock_username_field
+        with patch(
+            "naviki_exporter.WebDriverWait",
+            side_effect=fake_webdriver_wait(mock_username_field),
+        ):
 
             def find_element_side_effect(by, value):
                 if value == "password":
                     return mock_password_field
-                elif value == "body":
-                    return mock_body
                 return MagicMock()
 
             mock_driver.find_element.side_effect = find_element_side_effect
 
-            # Mock time.sleep to speed up test
-            with patch("naviki_exporter.time.sleep"):
-                token = naviki_exporter.get_oauth_token_with_selenium(
-                    "testuser", "wrongpass", headless=True
-                )
+            token = naviki_exporter.get_oauth_token_with_selenium(
+                "testuser", "wrongpass", headless=True
+            )
 
-                # Assertions
-                assert token is None
-                mock_driver.quit.assert_called_once()
+            # Assertions: the error stops the wait right away
+            assert token is None
+            mock_driver.execute_script.assert_called_once()
+            mock_driver.quit.assert_called_once()
 
     @patch("naviki_exporter.webdriver.Firefox")
     def test_webdriver_exception(self, mock_firefox):
@@ -204,30 +222,26 @@ class TestSeleniumAuth:
     @patch("naviki_exporter.webdriver.Firefox")
     def test_timeout_exception(self, mock_firefox):
         """Test gestion du timeout sur le formulaire"""
-        from selenium.common.exceptions import TimeoutException
-
         # Setup mock driver
         mock_driver = MagicMock()
         mock_firefox.return_value = mock_driver
 
         # Mock localStorage returning a token after timeout
-        mock_driver.execute_script.return_value = "token-after-timeout"
+        mock_driver.execute_script.return_value = {"token": "token-after-timeout"}
 
         # Mock WebDriverWait raising TimeoutException
-        with patch("naviki_exporter.WebDriverWait") as mock_wait:
-            mock_wait.return_value.until.side_effect = TimeoutException(
-                "Form not found"
-            )
+        with patch(
+            "naviki_exporter.WebDriverWait",
+            side_effect=fake_webdriver_wait(None, form_timeout=True),
+        ):
 
-            # Mock time.sleep to speed up test
-            with patch("naviki_exporter.time.sleep"):
-                token = naviki_exporter.get_oauth_token_with_selenium(
-                    "testuser", "testpass", headless=True
-                )
+            token = naviki_exporter.get_oauth_token_with_selenium(
+                "testuser", "testpass", headless=True
+            )
 
-                # Even with timeout, it might get token from localStorage
-                assert token == "token-after-timeout"
-                mock_driver.quit.assert_called_once()
+            # Even with timeout, it might get token from localStorage
+            assert token == "token-after-timeout"
+            mock_driver.quit.assert_called_once()
 
     @patch("naviki_exporter.webdriver.Firefox")
     def test_form_submit_fallback(self, mock_firefox):
@@ -237,7 +251,7 @@ class TestSeleniumAuth:
         mock_firefox.return_value = mock_driver
 
         # Mock localStorage containing the token
-        mock_driver.execute_script.return_value = "test-token-submit"
+        mock_driver.execute_script.return_value = {"token": "test-token-submit"}
 
         # Mock form elements
         mock_username_field = MagicMock()
@@ -252,8 +266,10 @@ class TestSeleniumAuth:
         mock_driver.find_element.side_effect = find_element_side_effect
 
         # Mock WebDriverWait
-        with patch("naviki_exporter.WebDriverWait") as mock_wait:
-            mock_wait.return_value.until.return_value = mock_username_field
+        with patch(
+            "naviki_exporter.WebDriverWait",
+            side_effect=fake_webdriver_wait(mock_username_field),
+        ):
 
             # Call function
             token = naviki_exporter.get_oauth_token_with_selenium(
@@ -265,6 +281,115 @@ class TestSeleniumAuth:
             mock_password_field.submit.assert_called_once()
             mock_driver.quit.assert_called_once()
 
+    @patch("naviki_exporter.webdriver.Firefox")
+    def test_token_wait_is_fine_grained(self, mock_firefox):
+        """Test que le token est vérifié toutes les 100 ms, pas chaque seconde"""
+        mock_driver = MagicMock()
+        mock_firefox.return_value = mock_driver
+        mock_driver.execute_script.return_value = {"token": "test-token-fast"}
+
+        with patch(
+            "naviki_exporter.WebDriverWait",
+            side_effect=fake_webdriver_wait(MagicMock()),
+        ) as mock_wait:
+            with patch("naviki_exporter.time.sleep") as mock_sleep:
+                token = naviki_exporter.get_oauth_token_with_selenium(
+                    "testuser", "testpass", headless=True
+                )
+
+        assert token == "test-token-fast"
+        mock_sleep.assert_not_called()
+        for wait_call in mock_wait.call_args_list:
+            assert wait_call.kwargs["poll_frequency"] == 0.1
+
+    @patch("naviki_exporter.webdriver.Firefox")
+    def test_login_time_includes_launch(self, mock_firefox):
+        """Test que la durée rapportée part d'avant le lancement du navigateur"""
+        mock_driver = MagicMock()
+        launched = []
+
+        def launch(*args, **kwargs):
+            launched.append(naviki_exporter.time.monotonic())
+            return mock_driver
+
+        mock_firefox.side_effect = launch
+        mock_driver.execute_script.return_value = {"token": "test-token-time"}
+
+        with patch(
+            "naviki_exporter.WebDriverWait",
+            side_effect=fake_webdriver_wait(MagicMock()),
+        ):
+            with patch("naviki_exporter.report_browser_usage") as mock_report:
+                naviki_exporter.get_oauth_token_with_selenium("testuser", "testpass")
+
+        started = mock_report.call_args.args[1]
+        assert started <= launched[0]
+
+    def test_token_probe_survives_navigation(self):
+        """Test qu'une page en cours de redirection ne fait pas échouer l'attente"""
+        from selenium.common.exceptions import JavascriptException
+
+        mock_driver = MagicMock()
+        mock_driver.execute_script.side_effect = JavascriptException(
+            "Document was unloaded"
+        )
+
+        assert naviki_exporter.token_or_login_error(mock_driver) is False
+
+        mock_driver.execute_script.side_effect = None
+        mock_driver.execute_script.return_value = None
+        assert naviki_exporter.token_or_login_error(mock_driver) is False
+
+
+class TestFirefoxProfile:
+    """Tests du profil Firefox de la connexion"""
+
+    def test_lean_profile(self):
+        """Test du profil lean: eager, sans images ni polices, hôtes bloqués"""
+        options = naviki_exporter.build_firefox_options(headless=True)
+
+        prefs = options.preferences
+        assert options.page_load_strategy == "eager"
+        assert "--headless" in options.arguments
+        assert prefs["permissions.default.image"] == 2
+        assert prefs["gfx.downloadable_fonts.enabled"] is False
+        assert prefs["browser.cache.disk.enable"] is False
+        assert prefs["network.proxy.type"] == 2
+        assert "googletagmanager.com" in unquote(prefs["network.proxy.autoconfig_url"])
+
+    def test_full_profile(self):
+        """Test du profil full: comportement d'origine"""
+        options = naviki_exporter.build_firefox_options(headless=False, profile="full")
+
+        assert options.page_load_strategy == "normal"
+        assert "--headless" not in options.arguments
+        assert "permissions.default.image" not in options.preferences
+        assert "network.proxy.type" not in options.preferences
+
+    @patch("naviki_exporter.webdriver.Firefox")
+    def test_selenium_uses_lean_profile(self, mock_firefox):
+        """Test que la connexion utilise le profil lean par défaut"""
+        mock_driver = MagicMock()
+        mock_firefox.return_value = mock_driver
+        mock_driver.execute_script.return_value = {"token": "test-token-lean"}
+
+        with patch(
+            "naviki_exporter.WebDriverWait",
+            side_effect=fake_webdriver_wait(MagicMock()),
+        ):
+            naviki_exporter.get_oauth_token_with_selenium("testuser", "testpass")
+
+        options = mock_firefox.call_args.kwargs["options"]
+        assert options.page_load_strategy == "eager"
+
+    @pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="Linux")
+    def test_browser_peak_rss(self):
+        """Test du pic mémoire lu dans /proc pour un arbre de processus"""
+        rss = naviki_exporter.browser_peak_rss(os.getpid())
+
+        assert rss is not None and rss > 1024 * 1024
+        assert naviki_exporter.browser_peak_rss(2**22 + 12345) is None
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Tests de la simplification des traces (--simplify)
+"""
+
+import multiprocessing
+import sys
+from unittest.mock import patch
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+GPX_NS = "http://www.topografix.com/GPX/1/1"
+
+
+def gpx_with_corner(points):
+    """GPX 1.1 en L: `points` points vers l'est puis autant vers le nord"""
+    coords = [(48.0, 2.0 + i * 1e-4) for i in range(points)]
+    coords += [(48.0 + i * 1e-4, 2.0 + (points - 1) * 1e-4) for i in range(1, points)]
+    trkpts = "".join(
+        f'<trkpt lat="{lat:.6f}" lon="{lon:.6f}"><ele>35</ele></trkpt>'
+        for lat, lon in coords
+    )
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>\n<gpx xmlns="{GPX_NS}" '
+        'version="1.1" creator="Naviki"><metadata><name>Sortie</name></metadata>'
+        f"<trk><name>Sortie</name><trkseg>{trkpts}</trkseg></trk></gpx>\n"
+    ).encode()
+
+
+class TestDouglasPeucker:
+    """Algorithme de simplification"""
+
+    def test_straight_line(self, naviki_exporter):
+        """Un bruit inférieur à la tolérance est supprimé"""
+        x = np.arange(100, dtype=float)
+        y = np.where(np.arange(100) % 2, 0.5, -0.5)
+
+        keep = naviki_exporter.douglas_peucker(np.column_stack((x, y)), 1.0)
+
+        assert np.flatnonzero(keep).tolist() == [0, 99]
+
+    def test_corner_kept(self, naviki_exporter):
+        """Un écart supérieur à la tolérance est conservé"""
+        xy = np.array([[0, 0], [5, 0], [10, 0], [10, 5], [10, 10]], dtype=float)
+
+        keep = naviki_exporter.douglas_peucker(xy, 1.0)
+
+        assert np.flatnonzero(keep).tolist() == [0, 2, 4]
+
+    def test_closed_loop(self, naviki_exporter):
+        """Une boucle (départ = arrivée) garde son point le plus éloigné"""
+        angles = np.linspace(0, 2 * np.pi, 50)
+        xy = np.column_stack((np.cos(angles), np.sin(angles))) * 100
+
+        keep = naviki_exporter.douglas_peucker(xy, 1.0)
+
+        assert 2 < keep.sum() < 50
+
+
+class TestSimplifyGpxFile:
+    """Réécriture d'un fichier GPX"""
+
+    def test_simplified_sibling(self, tmp_path, naviki_exporter):
+        """Points superflus retirés, métadonnées et espace de noms conservés"""
+        src = tmp_path / "2025-10-16_07-20_Naviki.gpx"
+        src.write_bytes(gpx_with_corner(50))
+        dst = naviki_exporter.simplified_path(src)
+
+        before, after = naviki_exporter.simplify_gpx_file(src, dst, 1.0)
+
+        assert dst.name == "2025-10-16_07-20_Naviki.simplified.gpx"
+        assert (before, after) == (99, 3)
+        content = dst.read_text()
+        assert f'<gpx xmlns="{GPX_NS}"' in content
+        assert "ns0:" not in content
+        assert "<metadata><name>Sortie</name></metadata>" in content
+        assert content.count("<ele>35</ele>") == 3
+
+    def test_compressed_source(self, tmp_path, naviki_exporter):
+        """Un GPX stocké compressé (--compress) est lu directement"""
+        src = tmp_path / "trace.gpx"
+        src.write_bytes(gpx_with_corner(10))
+        naviki_exporter.compress_file(src, tmp_path / "trace.gpx.gz", "gzip")
+
+        stored = tmp_path / "trace.gpx.gz"
+        result = naviki_exporter.simplify_gpx_file(
+            stored, naviki_exporter.simplified_path(stored), 1.0
+        )
+
+        assert result == (19, 3)
+        assert (tmp_path / "trace.simplified.gpx").exists()
+
+
+class TestSimplifyArguments:
+    """Option --simplify"""
+
+    def test_default_tolerance(self, naviki_exporter):
+        """Sans valeur, tolérance par défaut"""
+        with patch("sys.argv", ["prog", "--token", "t", "--simplify"]):
+            args = naviki_exporter.parse_arguments()
+
+        assert args.simplify == naviki_exporter.SIMPLIFY_DEFAULT_TOLERANCE
+
+    def test_requires_numpy(self, naviki_exporter):
+        """--simplify sans numpy: erreur explicite"""
+        with patch("sys.argv", ["prog", "--token", "t", "--simplify"]):
+            with patch.object(
+                naviki_exporter.importlib.util, "find_spec", return_value=None
+            ):
+                with pytest.raises(SystemExit):
+                    naviki_exporter.parse_arguments()
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="les processus du pool doivent hériter du module chargé",
+)
+class TestSimplifyStage:
+    """Étape --simplify de l'export"""
+
+    def test_export_simplified(
+        self, tmp_path, capsys, monkeypatch, naviki_exporter, fake_naviki_server
+    ):
+        """Chaque GPX téléchargé a sa version simplifiée"""
+        # Le pool de processus retrouve les fonctions par nom de module
+        monkeypatch.setitem(sys.modules, "naviki_exporter", naviki_exporter)
+        argv = [
+            "prog",
+            "--output",
+            str(tmp_path),
+            "--simplify",
+            "--compress",
+            "gzip",
+        ]
+        with fake_naviki_server.FakeNavikiServer(ways=6, points=100) as server:
+            argv += ["--token", server.token, "--api-url", server.api_url]
+            with patch("sys.argv", argv):
+                naviki_exporter.main()
+
+        assert len(list(tmp_path.glob("*.gpx.gz"))) == 6
+        simplified = list(tmp_path.glob(f"*{naviki_exporter.SIMPLIFIED_SUFFIX}"))
+        assert len(simplified) == 6
+        # Les traces simulées sont des lignes droites
+        assert simplified[0].read_text().count("<trkpt") == 2
+        assert "📉 Simplification: 6 traces, 600 → 12 points" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
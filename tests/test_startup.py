@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests du chargement paresseux des dépendances lourdes
+"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+# Exécuté dans un nouvel interpréteur: les autres tests ont déjà importé
+# Selenium dans celui de pytest (et conftest, unittest.mock donc asyncio)
+PROBE = """
+import importlib.util, json, sys
+spec = importlib.util.spec_from_file_location("naviki_exporter", {script!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+sys.argv = ["naviki-gpx-exporter.py"] + {argv!r}
+args = module.parse_arguments()
+module.create_session("token", args.jobs)
+loaded = [name for name in ("selenium", "bs4", "asyncio") if name in sys.modules]
+{extra}
+print(json.dumps(loaded))
+"""
+
+
+@pytest.fixture
+def loaded_modules(naviki_exporter):
+    def probe(argv, extra=""):
+        code = PROBE.format(script=naviki_exporter.__file__, argv=argv, extra=extra)
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        return json.loads(out.strip().splitlines()[-1])
+
+    return probe
+
+
+class TestLazyImports:
+    """Tests des imports à la demande"""
+
+    def test_token_mode_loads_no_heavy_module(self, loaded_modules):
+        """Test qu'un lancement --token n'importe ni Selenium, ni bs4, ni asyncio"""
+        assert loaded_modules(["--token", "abc", "--no-manifest"]) == []
+
+    def test_selenium_loaded_on_access(self, loaded_modules):
+        """Test que les noms Selenium restent accessibles depuis le module"""
+        extra = (
+            "assert module.WebDriverWait.__name__ == 'WebDriverWait'\n"
+            "assert 'selenium' in sys.modules"
+        )
+        assert loaded_modules(["--token", "abc"], extra) == []
+
+    def test_unknown_attribute(self, loaded_modules):
+        """Test qu'un attribut inconnu lève toujours AttributeError"""
+        extra = (
+            "try:\n"
+            "    module.does_not_exist\n"
+            "except AttributeError:\n"
+            "    pass\n"
+            "else:\n"
+            "    raise SystemExit(1)"
+        )
+        assert loaded_modules(["--token", "abc"], extra) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Tests du catalogue de statistiques des traces (--stats, --stats-report)
+"""
+
+import multiprocessing
+import sys
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("numpy")
+
+
+def gpx_file(tmp_path, points):
+    """GPX 1.1 à partir de (lat, lon, ele, time)"""
+    trkpts = "".join(
+        f'<trkpt lat="{lat}" lon="{lon}"><ele>{ele}</ele><time>{when}</time></trkpt>'
+        for lat, lon, ele, when in points
+    )
+    path = tmp_path / "trace.gpx"
+    path.write_text(
+        '<?xml version="1.0"?><gpx xmlns="http://www.topografix.com/GPX/1/1">'
+        f"<trk><trkseg>{trkpts}</trkseg></trk></gpx>"
+    )
+    return path
+
+
+class TestTrackStats:
+    """Calcul des statistiques d'un GPX"""
+
+    def test_values(self, tmp_path, naviki_exporter):
+        """Distance, dénivelé, emprise et horaires"""
+        path = gpx_file(
+            tmp_path,
+            [
+                (48.000, 2.0, 35, "2025-06-01T08:00:00Z"),
+                (48.001, 2.0, 45, "2025-06-01T08:00:10Z"),
+                (48.002, 2.0, 40, "2025-06-01T08:00:20.500Z"),
+            ],
+        )
+
+        stats = naviki_exporter.track_stats(path)
+
+        assert stats["points"] == 3
+        # 0.001° de latitude ≈ 111.2 m
+        assert stats["distance_m"] == pytest.approx(222.4, abs=0.5)
+        assert stats["moving_time_s"] == pytest.approx(20.5)
+        assert (stats["elevation_gain_m"], stats["elevation_loss_m"]) == (10, 5)
+        assert (stats["min_lat"], stats["max_lat"]) == (48.0, 48.002)
+        assert stats["start_time"] == 1748764800
+        assert stats["end_time"] == 1748764820
+
+    def test_stops_not_moving(self, tmp_path, naviki_exporter):
+        """Une pause sur place ne compte pas dans le temps en mouvement"""
+        path = gpx_file(
+            tmp_path,
+            [
+                (48.000, 2.0, 35, "2025-06-01T08:00:00Z"),
+                (48.000, 2.0, 35, "2025-06-01T08:10:00Z"),
+                (48.001, 2.0, 35, "2025-06-01T08:10:20Z"),
+            ],
+        )
+
+        stats = naviki_exporter.track_stats(path)
+
+        assert stats["moving_time_s"] == 20
+        assert stats["end_time"] - stats["start_time"] == 620
+
+    def test_without_time(self, tmp_path, naviki_exporter, fake_naviki_server):
+        """GPX de route sans horaires: pas de temps ni de dates"""
+        path = tmp_path / "route.gpx"
+        path.write_bytes(fake_naviki_server.gpx_for("uuid", 3))
+
+        stats = naviki_exporter.track_stats(path)
+
+        assert stats["points"] == 3
+        assert stats["distance_m"] > 0
+        assert stats["moving_time_s"] is None
+        assert stats["start_time"] is None
+
+
+class TestCatalog:
+    """Table way_stats du manifeste"""
+
+    def test_stats_by_year(self, tmp_path, naviki_exporter):
+        """Totaux par année, sur la date de départ ou la date de création"""
+        manifest = naviki_exporter.SyncManifest(tmp_path / "manifest.sqlite3")
+        saved = naviki_exporter.SavedFile(1, "x")
+        stats = dict.fromkeys(naviki_exporter.STATS_COLUMNS)
+        stats.update(points=2, distance_m=1000.0, moving_time_s=600.0)
+        for uuid, crdate, start in (
+            ("a", 1735732800, None),  # 2025 (crdate)
+            ("b", 1704067200, 1735732800),  # 2025 (départ)
+            ("c", 1704067200, None),  # 2024
+        ):
+            manifest.record({"uuid": uuid, "crdate": crdate}, f"{uuid}.gpx", saved)
+            manifest.record_stats(uuid, {**stats, "start_time": start})
+
+        assert manifest.stats_by_year() == [
+            ("2024", 1, 1000.0, 600.0, None),
+            ("2025", 2, 2000.0, 1200.0, None),
+        ]
+        assert [row[0] for row in manifest.stats_by_year(2025)] == ["2025"]
+        assert manifest.missing_stats() == []
+        manifest.close()
+
+    def test_report_without_manifest(self, tmp_path, capsys, naviki_exporter):
+        """--stats-report sans manifeste: code de sortie 1"""
+        argv = ["prog", "--output", str(tmp_path), "--stats-report"]
+        with patch("sys.argv", argv):
+            with pytest.raises(SystemExit) as exit_info:
+                naviki_exporter.main()
+
+        assert exit_info.value.code == 1
+        assert "Manifeste introuvable" in capsys.readouterr().out
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="les processus du pool doivent hériter du module chargé",
+)
+class TestStatsExport:
+    """Catalogue rempli pendant l'export"""
+
+    def test_export_then_report(
+        self,
+        tmp_path,
+        capsys,
+        monkeypatch,
+        naviki_exporter,
+        fake_naviki_server,
+        run_main,
+    ):
+        """Chaque GPX téléchargé est mesuré, le rapport lit le catalogue"""
+        # Le pool de processus retrouve les fonctions par nom de module
+        monkeypatch.setitem(sys.modules, "naviki_exporter", naviki_exporter)
+        with fake_naviki_server.FakeNavikiServer(ways=5, points=11) as server:
+            run_main(server, tmp_path, "--stats")
+        assert "📐 Statistiques: 5 traces" in capsys.readouterr().out
+
+        with patch("sys.argv", ["prog", "-o", str(tmp_path), "--stats-report"]):
+            naviki_exporter.main()
+
+        year, count, distance, unit, moving, gain, _ = (
+            capsys.readouterr().out.splitlines()[-1].split()
+        )
+        # 10 pas de 1e-4° en diagonale (≈ 133 m) par trace, GPX sans heures
+        assert (year, count, distance, unit, moving) == ("2025", "5", "0.7", "km", "-")
+        # Altitudes de 35 à 45 m
+        assert gain == "50"
+
+    def test_backfill(
+        self,
+        tmp_path,
+        capsys,
+        monkeypatch,
+        naviki_exporter,
+        fake_naviki_server,
+        run_main,
+    ):
+        """Les GPX synchronisés avant --stats sont ajoutés au catalogue"""
+        monkeypatch.setitem(sys.modules, "naviki_exporter", naviki_exporter)
+        with fake_naviki_server.FakeNavikiServer(ways=4) as server:
+            run_main(server, tmp_path, "--compress", "gzip")
+            run_main(server, tmp_path, "--stats")
+
+        assert server.stats["downloads"] == 4
+        out = capsys.readouterr().out
+        assert "📐 4 GPX déjà synchronisés ajoutés au catalogue" in out
+        assert "📐 Statistiques: 4 traces" in out
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
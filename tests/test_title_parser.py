@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests de l'extraction des dates depuis les titres (TitleParser)
+"""
+
+import re
+
+import pytest
+
+
+@pytest.fixture
+def parser(naviki_exporter):
+    return naviki_exporter.TitleParser()
+
+
+class TestTitleParser:
+    """Tests de TitleParser.parse"""
+
+    @pytest.mark.parametrize(
+        "title, expected",
+        [
+            ("16/10/2025, 07:20", ("2025", "10", "16", "07", "20", "slash")),
+            ("16.10.25, 07:20", ("2025", "10", "16", "07", "20", "dot")),
+            ("16-10-2025, 07:20", ("2025", "10", "16", "07", "20", "dash")),
+            ("Prep - 20241124", ("2024", "11", "24", None, None, "compact")),
+        ],
+    )
+    def test_formats(self, parser, title, expected, naviki_exporter):
+        """Chaque format donne sa date, son heure éventuelle et sa source"""
+        assert parser.parse(title) == naviki_exporter.TitleDate(*expected)
+
+    def test_no_date(self, parser):
+        """Un titre sans date ne donne rien"""
+        assert parser.parse("Route de la Chapelle, Coulonges") is None
+        assert parser.parse("Vervant") is None
+        assert parser.parse("") is None
+        assert parser.parse("2024112") is None
+
+    def test_priority_not_position(self, parser):
+        """Le premier format de patterns gagne, même plus loin dans le titre"""
+        title = "20241124 puis 16/10/2025, 07:20"
+
+        assert parser.parse(title).source == "slash"
+        assert parser.parse("16.10.25, 07:20 / 01-02-2024, 08:00").source == "dot"
+
+    def test_same_as_pattern_loop(self, parser, naviki_exporter):
+        """Mêmes résultats que la boucle de re.search sur patterns"""
+        titles = [
+            "16/10/2025, 07:20",
+            "Sortie 01-02-2024, 08:00 et 20230101",
+            "x16.10.25, 07:20y",
+            "16/10/25, 07:20",
+            "Tour 2024112",
+            "a\n16-10-2025, 07:20",
+        ]
+        for title in titles:
+            expected = None
+            for pattern in naviki_exporter.patterns:
+                m = re.search(pattern, title)
+                if m:
+                    year = m.group("year")
+                    expected = ("20" + year if len(year) == 2 else year,)
+                    expected += (m.group("month"), m.group("day"))
+                    break
+            parsed = parser.parse(title)
+            assert (parsed[:3] if parsed else None) == expected, title
+
+
+class TestBuildFilename:
+    """build_filename utilise TitleParser"""
+
+    def test_date_with_time(self, naviki_exporter):
+        """Une date avec heure donne un nom sans UTC"""
+        way = {"title": "16.10.25, 07:20", "crdate": 0}
+        assert naviki_exporter.build_filename(way) == "2025-10-16_07-20_Naviki.gpx"
+
+    def test_compact_uses_crdate_time(self, naviki_exporter):
+        """Le format compact prend l'heure de crdate"""
+        way = {"title": "Prep - 20241124", "crdate": 1729065600}
+        assert naviki_exporter.build_filename(way) == "2024-11-24_08-00_UTC_Naviki.gpx"
+        assert (
+            naviki_exporter.build_filename({"title": "20241124"})
+            == "2024-11-24_Naviki.gpx"
+        )
+
+    def test_custom_title_falls_back_to_crdate(self, naviki_exporter):
+        """Sans date dans le titre, crdate et le titre nettoyé sont utilisés"""
+        way = {"title": "Tour du lac", "crdate": 1729065600}
+        assert (
+            naviki_exporter.build_filename(way)
+            == "2024-10-16_08-00_UTC_Tour_du_lac.gpx"
+        )
+        assert naviki_exporter.build_filename({"title": "Vervant"}) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
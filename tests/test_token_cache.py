@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Tests du cache du token OAuth (.naviki_token)
+"""
+
+import json
+import stat
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+@pytest.fixture
+def cache(tmp_path, naviki_exporter):
+    return tmp_path / naviki_exporter.TOKEN_CACHE_FILENAME
+
+
+def api_response(status_code):
+    return MagicMock(status_code=status_code)
+
+
+class TestTokenCacheFile:
+    """Lecture et écriture du cache"""
+
+    def test_save_and_load(self, cache, naviki_exporter):
+        """Le token est relu avec son compte et son heure d'obtention"""
+        naviki_exporter.save_cached_token("tok-123", "alice", cache)
+
+        cached = naviki_exporter.load_cached_token("alice", cache)
+
+        assert cached["token"] == "tok-123"
+        assert cached["username"] == "alice"
+        assert time.time() - cached["acquired_at"] < 60
+
+    def test_permissions_600(self, cache, naviki_exporter):
+        """Le cache n'est lisible que par son propriétaire"""
+        naviki_exporter.save_cached_token("tok-123", "alice", cache)
+
+        assert stat.S_IMODE(cache.stat().st_mode) == 0o600
+        assert list(cache.parent.iterdir()) == [cache]
+
+    def test_other_account_ignored(self, cache, naviki_exporter):
+        """Le token d'un autre compte n'est pas réutilisé"""
+        naviki_exporter.save_cached_token("tok-123", "alice", cache)
+
+        assert naviki_exporter.load_cached_token("bob", cache) is None
+
+    def test_missing_or_corrupted(self, cache, naviki_exporter):
+        """Un cache absent ou illisible est ignoré"""
+        assert naviki_exporter.load_cached_token("alice", cache) is None
+
+        cache.write_text("{pas du json")
+        assert naviki_exporter.load_cached_token("alice", cache) is None
+
+
+class TestReuseCachedToken:
+    """Réutilisation du token au démarrage"""
+
+    def test_valid_token_reused(self, cache, naviki_exporter):
+        """Un token accepté par l'API est réutilisé"""
+        naviki_exporter.save_cached_token("tok-123", "alice", cache)
+
+        with patch.object(
+            naviki_exporter.requests, "get", return_value=api_response(200)
+        ) as get:
+            token = naviki_exporter.reuse_cached_token("alice", cache)
+
+        assert token == "tok-123"
+        get.assert_called_once()
+        assert get.call_args.kwargs["headers"]["Authorization"] == "Bearer tok-123"
+
+    def test_rejected_token_cleared(self, cache, naviki_exporter):
+        """Un token refusé (401) est supprimé du cache"""
+        naviki_exporter.save_cached_token("tok-123", "alice", cache)
+
+        with patch.object(
+            naviki_exporter.requests, "get", return_value=api_response(401)
+        ):
+            token = naviki_exporter.reuse_cached_token("alice", cache)
+
+        assert token is None
+        assert not cache.exists()
+
+    def test_network_error_keeps_token(self, cache, naviki_exporter):
+        """Sans réseau, le token est conservé et réutilisé"""
+        naviki_exporter.save_cached_token("tok-123", "alice", cache)
+
+        with patch.object(
+            naviki_exporter.requests,
+            "get",
+            side_effect=naviki_exporter.requests.ConnectionError("hors ligne"),
+        ):
+            token = naviki_exporter.reuse_cached_token("alice", cache)
+
+        assert token == "tok-123"
+        assert cache.exists()
+
+    def test_expired_token_not_validated(self, cache, naviki_exporter):
+        """Un token trop ancien est supprimé sans requête"""
+        cache.write_text(
+            json.dumps(
+                {
+                    "token": "tok-123",
+                    "username": "alice",
+                    "acquired_at": time.time()
+                    - naviki_exporter.TOKEN_CACHE_MAX_AGE
+                    - 60,
+                }
+            )
+        )
+
+        with patch.object(naviki_exporter.requests, "get") as get:
+            token = naviki_exporter.reuse_cached_token("alice", cache)
+
+        assert token is None
+        get.assert_not_called()
+        assert not cache.exists()
+
+
+class TestMainWithTokenCache:
+    """main() saute Selenium quand le token en cache est valide"""
+
+    @pytest.fixture
+    def mocks(self, naviki_exporter):
+        """get_oauth_token et create_session simulés, compte sans itinéraire"""
+        with patch.object(naviki_exporter, "get_oauth_token") as auth:
+            with patch.object(naviki_exporter, "create_session") as create_session:
+                session = MagicMock()
+                session.get.return_value = MagicMock(
+                    status_code=200, json=lambda: {"ways": []}
+                )
+                create_session.return_value = session
+                yield auth, create_session
+
+    @patch(
+        "sys.argv",
+        [
+            "prog",
+            "--username",
+            "alice",
+            "--password",
+            "secret",
+            "--no-manifest",
+            "--jobs",
+            "1",
+        ],
+    )
+    def test_cached_token_skips_selenium(
+        self, mocks, naviki_exporter, tmp_path, monkeypatch
+    ):
+        """Aucun navigateur n'est lancé avec un token en cache valide"""
+        monkeypatch.chdir(tmp_path)
+        mock_auth, mock_create_session = mocks
+
+        with patch.object(
+            naviki_exporter, "reuse_cached_token", return_value="tok-123"
+        ):
+            naviki_exporter.main()
+
+        mock_auth.assert_not_called()
+        mock_create_session.assert_called_once_with("tok-123", 1)
+
+    @patch(
+        "sys.argv",
+        ["prog", "--username", "alice", "--password", "secret", "--no-manifest"],
+    )
+    def test_new_token_saved(self, mocks, naviki_exporter, tmp_path, monkeypatch):
+        """Le token obtenu par Selenium est mis en cache"""
+        monkeypatch.chdir(tmp_path)
+        mock_auth, _ = mocks
+        mock_auth.return_value = "tok-new"
+
+        with patch.object(naviki_exporter, "reuse_cached_token", return_value=None):
+            with patch.object(naviki_exporter, "save_cached_token") as save:
+                naviki_exporter.main()
+
+        save.assert_called_once_with("tok-new", "alice")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Tests du mode --watch (synchronisations périodiques) contre l'API simulée
+"""
+
+import os
+import signal
+import threading
+from unittest.mock import patch
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(signal, "SIGUSR1"), reason="signaux POSIX nécessaires"
+)
+
+
+def stop_after(cycles, delays=()):
+    """
+    watch_delay simulé: attentes `delays` (puis aucune), SIGTERM après
+    `cycles` synchronisations
+    """
+    calls = []
+
+    def fake_delay(interval):
+        calls.append(interval)
+        if len(calls) >= cycles:
+            os.kill(os.getpid(), signal.SIGTERM)
+        return delays[len(calls) - 1] if len(calls) <= len(delays) else 0
+
+    return fake_delay
+
+
+@pytest.fixture
+def run_watch(naviki_exporter):
+    """main() en mode --watch, sans token imposé: identifiants dans `options`"""
+
+    def run(server, output_dir, *options, cycles=2, delays=()):
+        argv = [
+            "prog",
+            "--api-url",
+            server.api_url,
+            "--output",
+            str(output_dir),
+            "--watch",
+            *options,
+        ]
+        with patch("sys.argv", argv):
+            with patch.object(
+                naviki_exporter, "watch_delay", side_effect=stop_after(cycles, delays)
+            ):
+                naviki_exporter.main()
+
+    return run
+
+
+class TestWatchArguments:
+    """Options du mode --watch"""
+
+    def test_defaults(self, naviki_exporter):
+        """Intervalle par défaut et mode incrémental forcé"""
+        with patch("sys.argv", ["prog", "--token", "t", "--watch"]):
+            args = naviki_exporter.parse_arguments()
+
+        assert args.watch == naviki_exporter.WATCH_DEFAULT_INTERVAL
+        assert args.incremental == naviki_exporter.INCREMENTAL_DEFAULT_RUN
+
+    @pytest.mark.parametrize("option", ["--no-manifest", "--revalidate"])
+    def test_incompatible(self, option, naviki_exporter):
+        """--watch a besoin du manifeste et du mode incrémental"""
+        with patch("sys.argv", ["prog", "--token", "t", "--watch", "5", option]):
+            with pytest.raises(SystemExit):
+                naviki_exporter.parse_arguments()
+
+    def test_jitter(self, naviki_exporter):
+        """L'intervalle varie d'au plus WATCH_JITTER"""
+        jitter = naviki_exporter.WATCH_JITTER
+        delays = [naviki_exporter.watch_delay(600) for _ in range(200)]
+
+        assert all(600 * (1 - jitter) <= d <= 600 * (1 + jitter) for d in delays)
+        assert len(set(delays)) > 1
+
+
+class TestWatch:
+    """Synchronisations successives dans un même processus"""
+
+    def test_incremental_cycles(self, tmp_path, capsys, fake_naviki_server, run_watch):
+        """La deuxième synchronisation ne retélécharge rien"""
+        with fake_naviki_server.FakeNavikiServer(ways=10) as server:
+            run_watch(server, tmp_path, "--token", server.token)
+
+        assert len(list(tmp_path.glob("*.gpx"))) == 10
+        assert server.stats["downloads"] == 10
+        out = capsys.readouterr().out
+        assert "Synchronisation n°2" in out
+        assert "Mode --watch arrêté" in out
+        assert signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
+
+    def test_sync_now_signal(self, tmp_path, capsys, fake_naviki_server, run_watch):
+        """SIGUSR1 interrompt l'attente et relance une synchronisation"""
+        timer = threading.Timer(0.2, os.kill, (os.getpid(), signal.SIGUSR1))
+        with fake_naviki_server.FakeNavikiServer(ways=3) as server:
+            timer.start()
+            # Première attente d'une heure, écourtée par SIGUSR1
+            run_watch(server, tmp_path, "--token", server.token, delays=[3600])
+
+        out = capsys.readouterr().out
+        assert "Synchronisation n°2" in out
+        assert "kill -USR1" in out
+        assert server.stats["downloads"] == 3
+
+    def test_reauthenticate_on_401(
+        self, tmp_path, capsys, naviki_exporter, fake_naviki_server, run_watch
+    ):
+        """Un token refusé déclenche une reconnexion, puis l'export reprend"""
+        with fake_naviki_server.FakeNavikiServer(ways=5) as server:
+            with patch.object(
+                naviki_exporter, "reuse_cached_token", side_effect=["perime", None]
+            ):
+                with patch.object(
+                    naviki_exporter, "get_oauth_token", return_value=server.token
+                ) as login:
+                    with patch.object(naviki_exporter, "save_cached_token"):
+                        with patch.object(
+                            naviki_exporter, "clear_cached_token"
+                        ) as clear:
+                            run_watch(
+                                server,
+                                tmp_path,
+                                "--username",
+                                "alice",
+                                "--password",
+                                "pw",
+                                cycles=1,
+                            )
+
+        clear.assert_called_once()
+        login.assert_called_once()
+        assert len(list(tmp_path.glob("*.gpx"))) == 5
+        assert server.stats["unauthorized"] == 1
+        assert "nouvelle connexion" in capsys.readouterr().out
+
+    def test_expired_token_mid_sync(
+        self, tmp_path, capsys, naviki_exporter, fake_naviki_server, run_watch
+    ):
+        """Token expiré en cours de synchronisation: la suite est récupérée"""
+        with fake_naviki_server.FakeNavikiServer(ways=200, expire_after=50) as server:
+
+            def login(*args, **kwargs):
+                server.expire_after = None
+                return server.token
+
+            with patch.object(
+                naviki_exporter, "reuse_cached_token", side_effect=[server.token, None]
+            ):
+                with patch.object(
+                    naviki_exporter, "get_oauth_token", side_effect=login
+                ):
+                    with patch.object(naviki_exporter, "save_cached_token"):
+                        with patch.object(naviki_exporter, "clear_cached_token"):
+                            run_watch(
+                                server,
+                                tmp_path,
+                                "--username",
+                                "alice",
+                                "--password",
+                                "pw",
+                                cycles=2,
+                            )
+
+        assert len(list(tmp_path.glob("*.gpx"))) == 200
+        assert server.stats["downloads"] == 200
+        out = capsys.readouterr().out
+        assert "Synchronisation n°3" in out
+
+    def test_provided_token_refused(
+        self, tmp_path, capsys, fake_naviki_server, run_watch
+    ):
+        """Sans identifiants, un token refusé arrête le mode --watch"""
+        with fake_naviki_server.FakeNavikiServer(ways=5) as server:
+            with pytest.raises(SystemExit) as exit_info:
+                run_watch(server, tmp_path, "--token", "perime")
+
+        assert exit_info.value.code == 1
+        assert server.stats["list_requests"] == 1
+        assert "fournissez un nouveau token" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])